@@ -1,75 +1,819 @@
 # backend/api/endpoints.py
 
 
-import os
-from fastapi import APIRouter, HTTPException
-from typing import List
+import asyncio
+import hashlib
+import json
+import orjson
+import time
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple, Union
 
 from httpcore import request
-from models.schemas import AnalysisRequest, AnalysisResponse, ErrorResponse, FileContent
-from core.file_processor import file_processor
-from core.ai_client import ai_client  # <-- ADD THIS IMPORT
+from models.schemas import (
+    AnalysisMode, AnalysisOptions, AnalysisRequest, AnalysisResponse, BatchAnalysisRequest, BatchItem, BatchItemResult, BatchSummary, ErrorResponse, FigureAnalysis, FileContent,
+    FileManifestEntry, HistoricalFigure, JobStatusResponse, JobSubmitResponse, MultiFigureAnalysisRequest,
+    MultiFigureAnalysisResponse, PromptStats, ResponseView
+)
+from core.admission import PRIORITIES, AdmissionRejected, AdmissionTicket, admission_controller
+from core.archive import ArchiveTooLargeError, AsyncStreamReader, archive_processor
+from core.file_processor import FileRecord, ScanEntry, content_hash, estimate_tokens, file_processor
+from core.ai_client import MAX_TOKENS, MODEL_NAME, TEMPERATURE, ai_client
+from core.jobs import Job, job_manager
+from core.manifest import incremental_analyzer
+from core.metrics import ANALYSES_IN_FLIGHT, STAGE_SECONDS
+from core.pipeline import batch_pipeline
+from core.preprocessor import prompt_preprocessor
+from core.ranking import file_ranker
+from core.singleflight import Broadcast, analysis_flights, stream_flights
 from utils.logging_setup import logger
 
 # Create a router for API endpoints
 router = APIRouter()
 
-@router.post("/analyze", response_model=AnalysisResponse, responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def analyze_files(request: AnalysisRequest):
+# Streaming (SSE and NDJSON) responses are marked as already encoded so GZipMiddleware never buffers them
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+
+def _client_id(http_request: Request) -> str:
+    """Identify the caller for rate limiting: X-Client-ID if sent, else the peer address."""
+    return http_request.headers.get("X-Client-ID") or (http_request.client.host if http_request.client else "unknown")
+
+def _priority(http_request: Request, default: str = "interactive") -> str:
+    """Read the requested priority class from X-Priority, falling back to the endpoint default."""
+    priority = http_request.headers.get("X-Priority", default).lower()
+    return priority if priority in PRIORITIES else default
+
+def _admission_error(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+def _check_rate(http_request: Request):
+    """Take one token from the caller's rate limit, refusing with 429 when it is exhausted."""
+    try:
+        admission_controller.check_rate(_client_id(http_request))
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+
+async def _acquire_slot(http_request: Request, default_priority: str = "interactive") -> AdmissionTicket:
+    """Rate-limit the caller and wait for an execution slot, mapping refusals to 429/503."""
+    _check_rate(http_request)
+    try:
+        return await admission_controller.acquire(_priority(http_request, default_priority))
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+
+@asynccontextmanager
+async def _admitted(http_request: Request, default_priority: str = "interactive") -> AsyncIterator[None]:
+    """Hold an execution slot for the body of the block."""
+    ticket = await _acquire_slot(http_request, default_priority)
+    try:
+        yield
+    finally:
+        ticket.release()
+
+def _manifest_entry(file: FileRecord) -> FileManifestEntry:
+    """Describe a processed file without echoing its content."""
+    return FileManifestEntry(
+        filename=file.filename,
+        file_type=file.file_type,
+        size=len(file.content),
+        hash=content_hash(file.content) if file.content else None,
+        success=file.success,
+        error=file.error
+    )
+
+def _project_files(
+    request: AnalysisOptions,
+    processed_files: List[FileRecord]
+) -> dict:
+    """
+    Pick the processed_files / file_manifest fields for the requested response view.
+    
+    This is where internal FileRecords become API models, so only the view
+    actually returned is ever built.
+    """
+    if request.response_view == ResponseView.MANIFEST:
+        return {"processed_files": [], "file_manifest": [_manifest_entry(file) for file in processed_files]}
+    return {"processed_files": [FileContent(**file._asdict()) for file in processed_files]}
+
+def _json_bytes(payload: BaseModel) -> bytes:
+    """Serialize a model with orjson (model_dump is far faster than jsonable_encoder)."""
+    return orjson.dumps(payload.model_dump(mode="json"))
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+def _tagged_response(payload: BaseModel) -> Response:
+    """Serialize a response with orjson and tag it with a content ETag."""
+    body = _json_bytes(payload)
+    return Response(content=body, media_type="application/json", headers={"ETag": _etag(body)})
+
+def _conditional_response(http_request: Request, payload: BaseModel) -> Response:
+    """
+    Like _tagged_response, but a matching If-None-Match header short-circuits
+    to 304 Not Modified, so clients re-polling an unchanged result skip the
+    body entirely. Only for GET endpoints: RFC 9110 allows 304 for GET and
+    HEAD alone, and POST results are computed before the check anyway.
+    """
+    body = _json_bytes(payload)
+    etag = _etag(body)
+    
+    if_none_match = http_request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+async def _process_request_files(
+    request: Union[AnalysisRequest, MultiFigureAnalysisRequest],
+    entries: Optional[List[ScanEntry]] = None
+) -> List[FileRecord]:
+    """Scan the request's folder off the event loop, reading more per file in chunked or summarize mode."""
+    return await run_in_threadpool(file_processor.process_directory, request.folder_path, max_chars=_read_max_chars(request), entries=entries)
+
+def _read_max_chars(request: AnalysisOptions) -> Optional[int]:
+    """Per-file character limit for reading: whole files in chunked or summarize mode, the default otherwise."""
+    read_whole_files = request.mode == AnalysisMode.CHUNKED or request.summarize_code
+    return file_processor.chunked_max_chars_per_file if read_whole_files else None
+
+async def _scan_request_folder(request: AnalysisRequest) -> List[ScanEntry]:
+    """List the request's files (stat only, no reads) off the event loop."""
+    return await run_in_threadpool(file_processor.scan_directory, request.folder_path)
+
+def _flight_key(request: AnalysisRequest, entries: List[ScanEntry]) -> str:
+    """
+    Identity of an analysis for request coalescing.
+    
+    Covers every request field, the model parameters and the size and
+    mtime of every file, so an edit to the folder starts a new analysis.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(orjson.dumps(request.model_dump(mode="json"), option=orjson.OPT_SORT_KEYS))
+    hasher.update(f"\0{MODEL_NAME}\0{MAX_TOKENS}\0{TEMPERATURE}\0".encode('utf-8'))
+    for entry in entries:
+        hasher.update(f"{entry.rel_path}\0{entry.size}\0{entry.mtime_ns}\n".encode('utf-8', errors='surrogatepass'))
+    return hasher.hexdigest()
+
+def _build_prompt_files(
+    request: AnalysisOptions,
+    processed_files: List[FileRecord]
+) -> Tuple[List[FileRecord], PromptStats]:
+    """
+    Preprocess files for the prompt, optionally reduce large sources to
+    skeletons, then keep the most relevant files within the token budget.
+    """
+    # Drop duplicates, generated code and padding before building the prompt
+    prompt_files, prompt_stats = prompt_preprocessor.preprocess(processed_files)
+    
+    if request.summarize_code:
+        max_chars = None if request.mode == AnalysisMode.CHUNKED else file_processor.max_chars_per_file
+        prompt_files = file_processor.summarize_files(prompt_files, max_chars=max_chars)
+    
+    # Most informative files first; chunked mode may spend every chunk's budget
+    budget = file_processor.chunk_token_budget * file_processor.max_chunks if request.mode == AnalysisMode.CHUNKED else None
+    prompt_files, prompt_stats.over_budget_skipped = file_ranker.select(prompt_files, token_budget=budget)
+    
+    if request.summarize_code or prompt_stats.over_budget_skipped:
+        prompt_stats.files_used = len(prompt_files)
+        prompt_stats.tokens_after = sum(estimate_tokens(file.content) for file in prompt_files)
+        prompt_stats.tokens_saved = max(prompt_stats.tokens_before - prompt_stats.tokens_after, 0)
+    
+    return prompt_files, prompt_stats
+
+def _build_prompt(
+    request: AnalysisOptions,
+    processed_files: List[FileRecord]
+) -> Tuple[Union[str, List[str]], PromptStats]:
+    """
+    Build the prompt content: chunk prompts in chunked mode, one combined prompt otherwise.
+    
+    Preprocessing, ranking and combining are all CPU-bound, so callers run
+    this on the thread pool rather than on the event loop.
+    """
+    prompt_files, prompt_stats = _build_prompt_files(request, processed_files)
+    with STAGE_SECONDS.labels("prompt_build").time():
+        if request.mode == AnalysisMode.CHUNKED:
+            content = file_processor.get_content_chunks(prompt_files)
+        else:
+            content = file_processor.get_combined_content(prompt_files)
+    return content, prompt_stats
+
+async def _run_analysis(request: AnalysisRequest) -> AnalysisResponse:
+    """
+    Scan the folder and run the AI analysis for a single request.
+    
+    Identical requests arriving while one is in flight (same fields, same
+    file listing) wait for and share its result.
+    
+    Raises:
+        ValueError: If the folder cannot be processed
+    """
+    with ANALYSES_IN_FLIGHT.labels(request.mode.value).track_inprogress(), STAGE_SECONDS.labels("total").time():
+        entries = await _scan_request_folder(request)
+        return await analysis_flights.do(_flight_key(request, entries), lambda: _run_analysis_stages(request, entries))
+
+class _PreparedAnalysis(NamedTuple):
+    """Everything an analysis needs before its model call."""
+    processed_files: List[FileRecord]
+    prompt_stats: Optional[PromptStats]
+    # Combined prompt (single), chunk prompts (chunked) or group notes (incremental)
+    content: Union[str, List[str]]
+
+async def _run_analysis_stages(
+    request: AnalysisRequest,
+    entries: List[ScanEntry],
+    processed_files: Optional[List[FileRecord]] = None
+) -> AnalysisResponse:
+    return await _complete_analysis(request, await _prepare_analysis(request, entries, processed_files))
+
+async def _prepare_analysis(
+    request: AnalysisRequest,
+    entries: List[ScanEntry],
+    processed_files: Optional[List[FileRecord]] = None
+) -> _PreparedAnalysis:
+    """Read the files and build the prompt content, stopping short of the final model call."""
+    # 1. Process files from the provided directory (unless they were already read, e.g. from an archive)
+    prompt_stats = None
+    if request.mode == AnalysisMode.INCREMENTAL:
+        incremental = await incremental_analyzer.prepare_notes(request.folder_path, use_cache=not request.bypass_cache)
+        processed_files = incremental.processed_files
+    else:
+        if processed_files is None:
+            processed_files = await _process_request_files(request, entries)
+        # 2. Combine the content for AI analysis
+        content, prompt_stats = await run_in_threadpool(_build_prompt, request, processed_files)
+    
+    if request.mode == AnalysisMode.INCREMENTAL:
+        logger.info(f"Re-read {incremental.files_read} of {len(processed_files)} files and re-analyzed {incremental.groups_analyzed} groups")
+        content = incremental.notes
+    elif request.mode == AnalysisMode.CHUNKED:
+        logger.info(f"Successfully processed {len(processed_files)} files into {len(content)} chunks")
+    else:
+        logger.info(f"Successfully processed {len(processed_files)} files. Total content length: {len(content)} characters")
+    
+    return _PreparedAnalysis(processed_files, prompt_stats, content)
+
+async def _complete_analysis(request: AnalysisRequest, prepared: _PreparedAnalysis) -> AnalysisResponse:
+    """Run the model call for a prepared analysis and build the response."""
+    processed_files, prompt_stats = prepared.processed_files, prepared.prompt_stats
+
+    # 3. Get AI analysis (NEW - AI INTEGRATION)
+    ai_response = None
+
+    if ai_client.backends:  # Check if any inference backend is configured
+        logger.info(f"Requesting AI analysis from {request.historical_figure.value}")
+        with STAGE_SECONDS.labels("upstream").time():
+            if request.mode == AnalysisMode.INCREMENTAL:
+                if prepared.content:
+                    ai_response = await ai_client.synthesize_analysis(
+                        prepared.content,
+                        request.historical_figure.value,
+                        use_cache=not request.bypass_cache
+                    )
+            elif request.mode == AnalysisMode.CHUNKED:
+                ai_response = await ai_client.get_chunked_analysis(
+                    prepared.content,
+                    request.historical_figure.value,
+                    use_cache=not request.bypass_cache
+                )
+            else:
+                ai_response = await ai_client.get_analysis_async(
+                    prepared.content,
+                    request.historical_figure.value,
+                    use_cache=not request.bypass_cache
+                )
+        logger.debug(
+            "AI analysis finished",
+            extra={"figure": request.historical_figure.value, "mode": request.mode.value, "response_chars": len(ai_response or "")}
+        )
+    else:
+        logger.warning("AI client not available - skipping AI analysis")
+    
+    # 4. Return the response (UPDATED)
+    return AnalysisResponse(
+        analysis=ai_response or f"✅ Processed {len(processed_files)} files. AI analysis unavailable - check HF_TOKEN / AI_BACKENDS configuration.",
+        status="success" if ai_response else "partial_success",
+        prompt_stats=prompt_stats,
+        **_project_files(request, processed_files)
+    )
+
+@router.post("/analyze", response_model=AnalysisResponse, responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def analyze_files(request: AnalysisRequest, http_request: Request):
     """
     Main endpoint to analyze files using a historical figure's perspective.
     
     - **folder_path**: Absolute path to the folder containing files to analyze
     - **historical_figure**: Which historical figure's perspective to use for analysis
+    - **mode**: `single` for one prompt, `chunked` for map-reduce over large projects, `incremental` to re-analyze only changed files
+    - **response_view**: `full` to echo file contents, `manifest` for a compact per-file summary
+    
+    Send `X-Priority: batch` to yield to interactive traffic under load.
     """
     logger.info(f"Analysis request received for {request.historical_figure} on path: {request.folder_path}")
     
-    try:
-        # 1. Process files from the provided directory
-        processed_files = file_processor.process_directory(request.folder_path)
-        
-        # 2. Combine the content for AI analysis
-        combined_content = file_processor.get_combined_content(processed_files)
-        
-        logger.info(f"Successfully processed {len(processed_files)} files. Total content length: {len(combined_content)} characters")
-        
+    async with _admitted(http_request):
+        try:
+            return _tagged_response(await _run_analysis(request))
+            
+        except ValueError as e:
+            # Handle file/directory not found errors
+            logger.warning(f"File processing error: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+            
+        except Exception as e:
+            # Handle any other errors
+            logger.error(f"Unexpected error during file processing: {e}")
+            raise HTTPException(
+                status_code=500, 
+                detail=f"An unexpected error occurred: {str(e)}"
+            )
 
-        # 3. Get AI analysis (NEW - AI INTEGRATION)
-        ai_response = None
+@router.post("/analyze/archive", response_model=AnalysisResponse, responses={400: {"model": ErrorResponse}, 413: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def analyze_archive(
+    http_request: Request,
+    historical_figure: HistoricalFigure = Query(..., description="The name of the historical figure to embody."),
+    mode: AnalysisMode = Query(AnalysisMode.SINGLE, description="'single' or 'chunked'; 'incremental' needs a server-side folder and is not supported."),
+    response_view: ResponseView = Query(ResponseView.FULL, description="'full' echoes every file's content; 'manifest' returns a compact per-file summary."),
+    summarize_code: bool = Query(False, description="Send large source files as structural skeletons."),
+    bypass_cache: bool = Query(False, description="Skip the response cache and always request a fresh analysis.")
+):
+    """
+    Analyze an uploaded zip or tar archive (optionally gzip/bzip2/xz compressed) instead of a server-side folder.
+    
+    Send the archive as the raw request body, e.g.
+    `curl --data-binary @project.tar.gz -H "Content-Type: application/gzip" ".../analyze/archive?historical_figure=Alan%20Turing"`.
+    Members are filtered like a directory scan and read in memory while the
+    upload is still arriving; nothing is extracted to disk.
+    """
+    logger.info(f"Archive analysis request received for {historical_figure}")
+    
+    if mode == AnalysisMode.INCREMENTAL:
+        raise HTTPException(status_code=400, detail="Incremental mode needs a server-side folder; use 'single' or 'chunked' for archives.")
+    
+    content_length = http_request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > archive_processor.max_bytes:
+        raise HTTPException(status_code=413, detail=f"Archive exceeds the upload limit of {archive_processor.max_bytes} bytes.")
+    
+    request = AnalysisRequest(
+        folder_path="<uploaded archive>",
+        historical_figure=historical_figure,
+        bypass_cache=bypass_cache,
+        mode=mode,
+        response_view=response_view,
+        summarize_code=summarize_code
+    )
+    
+    async with _admitted(http_request):
+        try:
+            with ANALYSES_IN_FLIGHT.labels(request.mode.value).track_inprogress(), STAGE_SECONDS.labels("total").time():
+                # The archive is parsed on a worker thread that pulls the body from the event loop as it reads
+                stream = AsyncStreamReader(http_request.stream(), asyncio.get_running_loop(), archive_processor.max_bytes)
+                processed_files = await run_in_threadpool(archive_processor.read_archive, stream, max_chars=_read_max_chars(request))
+                response = await _run_analysis_stages(request, [], processed_files)
+            return _tagged_response(response)
+            
+        except ArchiveTooLargeError as e:
+            logger.warning(f"Archive rejected: {e}")
+            raise HTTPException(status_code=413, detail=str(e))
+            
+        except ValueError as e:
+            logger.warning(f"Archive processing error: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+            
+        except Exception as e:
+            logger.error(f"Unexpected error during archive processing: {e}")
+            raise HTTPException(
+                status_code=500, 
+                detail=f"An unexpected error occurred: {str(e)}"
+            )
 
-        # DEBUG: Add these 2 lines - they will show us what's happening
-        print(f"🔍 DEBUG: ai_client.client = {ai_client.client}")
-        print(f"🔍 DEBUG: HF_TOKEN present = {bool(os.environ.get('HF_TOKEN'))}")
+def _sse_event(event: str, data) -> str:
+    """Format a single Server-Sent Event frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        if ai_client.client:  # Check if AI client is initialized (HF_TOKEN is set)
-            logger.info(f"Requesting AI analysis from {request.historical_figure.value}")
-            ai_response = ai_client.get_analysis(combined_content, request.historical_figure.value)
-            # DEBUG: Add these 2 lines to see the response
-            print(f"🔍 DEBUG: ai_response type = {type(ai_response)}")
-            if ai_response:
-                print(f"🔍 DEBUG: ai_response content = {ai_response[:200]}...")  # First 200 chars
-            else:
-                print("🔍 DEBUG: ai_response is None")
+class _StreamFlight(NamedTuple):
+    """A started streaming analysis that identical requests can subscribe to."""
+    processed_files: List[FileRecord]
+    prompt_stats: Optional[PromptStats]
+    tokens: Broadcast
+
+async def _start_stream(request: AnalysisRequest, entries: List[ScanEntry]) -> _StreamFlight:
+    """Process the folder and start the upstream token stream for a streaming analysis."""
+    figure = request.historical_figure.value
+    use_cache = not request.bypass_cache
+    if request.mode == AnalysisMode.INCREMENTAL:
+        incremental = await incremental_analyzer.prepare_notes(request.folder_path, use_cache=use_cache)
+        processed_files = incremental.processed_files
+    else:
+        processed_files = await _process_request_files(request, entries)
+    
+    prompt_stats = None
+    if request.mode == AnalysisMode.INCREMENTAL:
+        tokens = ai_client.stream_synthesis(incremental.notes, figure, use_cache=use_cache)
+    else:
+        content, prompt_stats = await run_in_threadpool(_build_prompt, request, processed_files)
+        if request.mode == AnalysisMode.CHUNKED:
+            tokens = ai_client.stream_chunked_analysis(content, figure, use_cache=use_cache)
         else:
-            logger.warning("AI client not available - skipping AI analysis")
-            print("🔍 DEBUG: AI client is None - check initialization")
-        
-        # 4. Return the response (UPDATED)
-        return AnalysisResponse(
-            analysis=ai_response or f"✅ Processed {len(processed_files)} files. AI analysis unavailable - check HF_TOKEN configuration.",
-            processed_files=processed_files,
-            status="success" if ai_response else "partial_success"
+            tokens = ai_client.stream_analysis(content, figure, use_cache=use_cache)
+    
+    return _StreamFlight(processed_files, prompt_stats, Broadcast(tokens))
+
+@router.post("/analyze/stream", responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
+async def analyze_files_stream(request: AnalysisRequest, http_request: Request):
+    """
+    Streaming variant of /analyze that sends the analysis as Server-Sent Events.
+    
+    Emits a `manifest` event with the processed files first, then one `token`
+    event per text delta, and finally `done` (or `error` if the upstream call
+    fails mid-stream). Identical concurrent requests share one upstream
+    stream; late joiners first receive the tokens they missed.
+    """
+    logger.info(f"Streaming analysis request received for {request.historical_figure} on path: {request.folder_path}")
+    
+    if not ai_client.backends:
+        raise HTTPException(status_code=503, detail="AI analysis unavailable - check HF_TOKEN / AI_BACKENDS configuration.")
+    
+    # The slot is held until the stream ends, not just until headers are sent
+    ticket = await _acquire_slot(http_request)
+    try:
+        entries = await _scan_request_folder(request)
+        flight = await stream_flights.do(
+            _flight_key(request, entries),
+            lambda: _start_stream(request, entries),
+            linger=lambda flight: flight.tokens.wait_closed()
         )
-        
     except ValueError as e:
-        # Handle file/directory not found errors
+        ticket.release()
         logger.warning(f"File processing error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        ticket.release()
+        raise
+    
+    processed_files, prompt_stats = flight.processed_files, flight.prompt_stats
+    tokens = flight.tokens.subscribe()
+    
+    async def event_stream() -> AsyncIterator[str]:
+        yield _sse_event("manifest", {
+            "processed_files": [_manifest_entry(file).model_dump(mode="json") for file in processed_files],
+            "prompt_stats": prompt_stats.model_dump(mode="json") if prompt_stats else None
+        })
+        try:
+            with ANALYSES_IN_FLIGHT.labels(request.mode.value).track_inprogress(), STAGE_SECONDS.labels("upstream").time():
+                try:
+                    async for token in tokens:
+                        yield _sse_event("token", {"text": token})
+                except Exception as e:
+                    logger.error(f"❌ Streaming analysis failed: {e}")
+                    yield _sse_event("error", {"detail": str(e)})
+                    return
+            yield _sse_event("done", {"status": "success"})
+        finally:
+            ticket.release()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        # Also covers a client that disconnects before the body starts
+        background=BackgroundTask(ticket.release)
+    )
+
+
+async def _process_multi_request_files(
+    request: MultiFigureAnalysisRequest
+) -> Tuple[List[FileRecord], Optional[List[str]]]:
+    """Scan the folder once for all figures; incremental mode also returns the group notes."""
+    if request.mode == AnalysisMode.INCREMENTAL and ai_client.backends:
+        incremental = await incremental_analyzer.prepare_notes(request.folder_path, use_cache=not request.bypass_cache)
+        return incremental.processed_files, incremental.notes
+    return await _process_request_files(request), None
+
+async def _build_multi_prompt(
+    request: MultiFigureAnalysisRequest,
+    processed_files: List[FileRecord],
+    notes: Optional[List[str]]
+) -> Tuple[Union[str, List[str], None], Optional[PromptStats]]:
+    """Build the shared prompt off the event loop; incremental notes replace it entirely."""
+    if notes is not None:
+        return None, None
+    return await run_in_threadpool(_build_prompt, request, processed_files)
+
+async def _analyze_figures(
+    request: MultiFigureAnalysisRequest,
+    content: Union[str, List[str], None],
+    notes: Optional[List[str]] = None
+) -> AsyncIterator[FigureAnalysis]:
+    """
+    Run one analysis per requested figure concurrently over a shared scan.
+    
+    ``content`` is the prompt built by _build_prompt. In chunked mode the
+    map step runs once and only the synthesis is done per figure;
+    precomputed ``notes`` (incremental mode) skip the map step. Results are
+    yielded in completion order.
+    """
+    figures = list(dict.fromkeys(request.historical_figures))
+    use_cache = not request.bypass_cache
+    
+    if not ai_client.backends:
+        logger.warning("AI client not available - skipping AI analysis")
+        for figure in figures:
+            yield FigureAnalysis(historical_figure=figure, status="unavailable")
+        return
+    
+    chunks = content if request.mode == AnalysisMode.CHUNKED else None
+    if notes is not None or (chunks is not None and len(chunks) != 1):
+        if notes is None:
+            # A project of only empty files has no chunks and so no notes; every figure then
+            # fails, as in get_chunked_analysis
+            notes = [note for note in await ai_client.analyze_chunks(chunks, use_cache=use_cache) if note] if chunks else []
+        
+        async def analyze(figure):
+            if not notes:
+                return figure, None
+            return figure, await ai_client.synthesize_analysis(notes, figure.value, use_cache=use_cache)
+    else:
+        combined_content = chunks[0] if chunks else content
         
+        async def analyze(figure):
+            return figure, await ai_client.get_analysis_async(combined_content, figure.value, use_cache=use_cache)
+    
+    for next_done in asyncio.as_completed([analyze(figure) for figure in figures]):
+        figure, analysis = await next_done
+        yield FigureAnalysis(
+            historical_figure=figure,
+            analysis=analysis,
+            status="success" if analysis else "failed"
+        )
+
+@router.post("/analyze/multi", response_model=MultiFigureAnalysisResponse, responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def analyze_files_multi(request: MultiFigureAnalysisRequest, http_request: Request):
+    """
+    Analyze one folder from several historical figures' perspectives.
+    
+    The folder is scanned and combined once; the per-figure model calls run
+    concurrently. Analyses are returned in the order the figures were requested.
+    """
+    logger.info(f"Multi-figure analysis request received for {len(request.historical_figures)} figures on path: {request.folder_path}")
+    
+    if not request.historical_figures:
+        raise HTTPException(status_code=400, detail="At least one historical figure is required.")
+    
+    async with _admitted(http_request):
+        try:
+            processed_files, notes = await _process_multi_request_files(request)
+            content, prompt_stats = await _build_multi_prompt(request, processed_files, notes)
+            results = {result.historical_figure: result async for result in _analyze_figures(request, content, notes)}
+            
+        except ValueError as e:
+            logger.warning(f"File processing error: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+            
+        except Exception as e:
+            logger.error(f"Unexpected error during multi-figure analysis: {e}")
+            raise HTTPException(
+                status_code=500, 
+                detail=f"An unexpected error occurred: {str(e)}"
+            )
+    analyses = [results[figure] for figure in dict.fromkeys(request.historical_figures)]
+    succeeded = sum(1 for result in analyses if result.analysis)
+    
+    return _tagged_response(MultiFigureAnalysisResponse(
+        analyses=analyses,
+        status="success" if succeeded == len(analyses) else "partial_success",
+        prompt_stats=prompt_stats,
+        **_project_files(request, processed_files)
+    ))
+
+@router.post("/analyze/multi/stream", responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def analyze_files_multi_stream(request: MultiFigureAnalysisRequest, http_request: Request):
+    """
+    Streaming variant of /analyze/multi using Server-Sent Events.
+    
+    Emits a `manifest` event with the processed files, then one `analysis`
+    event per figure as soon as it finishes, and finally `done`.
+    """
+    logger.info(f"Streaming multi-figure analysis request received for {len(request.historical_figures)} figures on path: {request.folder_path}")
+    
+    if not request.historical_figures:
+        raise HTTPException(status_code=400, detail="At least one historical figure is required.")
+    
+    ticket = await _acquire_slot(http_request)
+    try:
+        processed_files, notes = await _process_multi_request_files(request)
+        content, prompt_stats = await _build_multi_prompt(request, processed_files, notes)
+    except ValueError as e:
+        ticket.release()
+        logger.warning(f"File processing error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        # Handle any other errors
-        logger.error(f"Unexpected error during file processing: {e}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"An unexpected error occurred: {str(e)}"
-        )
\ No newline at end of file
+        ticket.release()
+        logger.error(f"Unexpected error during multi-figure analysis: {e}")
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+    except BaseException:
+        ticket.release()
+        raise
+    
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            yield _sse_event("manifest", {
+                "processed_files": [_manifest_entry(file).model_dump(mode="json") for file in processed_files],
+                "prompt_stats": prompt_stats.model_dump(mode="json") if prompt_stats else None
+            })
+            try:
+                async for result in _analyze_figures(request, content, notes):
+                    yield _sse_event("analysis", {
+                        "historical_figure": result.historical_figure.value,
+                        "analysis": result.analysis,
+                        "status": result.status
+                    })
+            except Exception as e:
+                logger.error(f"❌ Streaming multi-figure analysis failed: {e}")
+                yield _sse_event("error", {"detail": str(e)})
+                return
+            yield _sse_event("done", {"status": "success"})
+        finally:
+            ticket.release()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        background=BackgroundTask(ticket.release)
+    )
+
+
+# Most folder/figure pairs accepted in one batch request
+MAX_BATCH_ITEMS = 1000
+
+def _ndjson_line(payload: BaseModel) -> bytes:
+    return _json_bytes(payload) + b"\n"
+
+@router.post("/analyze/batch", responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}})
+async def analyze_batch(request: BatchAnalysisRequest, http_request: Request):
+    """
+    Analyze many folders in one call, streaming results back as NDJSON.
+    
+    Items run as a pipeline: upcoming folders are scanned and read on the
+    thread pool while earlier items wait on the model, with at most
+    `max_concurrency` model calls in flight. Each finished item produces one
+    `result` line (in completion order, with its `index` in the request);
+    a failed item reports its error without stopping the batch. The last
+    line is a `summary` with aggregate throughput. Items run at batch
+    priority unless `X-Priority: interactive` is sent. In incremental mode
+    the map step calls the model too, so it runs with the final call under
+    the same limit rather than ahead of it.
+    """
+    logger.info(f"Batch analysis request received for {len(request.items)} items")
+    
+    if not request.items:
+        raise HTTPException(status_code=400, detail="At least one item is required.")
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {MAX_BATCH_ITEMS} items.")
+    _check_rate(http_request)
+    priority = _priority(http_request, "batch")
+    
+    async def prepare(item: BatchItem) -> Tuple[AnalysisRequest, Optional[_PreparedAnalysis]]:
+        analysis_request = AnalysisRequest(
+            folder_path=item.folder_path,
+            historical_figure=item.historical_figure,
+            **request.model_dump(include=set(AnalysisOptions.model_fields))
+        )
+        if request.mode == AnalysisMode.INCREMENTAL:
+            # Incremental notes come from model calls, so they wait for execute's slot
+            return analysis_request, None
+        entries = await _scan_request_folder(analysis_request)
+        return analysis_request, await _prepare_analysis(analysis_request, entries)
+    
+    async def execute(item: BatchItem, prepared: Tuple[AnalysisRequest, Optional[_PreparedAnalysis]]) -> AnalysisResponse:
+        analysis_request, prepared_analysis = prepared
+        # The batch already bounds its own concurrency, so waiting for a slot is unbounded
+        ticket = await admission_controller.acquire(priority, bounded=False)
+        try:
+            with ANALYSES_IN_FLIGHT.labels(request.mode.value).track_inprogress():
+                if prepared_analysis is None:
+                    prepared_analysis = await _prepare_analysis(analysis_request, [])
+                return await _complete_analysis(analysis_request, prepared_analysis)
+        finally:
+            ticket.release()
+    
+    async def ndjson_stream() -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        succeeded = files_processed = prompt_tokens = 0
+        outcomes = batch_pipeline.run(request.items, prepare, execute, concurrency=request.max_concurrency)
+        try:
+            async for outcome in outcomes:
+                item = request.items[outcome.index]
+                if outcome.error is None:
+                    response = outcome.result
+                    succeeded += 1
+                    files_processed += len(response.file_manifest or response.processed_files)
+                    prompt_tokens += response.prompt_stats.tokens_after if response.prompt_stats else 0
+                    STAGE_SECONDS.labels("total").observe(outcome.seconds)
+                else:
+                    response = None
+                    logger.warning(f"Batch item {outcome.index} ({item.folder_path}) failed: {outcome.error}")
+                yield _ndjson_line(BatchItemResult(
+                    index=outcome.index,
+                    folder_path=item.folder_path,
+                    historical_figure=item.historical_figure,
+                    status=response.status if response else "failed",
+                    seconds=round(outcome.seconds, 3),
+                    result=response,
+                    error=str(outcome.error) if outcome.error else None
+                ))
+        finally:
+            await outcomes.aclose()
+        
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        logger.info(f"Batch finished: {succeeded}/{len(request.items)} items in {elapsed:.1f}s")
+        yield _ndjson_line(BatchSummary(
+            items=len(request.items),
+            succeeded=succeeded,
+            failed=len(request.items) - succeeded,
+            elapsed_seconds=round(elapsed, 3),
+            items_per_second=round(len(request.items) / elapsed, 3),
+            files_processed=files_processed,
+            prompt_tokens=prompt_tokens,
+            prompt_tokens_per_second=round(prompt_tokens / elapsed, 1)
+        ))
+    
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson", headers=SSE_HEADERS)
+
+
+# Longest a client may hold a status request open waiting for a job to finish
+MAX_JOB_WAIT_SECONDS = 60
+
+def _job_status(job: Job) -> JobStatusResponse:
+    """Convert a Job into its API representation."""
+    return JobStatusResponse(
+        job_id=job.job_id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error
+    )
+
+async def _run_batch_analysis(request: AnalysisRequest) -> AnalysisResponse:
+    """Run a background job's analysis in a batch-priority slot."""
+    # Jobs already sit in the job manager's bounded queue, so the wait here is unbounded
+    ticket = await admission_controller.acquire("batch", bounded=False)
+    try:
+        return await _run_analysis(request)
+    finally:
+        ticket.release()
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=202, responses={429: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
+async def submit_analysis_job(request: AnalysisRequest, http_request: Request):
+    """
+    Queue an analysis to run in the background and return its job id immediately.
+    
+    Poll `GET /jobs/{job_id}` (optionally with `wait` to long-poll) for the result.
+    Jobs run at batch priority, behind interactive requests.
+    """
+    logger.info(f"Analysis job submitted for {request.historical_figure} on path: {request.folder_path}")
+    
+    _check_rate(http_request)
+    
+    try:
+        job = job_manager.submit(lambda: _run_batch_analysis(request))
+    except RuntimeError as e:
+        logger.warning(f"Job rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    return JobSubmitResponse(job_id=job.job_id, status=job.status)
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse, responses={404: {"model": ErrorResponse}})
+async def get_analysis_job(
+    http_request: Request,
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to finish before responding (long-polling).")
+):
+    """
+    Return the status of a background job, and its result once finished.
+    
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    instead of the full result when nothing has changed.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or expired.")
+    
+    await job.wait(min(wait, MAX_JOB_WAIT_SECONDS))
+    return _conditional_response(http_request, _job_status(job))
+
+@router.delete("/jobs/{job_id}", response_model=JobStatusResponse, responses={404: {"model": ErrorResponse}})
+async def cancel_analysis_job(job_id: str):
+    """Cancel a queued or running background job."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or expired.")
+    
+    return _job_status(job)
@@ -0,0 +1,268 @@
+# backend/bench_ingestion.py
+"""
+Microbenchmarks for the ingestion hot path (scan, read, combine).
+
+Generates a synthetic repository, then times FileProcessor.process_directory,
+FileProcessor._read_single_file and FileProcessor.get_combined_content,
+reporting files/s, MB/s and peak Python memory for each stage.
+
+Usage:
+    python bench_ingestion.py --files 2000 --depth 4
+    python bench_ingestion.py --save-baseline bench_baseline.json
+    python bench_ingestion.py --baseline bench_baseline.json --tolerance 0.15
+
+With --baseline the script exits with status 1 if any stage's throughput
+dropped by more than the tolerance.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.file_processor import FileProcessor
+
+# Extensions to generate, weighted toward the common source types
+EXTENSIONS = ['.py', '.py', '.js', '.js', '.java', '.md', '.json', '.html', '.css', '.txt']
+
+# Encodings the reader has to detect; utf-8 dominates real repositories
+ENCODINGS = ['utf-8', 'utf-8', 'utf-8', 'utf-8', 'utf-8-sig', 'cp1252', 'latin-1', 'utf-16']
+
+WORDS = [
+    'process', 'files', 'content', 'analysis', 'figure', 'request', 'result', 'cache',
+    'token', 'chunk', 'value', 'index', 'return', 'self', 'config', 'handler', 'café', 'naïve'
+]
+
+class RepoSpec(NamedTuple):
+    """Shape of the synthetic repository."""
+    files: int
+    depth: int
+    fanout: int
+    min_size: int
+    max_size: int
+    binary_ratio: float
+    large_ratio: float
+    large_size: int
+    seed: int
+
+class StageResult(NamedTuple):
+    """Timing and memory for one benchmarked stage."""
+    name: str
+    files: int
+    bytes: int
+    seconds: float
+    peak_memory: int
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / (1024 * 1024) / self.seconds if self.seconds else 0.0
+
+def _source_text(rng: random.Random, size: int) -> str:
+    lines = []
+    length = 0
+    while length < size:
+        indent = '    ' * rng.randint(0, 3)
+        line = indent + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)
+
+def generate_repo(root: str, spec: RepoSpec) -> Dict[str, int]:
+    """
+    Write a synthetic repository under ``root``.
+
+    Files are spread over a directory tree ``spec.depth`` levels deep with
+    ``spec.fanout`` subdirectories per level. A fraction of files are binary
+    (NUL bytes behind a text extension) or large outliers, and text files use
+    a mix of encodings.
+
+    Returns:
+        Counts of generated files by kind, plus the total bytes written
+    """
+    rng = random.Random(spec.seed)
+    directories = ['']
+    frontier = ['']
+    for _ in range(spec.depth):
+        frontier = [os.path.join(parent, f"pkg{index}") for parent in frontier for index in range(spec.fanout)]
+        directories.extend(frontier)
+
+    stats = {'text': 0, 'binary': 0, 'large': 0, 'bytes': 0}
+    for index in range(spec.files):
+        directory = os.path.join(root, rng.choice(directories))
+        os.makedirs(directory, exist_ok=True)
+        extension = rng.choice(EXTENSIONS)
+        path = os.path.join(directory, f"module_{index}{extension}")
+
+        roll = rng.random()
+        if roll < spec.binary_ratio:
+            data = bytes(rng.getrandbits(8) for _ in range(rng.randint(spec.min_size, spec.max_size)))
+            stats['binary'] += 1
+        else:
+            large = roll < spec.binary_ratio + spec.large_ratio
+            size = spec.large_size if large else rng.randint(spec.min_size, spec.max_size)
+            encoding = 'utf-8' if large else rng.choice(ENCODINGS)
+            data = _source_text(rng, size).encode(encoding)
+            stats['large' if large else 'text'] += 1
+
+        with open(path, 'wb') as file:
+            file.write(data)
+        stats['bytes'] += len(data)
+
+    return stats
+
+def _measure(name: str, run: Callable[[], Tuple[int, int]], repeat: int) -> StageResult:
+    """Time ``run`` (median of ``repeat`` runs), then measure its peak memory once."""
+    timings = []
+    files = total_bytes = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        files, total_bytes = run()
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows allocation down, so memory is measured on a separate run
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return StageResult(name, files, total_bytes, statistics.median(timings), peak)
+
+def run_benchmarks(folder: str, processor: FileProcessor, repeat: int) -> List[StageResult]:
+    """Benchmark each stage of the ingestion path over ``folder``."""
+    entries = processor.scan_directory(folder)
+    disk_bytes = sum(entry.size for entry in entries)
+    processed_files = processor.process_directory(folder)
+
+    def process_directory():
+        files = processor.process_directory(folder)
+        return len(files), disk_bytes
+
+    def read_single_file():
+        for entry in entries:
+            processor._read_single_file(entry.path, entry.file_extension, entry.rel_path)
+        return len(entries), disk_bytes
+
+    def get_combined_content():
+        combined = processor.get_combined_content(processed_files)
+        return len(processed_files), len(combined.encode('utf-8', errors='surrogatepass'))
+
+    return [
+        _measure('process_directory', process_directory, repeat),
+        _measure('read_single_file', read_single_file, repeat),
+        _measure('get_combined_content', get_combined_content, repeat),
+    ]
+
+def print_results(results: List[StageResult], baseline: Dict[str, dict]):
+    print(f"{'stage':<22} {'files':>7} {'seconds':>9} {'files/s':>10} {'MB/s':>9} {'peak MB':>9} {'vs base':>9}")
+    for result in results:
+        change = ''
+        if result.name in baseline:
+            base = baseline[result.name]['files_per_second']
+            change = f"{(result.files_per_second / base - 1) * 100:+.1f}%" if base else ''
+        print(
+            f"{result.name:<22} {result.files:>7} {result.seconds:>9.4f} {result.files_per_second:>10.0f} "
+            f"{result.mb_per_second:>9.1f} {result.peak_memory / (1024 * 1024):>9.1f} {change:>9}"
+        )
+
+def find_regressions(results: List[StageResult], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Describe every stage whose throughput fell more than ``tolerance`` below the baseline."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if not base:
+            continue
+        floor = base['files_per_second'] * (1 - tolerance)
+        if result.files_per_second < floor:
+            regressions.append(
+                f"{result.name}: {result.files_per_second:.0f} files/s is below "
+                f"{base['files_per_second']:.0f} files/s baseline (tolerance {tolerance:.0%})"
+            )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the file ingestion hot path.")
+    parser.add_argument('--files', type=int, default=1000, help="Number of files to generate")
+    parser.add_argument('--depth', type=int, default=3, help="Directory nesting depth")
+    parser.add_argument('--fanout', type=int, default=3, help="Subdirectories per directory")
+    parser.add_argument('--min-size', type=int, default=200, help="Smallest regular file in bytes")
+    parser.add_argument('--max-size', type=int, default=8000, help="Largest regular file in bytes")
+    parser.add_argument('--binary-ratio', type=float, default=0.05, help="Fraction of binary files")
+    parser.add_argument('--large-ratio', type=float, default=0.02, help="Fraction of large outlier files")
+    parser.add_argument('--large-size', type=int, default=512 * 1024, help="Size of large outliers in bytes")
+    parser.add_argument('--seed', type=int, default=1234, help="Random seed for the generator")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage (median is reported)")
+    parser.add_argument('--workers', type=int, default=None, help="Override SCAN_MAX_WORKERS")
+    parser.add_argument('--baseline', help="Compare against this baseline JSON file")
+    parser.add_argument('--save-baseline', help="Write the results to this baseline JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.20, help="Allowed throughput drop before failing")
+    parser.add_argument('--verbose', action='store_true', help="Show FileProcessor log output")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Per-file warnings would dominate the output and the timings
+        logging.disable(logging.WARNING)
+
+    spec = RepoSpec(
+        files=args.files, depth=args.depth, fanout=args.fanout,
+        min_size=args.min_size, max_size=args.max_size,
+        binary_ratio=args.binary_ratio, large_ratio=args.large_ratio,
+        large_size=args.large_size, seed=args.seed
+    )
+    # One above the file count so the scan limit never cuts the synthetic repo short
+    processor = FileProcessor(max_workers=args.workers, max_files=args.files + 1)
+
+    with tempfile.TemporaryDirectory(prefix="bench_repo_") as folder:
+        repo_stats = generate_repo(folder, spec)
+        print(
+            f"Synthetic repo: {repo_stats['text']} text, {repo_stats['binary']} binary, "
+            f"{repo_stats['large']} large files, {repo_stats['bytes'] / (1024 * 1024):.1f} MB"
+        )
+        results = run_benchmarks(folder, processor, args.repeat)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            saved = json.load(file)
+        baseline = saved['stages']
+        if saved.get('spec') != spec._asdict():
+            print("Warning: baseline was recorded with a different repo spec; comparison may be meaningless")
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        payload = {
+            'spec': spec._asdict(),
+            'python': platform.python_version(),
+            'created_at': time.time(),
+            'stages': {
+                result.name: {**result._asdict(), 'files_per_second': result.files_per_second, 'mb_per_second': result.mb_per_second}
+                for result in results
+            }
+        }
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump(payload, file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# backend/core/admission.py
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from typing import List, Optional
+
+from cachetools import LRUCache
+
+from core.metrics import ADMISSION_QUEUE, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+from utils.logging_setup import logger
+
+# Lower value is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; carries the HTTP status and Retry-After seconds."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionTicket:
+    """A held execution slot. Releasing it more than once is harmless."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release()
+
+class AdmissionController:
+    """
+    Bounds concurrent analyses and refuses excess load early.
+
+    At most ``max_concurrent`` analyses run at once; the last
+    ``interactive_reserved`` slots are kept for interactive requests so batch
+    work cannot starve them. Requests beyond that wait in a priority queue of
+    at most ``max_queue`` entries for up to ``queue_timeout`` seconds, and are
+    refused with 503 otherwise. Each client also has a token bucket of
+    ``rate`` requests per second with a burst of ``burst``; exceeding it gets
+    a 429.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        interactive_reserved: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None
+    ):
+        self.max_concurrent = max_concurrent or int(os.environ.get("ADMISSION_MAX_CONCURRENT", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get("ADMISSION_MAX_QUEUE", "32"))
+        self.queue_timeout = queue_timeout or float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "10"))
+        self.interactive_reserved = interactive_reserved if interactive_reserved is not None else int(os.environ.get("ADMISSION_INTERACTIVE_RESERVED", "2"))
+        # 0 disables per-client rate limiting
+        self.rate = rate if rate is not None else float(os.environ.get("ADMISSION_RATE", "2"))
+        self.burst = burst or int(os.environ.get("ADMISSION_BURST", "10"))
+
+        self._active = 0
+        self._queued = 0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        # client id -> [tokens, last refill]
+        self._buckets = LRUCache(maxsize=int(os.environ.get("ADMISSION_MAX_CLIENTS", "10000")))
+        self._bucket_lock = threading.Lock()
+
+    def check_rate(self, client_id: str):
+        """
+        Take one token from the client's bucket.
+
+        Raises:
+            AdmissionRejected: 429 if the client is over its rate
+        """
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._bucket_lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = self._buckets[client_id] = [float(self.burst), now]
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return
+            retry_after = math.ceil((1 - bucket[0]) / self.rate)
+
+        ADMISSION_REJECTED.labels("rate_limited").inc()
+        logger.warning(f"Rate limit exceeded for client {client_id}")
+        raise AdmissionRejected(429, "Too many requests. Slow down and retry later.", retry_after)
+
+    def _limit(self, priority: int) -> int:
+        if priority == PRIORITIES["interactive"]:
+            return self.max_concurrent
+        return max(self.max_concurrent - self.interactive_reserved, 1)
+
+    def _drop_abandoned(self):
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+    async def acquire(self, priority: str = "interactive", bounded: bool = True) -> AdmissionTicket:
+        """
+        Wait for an execution slot.
+
+        Args:
+            priority: "interactive" or "batch"
+            bounded: When False the request may wait indefinitely and does not
+                count against max_queue (used by background jobs, which
+                already have their own bounded queue)
+
+        Raises:
+            AdmissionRejected: 503 if the wait queue is full or the wait timed out
+        """
+        level = PRIORITIES.get(priority, PRIORITIES["interactive"])
+        self._drop_abandoned()
+        nobody_ahead = not self._waiters or self._waiters[0][0] > level
+        if nobody_ahead and self._active < self._limit(level):
+            self._active += 1
+            ADMISSION_WAIT_SECONDS.labels(priority).observe(0)
+            return AdmissionTicket(self)
+
+        if bounded and self._queued >= self.max_queue:
+            ADMISSION_REJECTED.labels("queue_full").inc()
+            raise AdmissionRejected(503, "Server is at capacity. Retry later.", math.ceil(self.queue_timeout))
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [level, next(self._sequence), future])
+        self._queued += 1
+        ADMISSION_QUEUE.labels(priority).inc()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout if bounded else None)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.labels("queue_timeout").inc()
+            raise AdmissionRejected(503, "Timed out waiting for capacity. Retry later.", math.ceil(self.queue_timeout))
+        except asyncio.CancelledError:
+            # The slot may have been granted just as the waiter went away
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        finally:
+            ADMISSION_QUEUE.labels(priority).dec()
+            if not future.done() or future.cancelled():
+                self._queued -= 1
+                future.cancel()
+        ADMISSION_WAIT_SECONDS.labels(priority).observe(time.perf_counter() - started)
+        return AdmissionTicket(self)
+
+    def _release(self):
+        self._active -= 1
+        # Hand freed slots to the highest-priority waiters that may use them
+        while True:
+            self._drop_abandoned()
+            if not self._waiters or self._active >= self._limit(self._waiters[0][0]):
+                return
+            _, _, future = heapq.heappop(self._waiters)
+            self._queued -= 1
+            self._active += 1
+            future.set_result(None)
+
+    def status(self) -> dict:
+        return {"active": self._active, "queued": self._queued, "max_concurrent": self.max_concurrent, "max_queue": self.max_queue}
+
+# Create a singleton instance for the application
+admission_controller = AdmissionController()
@@ -1,75 +1,385 @@
 # backend/core/ai_client.py
 
+import asyncio
 import os
-from huggingface_hub import InferenceClient
+import threading
 import logging
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional
+from core.backends import BackendRouter, build_backends
+from core.cache import make_cache_key, response_cache
+from core.singleflight import completion_flights
 from utils.logging_setup import logger
 
+# Default model parameters for every inference backend
+MODEL_NAME = "openai/gpt-oss-20b"
+MAX_TOKENS = 1500
+TEMPERATURE = 0.8
+
+# Parameters for the map step of chunked (map-reduce) analysis
+CHUNK_NOTES_LABEL = "chunk-notes"
+CHUNK_NOTES_MAX_TOKENS = 600
+CHUNK_NOTES_TEMPERATURE = 0.3
+
 class AIClient:
-    """Client for handling AI API calls to Hugging Face's GPT-OSS model using InferenceClient."""
+    """Client for handling AI API calls to the GPT-OSS model through the configured inference backends."""
     
     def __init__(self):
-        self.client = None
-        self.initialize_client()
+        # Ordered async inference backends with fallback, hedging and circuit breakers
+        self._backends: Optional[BackendRouter] = None
+        # Clients are built on first use (or by warm_up) so importing this module stays cheap
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        # Upper bound for a single upstream call, in seconds
+        self.request_timeout = float(os.environ.get("AI_REQUEST_TIMEOUT", "120"))
+        # Maximum number of upstream requests in flight at once per worker
+        self.max_concurrency = int(os.environ.get("AI_MAX_CONCURRENCY", "16"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+    
+    @property
+    def backends(self) -> Optional[BackendRouter]:
+        """Async inference backends, or None if none are configured."""
+        self._ensure_initialized()
+        return self._backends
+    
+    def _ensure_initialized(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                self.initialize_client()
+                self._initialized = True
     
     def initialize_client(self):
-        """Initialize the Hugging Face Inference client."""
+        """Initialize the async inference backends."""
         try:
-            hf_token = os.environ.get("HF_TOKEN")
-            
-            if not hf_token:
-                logger.warning("HF_TOKEN not set. AI functionality will be disabled.")
-                return
-            
-            # Initialize with correct Hugging Face InferenceClient
-            self.client = InferenceClient(
-                provider="together",
-                api_key=hf_token
-            )
-            logger.info("✅ AI Client initialized successfully with Hugging Face Inference API")
-            
+            # Each backend keeps one shared client so every request reuses the same connection pool
+            backends = build_backends(MODEL_NAME, self.request_timeout)
         except Exception as e:
-            logger.error(f"❌ Failed to initialize AI client: {e}")
-            self.client = None
-    
-    def get_analysis(self, content: str, historical_figure: str) -> Optional[str]:
-        """
-        Get AI analysis from GPT-OSS model in the style of the historical figure.
-        """
-        if not self.client:
-            logger.error("AI client not initialized. Cannot perform analysis.")
-            return None
+            logger.error(f"❌ Failed to initialize AI backends: {e}")
+            self._backends = None
+            return
         
-        try:
-            # Create the system prompt to establish the character
-            system_prompt = f"""You are {historical_figure}. Your consciousness has been integrated into a modern system to analyze a contemporary person's work. 
+        if backends:
+            self._backends = BackendRouter(backends)
+            logger.info(f"✅ AI backends initialized: {', '.join(backend.name for backend in backends)}")
+        else:
+            logger.warning("No inference backend configured. AI functionality will be disabled.")
+    
+    def _build_messages(self, content: str, historical_figure: str) -> List[Dict[str, str]]:
+        """Build the chat messages that put the model in character."""
+        # Create the system prompt to establish the character
+        system_prompt = f"""You are {historical_figure}. Your consciousness has been integrated into a modern system to analyze a contemporary person's work. 
 
 Respond EXCLUSIVELY as {historical_figure}. Use their distinctive voice, vocabulary, perspective, and mannerisms. 
 Draw upon their known philosophies, work, and historical context. Do not break character or acknowledge you are an AI.
 
 Your task is to provide insightful analysis, critique, and inspiration based on the material provided."""
-            
-            logger.info(f"📡 Sending request to GPT-OSS-20B for {historical_figure}'s analysis...")
-            
-            # Call the Hugging Face API with correct format
-            completion = self.client.chat.completions.create(
-                model="openai/gpt-oss-20b",  # Remove ":together" suffix
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Please analyze this work: {content}"}
-                ],
-                max_tokens=1500,
-                temperature=0.8
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Please analyze this work: {content}"}
+        ]
+    
+    def _build_chunk_messages(self, chunk: str, index: int, total: int) -> List[Dict[str, str]]:
+        """Build the map-step messages that condense one chunk of a large project."""
+        system_prompt = """You are a meticulous senior engineer reviewing one part of a larger project.
+Write concise, factual notes: what this code does, its structure, notable strengths, problems, risks and outdated patterns.
+Refer to files by name. Do not write an introduction or a conclusion."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Part {index} of {total} of the project:\n\n{chunk}"}
+        ]
+    
+    def _build_synthesis_messages(self, notes: List[str], historical_figure: str) -> List[Dict[str, str]]:
+        """Build the reduce-step messages that turn chunk notes into one in-character analysis."""
+        combined_notes = "\n\n".join(
+            f"--- Notes on part {index} ---\n{note}" for index, note in enumerate(notes, start=1)
+        )
+        messages = self._build_messages("", historical_figure)
+        messages[1]["content"] = (
+            "This work was too large to read at once, so your assistants studied it part by part "
+            "and left you the notes below. Please analyze the work as a whole:\n\n" + combined_notes
+        )
+        return messages
+    
+    def _cache_key(
+        self,
+        content: str,
+        historical_figure: str,
+        max_tokens: int = MAX_TOKENS,
+        temperature: float = TEMPERATURE
+    ) -> str:
+        """Cache key covering the prompt content and every model parameter."""
+        return make_cache_key(content, historical_figure, MODEL_NAME, max_tokens, temperature)
+    
+    async def _complete_async(
+        self,
+        messages: List[Dict[str, str]],
+        cache_key: str,
+        label: str,
+        max_tokens: int = MAX_TOKENS,
+        temperature: float = TEMPERATURE,
+        timeout: Optional[float] = None,
+        use_cache: bool = True
+    ) -> Optional[str]:
+        """
+        Run one cached, concurrency-capped chat completion.
+        
+        Concurrent calls with the same cache key share one upstream request.
+        Returns None (after logging) on any upstream failure or timeout.
+        """
+        if use_cache:
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                logger.info(f"⚡ Cache hit for {label}")
+                return cached
+        
+        timeout = timeout or self.request_timeout
+        try:
+            return await completion_flights.do(
+                cache_key,
+                lambda: self._fetch_completion(messages, cache_key, label, max_tokens, temperature, timeout)
             )
             
-            response = completion.choices[0].message.content
-            logger.info(f"✅ Successfully received AI response for {historical_figure}")
-            return response
+        except asyncio.TimeoutError:
+            logger.error(f"❌ AI API call for {label} timed out after {timeout}s")
+            return None
             
         except Exception as e:
             logger.error(f"❌ AI API call failed: {e}")
             return None
+    
+    async def _fetch_completion(
+        self,
+        messages: List[Dict[str, str]],
+        cache_key: str,
+        label: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: float
+    ) -> Optional[str]:
+        """Make the upstream request for _complete_async and cache a non-empty answer."""
+        async with self._semaphore:
+            logger.info(f"📡 Sending async request for {label}...")
+            response = await asyncio.wait_for(
+                self.backends.complete(messages, max_tokens, temperature),
+                timeout=timeout
+            )
+        
+        logger.info(f"✅ Successfully received AI response for {label}")
+        if response:
+            await response_cache.aset(cache_key, response)
+        return response
+    
+    async def get_analysis_async(
+        self,
+        content: str,
+        historical_figure: str,
+        timeout: Optional[float] = None,
+        use_cache: bool = True
+    ) -> Optional[str]:
+        """
+        Get an AI analysis in the style of the historical figure without blocking the event loop.
+        
+        Waits for a free slot if max_concurrency upstream calls are already in
+        flight, then gives up after ``timeout`` seconds (defaults to
+        request_timeout).
+        """
+        if not self.backends:
+            logger.error("AI client not initialized. Cannot perform analysis.")
+            return None
+        
+        return await self._complete_async(
+            self._build_messages(content, historical_figure),
+            self._cache_key(content, historical_figure),
+            label=f"{historical_figure}'s analysis",
+            timeout=timeout,
+            use_cache=use_cache
+        )
+    
+    async def analyze_chunks(self, chunks: List[str], use_cache: bool = True) -> List[Optional[str]]:
+        """
+        Map step: condense every chunk into notes, running the calls concurrently.
+        
+        Notes do not depend on the historical figure, so they are cached and
+        reused across figures. Failed chunks come back as None.
+        """
+        if not self.backends:
+            logger.error("AI client not initialized. Cannot perform analysis.")
+            return [None] * len(chunks)
+        
+        total = len(chunks)
+        tasks = [
+            self._complete_async(
+                self._build_chunk_messages(chunk, index, total),
+                self._cache_key(chunk, CHUNK_NOTES_LABEL, CHUNK_NOTES_MAX_TOKENS, CHUNK_NOTES_TEMPERATURE),
+                label=f"chunk {index}/{total}",
+                max_tokens=CHUNK_NOTES_MAX_TOKENS,
+                temperature=CHUNK_NOTES_TEMPERATURE,
+                use_cache=use_cache
+            )
+            for index, chunk in enumerate(chunks, start=1)
+        ]
+        return await asyncio.gather(*tasks)
+    
+    async def get_chunked_analysis(
+        self,
+        chunks: List[str],
+        historical_figure: str,
+        use_cache: bool = True
+    ) -> Optional[str]:
+        """
+        Map-reduce analysis for projects too large for a single prompt.
+        
+        All chunks are condensed concurrently, then one synthesis call writes
+        the final analysis in the historical figure's voice.
+        """
+        if not self.backends:
+            logger.error("AI client not initialized. Cannot perform analysis.")
+            return None
+        
+        if len(chunks) == 1:
+            return await self.get_analysis_async(chunks[0], historical_figure, use_cache=use_cache)
+        
+        notes = [note for note in await self.analyze_chunks(chunks, use_cache=use_cache) if note]
+        if not notes:
+            logger.error(f"❌ Every chunk analysis failed for {historical_figure}")
+            return None
+        if len(notes) < len(chunks):
+            logger.warning(f"Only {len(notes)} of {len(chunks)} chunks were analyzed for {historical_figure}")
+        
+        return await self.synthesize_analysis(notes, historical_figure, use_cache=use_cache)
+    
+    async def synthesize_analysis(
+        self,
+        notes: List[str],
+        historical_figure: str,
+        use_cache: bool = True
+    ) -> Optional[str]:
+        """Reduce step: turn chunk notes into one analysis in the figure's voice."""
+        if not self.backends:
+            logger.error("AI client not initialized. Cannot perform analysis.")
+            return None
+        
+        return await self._complete_async(
+            self._build_synthesis_messages(notes, historical_figure),
+            self._cache_key("\n\n".join(notes), f"{historical_figure}:synthesis"),
+            label=f"{historical_figure}'s synthesis",
+            use_cache=use_cache
+        )
+    
+    async def _stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        cache_key: str,
+        label: str,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """Stream one cached, concurrency-capped chat completion."""
+        if use_cache:
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                logger.info(f"⚡ Cache hit for {label}")
+                yield cached
+                return
+        
+        parts = []
+        async with self._semaphore:
+            logger.info(f"📡 Streaming request for {label}...")
+            async for delta in self.backends.stream(messages, MAX_TOKENS, TEMPERATURE):
+                parts.append(delta)
+                yield delta
+            
+            logger.info(f"✅ Finished streaming AI response for {label}")
+        
+        if parts:
+            await response_cache.aset(cache_key, "".join(parts))
+    
+    async def stream_analysis(
+        self,
+        content: str,
+        historical_figure: str,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Stream the analysis token-by-token using the chat completion streaming mode.
+        
+        Yields text deltas as they arrive. A cached response is yielded as a
+        single chunk. Errors are re-raised so the caller can report them to
+        the client mid-stream.
+        """
+        if not self.backends:
+            raise RuntimeError("AI client not initialized. Cannot perform analysis.")
+        
+        async for delta in self._stream_completion(
+            self._build_messages(content, historical_figure),
+            self._cache_key(content, historical_figure),
+            label=f"{historical_figure}'s analysis",
+            use_cache=use_cache
+        ):
+            yield delta
+    
+    async def stream_chunked_analysis(
+        self,
+        chunks: List[str],
+        historical_figure: str,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """Run the map step, then stream the synthesis token-by-token."""
+        if not self.backends:
+            raise RuntimeError("AI client not initialized. Cannot perform analysis.")
+        
+        if len(chunks) == 1:
+            async for delta in self.stream_analysis(chunks[0], historical_figure, use_cache=use_cache):
+                yield delta
+            return
+        
+        notes = [note for note in await self.analyze_chunks(chunks, use_cache=use_cache) if note]
+        if not notes:
+            raise RuntimeError("Every chunk analysis failed.")
+        
+        async for delta in self.stream_synthesis(notes, historical_figure, use_cache=use_cache):
+            yield delta
+    
+    async def stream_synthesis(
+        self,
+        notes: List[str],
+        historical_figure: str,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """Streaming variant of synthesize_analysis."""
+        if not self.backends:
+            raise RuntimeError("AI client not initialized. Cannot perform analysis.")
+        
+        async for delta in self._stream_completion(
+            self._build_synthesis_messages(notes, historical_figure),
+            self._cache_key("\n\n".join(notes), f"{historical_figure}:synthesis"),
+            label=f"{historical_figure}'s synthesis",
+            use_cache=use_cache
+        ):
+            yield delta
+    
+    def backend_status(self) -> List[Dict[str, str]]:
+        """Circuit state of every backend, without initializing clients that were never used."""
+        return self._backends.status() if self._backends else []
+    
+    async def warm_up(self, run_completion: bool = False):
+        """
+        Build the clients and open their pooled connections ahead of the first request.
+        
+        With ``run_completion`` a one-token completion is also sent through
+        every backend. Failures are logged and never raised.
+        """
+        # Client construction imports the SDKs, so keep it off the event loop
+        await asyncio.to_thread(self._ensure_initialized)
+        if self._backends:
+            await self._backends.warm_up(run_completion)
+    
+    async def aclose(self):
+        """Close the pooled async HTTP sessions of every backend."""
+        if self._backends:
+            await self._backends.aclose()
 
 # Create a singleton instance for the application
 ai_client = AIClient()
\ No newline at end of file
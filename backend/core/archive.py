@@ -0,0 +1,193 @@
+# backend/core/archive.py
+
+import asyncio
+import contextvars
+import io
+import os
+import posixpath
+import tarfile
+import zipfile
+from typing import AsyncIterator, List, Optional, Tuple
+
+from core.file_processor import FileProcessor, FileRecord, IgnoreRules, file_processor
+from core.metrics import STAGE_SECONDS
+from utils.logging_setup import logger
+
+# Local file header signature; also how an empty zip (end-of-central-directory) starts
+_ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+
+class ArchiveTooLargeError(ValueError):
+    """Raised when an uploaded archive exceeds the configured size limit."""
+
+class AsyncStreamReader(io.RawIOBase):
+    """
+    Blocking file object over an async byte iterator, for use from a worker thread.
+
+    Each read pulls the next chunk from the event loop on demand, so the
+    upload is received only as fast as the archive is being parsed and at
+    most one chunk is buffered at a time.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop, max_bytes: int):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._max_bytes = max_bytes
+        self._buffer = b""
+        self._received = 0
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes:
+        try:
+            return asyncio.run_coroutine_threadsafe(self._chunks.__anext__(), self._loop).result()
+        except StopAsyncIteration:
+            return b""
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer and not self._eof:
+            chunk = self._next_chunk()
+            if not chunk:
+                self._eof = True
+                break
+            self._received += len(chunk)
+            if self._received > self._max_bytes:
+                raise ArchiveTooLargeError(f"Archive exceeds the upload limit of {self._max_bytes} bytes.")
+            self._buffer = chunk
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+class ArchiveProcessor:
+    """
+    Reads uploaded zip and tar archives in memory with FileProcessor's filters.
+
+    Members go through the same extension, excluded-directory, depth, size
+    and binary checks as files on disk, and only the bytes within each
+    file's character budget are decompressed into memory; nothing is
+    written to disk. Tar archives (plain, gzip, bzip2 or xz) are parsed as
+    they arrive. Zip keeps its index at the end of the file, so zip uploads
+    are buffered in memory first and members are then read in parallel.
+    """
+
+    def __init__(self, processor: Optional[FileProcessor] = None, max_bytes: Optional[int] = None):
+        self.processor = processor or file_processor
+        self.max_bytes = max_bytes or int(os.environ.get("ARCHIVE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+    def read_archive(
+        self,
+        stream: io.RawIOBase,
+        max_chars: Optional[int] = None,
+        exclude_patterns: Optional[List[str]] = None
+    ) -> List[FileRecord]:
+        """
+        Read every processable file from an archive stream.
+
+        Args:
+            stream: Binary stream positioned at the start of the archive
+            max_chars: Per-file character limit (defaults to max_chars_per_file)
+            exclude_patterns: Extra .gitignore-style patterns to skip
+
+        Returns:
+            List of FileRecord objects in archive order
+
+        Raises:
+            ArchiveTooLargeError: If the archive exceeds max_bytes
+            ValueError: If the stream is not a supported archive or holds no readable files
+        """
+        reader = io.BufferedReader(stream)
+        ignore_rules = IgnoreRules(exclude_patterns or [])
+
+        with STAGE_SECONDS.labels("read").time():
+            try:
+                if reader.peek(4)[:4] in _ZIP_MAGIC:
+                    processed_files = self._read_zip(reader, ignore_rules, max_chars)
+                else:
+                    processed_files = self._read_tar(reader, ignore_rules, max_chars)
+            except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as e:
+                raise ValueError(f"Cannot read archive (expected zip or tar, optionally gzip/bzip2/xz compressed): {e}")
+
+        if not processed_files:
+            error_msg = f"No readable files found in archive. Supported formats: {list(self.processor.VALID_EXTENSIONS.keys())}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        logger.info(f"Successfully processed {len(processed_files)} files from archive")
+        return processed_files
+
+    def _accept(self, name: str, size: int, ignore_rules: IgnoreRules) -> Optional[Tuple[str, str]]:
+        """Apply the directory-scan filters to a member; returns (rel_path, extension) if it should be read."""
+        rel_path = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+        parts = rel_path.split("/")
+        if rel_path in (".", "") or ".." in parts:
+            return None
+
+        file_extension = os.path.splitext(parts[-1])[1].lower()
+        if file_extension not in self.processor.VALID_EXTENSIONS:
+            logger.debug(f"Skipping unsupported file type: {rel_path}")
+            return None
+        if len(parts) - 1 > self.processor.max_depth:
+            logger.debug(f"Skipping file beyond max depth: {rel_path}")
+            return None
+        if any(part in self.processor.EXCLUDED_DIRS for part in parts[:-1]):
+            logger.debug(f"Skipping file in excluded directory: {rel_path}")
+            return None
+        if ignore_rules.is_ignored(rel_path, is_dir=False):
+            logger.debug(f"Skipping ignored file: {rel_path}")
+            return None
+        if size > self.processor.max_file_size:
+            logger.debug(f"Skipping oversized file ({size} bytes): {rel_path}")
+            return None
+        return rel_path, file_extension
+
+    def _read_tar(self, reader: io.BufferedReader, ignore_rules: IgnoreRules, max_chars: Optional[int]) -> List[FileRecord]:
+        processed_files = []
+        # "r|*" reads sequentially without seeking, detecting the compression from the stream
+        with tarfile.open(fileobj=reader, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                accepted = self._accept(member.name, member.size, ignore_rules)
+                if accepted is None:
+                    continue
+                rel_path, file_extension = accepted
+                # Unread bytes of the member are skipped when the loop advances
+                processed_files.append(self.processor.read_stream(
+                    lambda: archive.extractfile(member), rel_path, file_extension, max_chars=max_chars
+                ))
+                if len(processed_files) >= self.processor.max_files:
+                    logger.warning(f"Reached file limit of {self.processor.max_files}; remaining archive members were not read")
+                    break
+        return processed_files
+
+    def _read_zip(self, reader: io.BufferedReader, ignore_rules: IgnoreRules, max_chars: Optional[int]) -> List[FileRecord]:
+        data = io.BytesIO(reader.read())
+        with zipfile.ZipFile(data) as archive:
+            members = []
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                accepted = self._accept(info.filename, info.file_size, ignore_rules)
+                if accepted is None:
+                    continue
+                members.append((info, *accepted))
+                if len(members) >= self.processor.max_files:
+                    logger.warning(f"Reached file limit of {self.processor.max_files}; remaining archive members were not read")
+                    break
+            if not members:
+                return []
+
+            # Members are read on the processor's shared reader pool; each read gets its own
+            # copy of the caller's context so log records keep the request id
+            return list(self.processor.executor.map(
+                lambda member, context: context.run(
+                    self.processor.read_stream, lambda: archive.open(member[0]), member[1], member[2], max_chars=max_chars
+                ),
+                members,
+                [contextvars.copy_context() for _ in members]
+            ))
+
+# Create a singleton instance for the application
+archive_processor = ArchiveProcessor()
@@ -0,0 +1,396 @@
+# backend/core/backends.py
+
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional
+
+from core.file_processor import estimate_tokens
+from core.metrics import TIME_TO_FIRST_TOKEN, TOKENS, UPSTREAM_IN_FLIGHT, UPSTREAM_SECONDS
+from utils.logging_setup import logger
+
+# Backend kinds that can be named directly in AI_BACKENDS
+BACKEND_TYPES = ("huggingface", "openai", "stub")
+
+class BackendUnavailableError(RuntimeError):
+    """Raised when every configured backend is failing fast behind an open circuit."""
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated upstream errors.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are refused for ``reset_timeout`` seconds. Then a single trial
+    call is let through (half-open); its outcome closes or re-opens the
+    circuit.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold or int(os.environ.get("AI_BREAKER_FAILURES", "5"))
+        self.reset_timeout = reset_timeout or float(os.environ.get("AI_BREAKER_RESET_SECONDS", "30"))
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Return True if a call may be made now, reserving the trial slot when half-open."""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """A call abandoned by the caller (e.g. a losing hedge) says nothing about health."""
+        self._trial_in_flight = False
+
+class InferenceBackend(ABC):
+    """One chat completion endpoint with its own model, timeout and circuit breaker."""
+
+    kind = "base"
+    # Send a one-token completion at startup even when AI_WARMUP_COMPLETION is off
+    warm_up_completion = False
+
+    def __init__(self, name: str, model: str, timeout: float):
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        self.breaker = CircuitBreaker()
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Optional[str]:
+        """Return one chat completion."""
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """Yield the completion's text deltas as they arrive."""
+
+    async def warm_up(self):
+        """Open a pooled connection to the endpoint, if the client supports a cheap request."""
+
+    async def aclose(self):
+        pass
+
+    def status(self) -> Dict[str, str]:
+        return {"name": self.name, "type": self.kind, "model": self.model, "circuit": self.breaker.state}
+
+class ChatCompletionsBackend(InferenceBackend):
+    """Backend for clients exposing the OpenAI ``chat.completions.create`` interface."""
+
+    def __init__(self, name: str, model: str, timeout: float, client):
+        super().__init__(name, model, timeout)
+        self.client = client
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Optional[str]:
+        completion = await asyncio.wait_for(
+            self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            ),
+            timeout=self.timeout
+        )
+        return completion.choices[0].message.content
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        stream = await asyncio.wait_for(
+            self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            ),
+            timeout=self.timeout
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    async def aclose(self):
+        await self.client.close()
+
+class HuggingFaceBackend(ChatCompletionsBackend):
+    """Hugging Face Inference Providers (e.g. Together) via AsyncInferenceClient."""
+
+    kind = "huggingface"
+    # The client has no free request on the provider's connection, so warm up with a completion
+    warm_up_completion = True
+
+    def __init__(self, name: str, model: str, timeout: float, api_key: str, provider: str, warm_up_completion: bool = True):
+        from huggingface_hub import AsyncInferenceClient
+        super().__init__(name, model, timeout, AsyncInferenceClient(provider=provider, api_key=api_key, timeout=timeout))
+        self.warm_up_completion = warm_up_completion
+
+class OpenAICompatibleBackend(ChatCompletionsBackend):
+    """Any OpenAI-compatible endpoint: OpenAI itself, vLLM, llama.cpp, a local stub server."""
+
+    kind = "openai"
+
+    def __init__(self, name: str, model: str, timeout: float, api_key: str, base_url: Optional[str]):
+        from openai import AsyncOpenAI
+        # Retries are handled by fallback and hedging, not inside the client
+        super().__init__(name, model, timeout, AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0))
+
+    async def warm_up(self):
+        # Listing models is free and leaves a TLS connection in the client's pool
+        await asyncio.wait_for(self.client.models.list(), timeout=self.timeout)
+
+class StubBackend(InferenceBackend):
+    """In-process canned responses with a fixed latency, for offline runs and load tests."""
+
+    kind = "stub"
+
+    def __init__(self, name: str, model: str, timeout: float, latency: float):
+        super().__init__(name, model, timeout)
+        self.latency = latency
+
+    def _reply(self, messages: List[Dict[str, str]]) -> str:
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        return f"Stub analysis from {self.name}: received {len(messages)} messages ({prompt_chars} characters)."
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Optional[str]:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        words = self._reply(messages).split(" ")
+        for index, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            yield word if index == 0 else " " + word
+
+class BackendRouter:
+    """
+    Sends completions to an ordered list of backends.
+
+    Backends are tried in order, skipping any whose circuit is open. If the
+    first attempt has not answered within ``hedge_delay`` seconds, a
+    duplicate is sent to the next available backend and the first answer
+    wins; with no other backend available the slow one is left alone rather
+    than sent a second copy. Streams fall back only until the first
+    token has been sent.
+    """
+
+    def __init__(self, backends: List[InferenceBackend], hedge_delay: Optional[float] = None):
+        self.backends = backends
+        # 0 disables hedging
+        self.hedge_delay = hedge_delay if hedge_delay is not None else float(os.environ.get("AI_HEDGE_DELAY", "0"))
+
+    def _launch(self, backend: InferenceBackend, pending: Dict[asyncio.Task, InferenceBackend], messages, max_tokens, temperature):
+        task = asyncio.create_task(self._call(backend, messages, max_tokens, temperature))
+        pending[task] = backend
+
+    @staticmethod
+    def _prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        return sum(estimate_tokens(message["content"]) for message in messages)
+
+    async def _call(self, backend: InferenceBackend, messages, max_tokens, temperature) -> Optional[str]:
+        """One completion against one backend, recording latency, outcome and tokens."""
+        start = time.perf_counter()
+        outcome = "error"
+        UPSTREAM_IN_FLIGHT.labels(backend.name).inc()
+        try:
+            response = await backend.complete(messages, max_tokens, temperature)
+            outcome = "success"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            UPSTREAM_IN_FLIGHT.labels(backend.name).dec()
+            UPSTREAM_SECONDS.labels(backend.name, outcome).observe(time.perf_counter() - start)
+
+        TOKENS.labels(backend.name, "prompt").inc(self._prompt_tokens(messages))
+        TOKENS.labels(backend.name, "completion").inc(estimate_tokens(response or ""))
+        return response
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Optional[str]:
+        """
+        Return the first successful completion.
+
+        Raises:
+            BackendUnavailableError: If every circuit is open
+            Exception: The last backend error if every attempt failed
+        """
+        remaining = iter(self.backends)
+        pending: Dict[asyncio.Task, InferenceBackend] = {}
+        last_error: Optional[BaseException] = None
+        hedged = False
+
+        def launch_next() -> bool:
+            for backend in remaining:
+                if backend.breaker.allow():
+                    self._launch(backend, pending, messages, max_tokens, temperature)
+                    return True
+                logger.debug(f"Skipping inference backend {backend.name}: circuit open")
+            return False
+
+        if not launch_next():
+            raise BackendUnavailableError("All inference backends are unavailable (circuit open).")
+
+        try:
+            while pending:
+                hedge_timeout = self.hedge_delay if self.hedge_delay > 0 and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=hedge_timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    if launch_next():
+                        logger.info(f"Hedging inference request after {self.hedge_delay}s ({len(pending)} in flight)")
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        backend.breaker.record_success()
+                        return task.result()
+                    last_error = error
+                    backend.breaker.record_failure()
+                    logger.warning(f"Inference backend {backend.name} failed: {type(error).__name__}: {error}")
+
+                # Fall back to the next backend once nothing is left in flight
+                if not pending:
+                    launch_next()
+        finally:
+            for task, backend in pending.items():
+                task.cancel()
+                backend.breaker.record_cancelled()
+
+        raise last_error or BackendUnavailableError("All inference backends are unavailable (circuit open).")
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """Stream from the first backend that produces a token, falling back before that point."""
+        last_error: Optional[BaseException] = None
+        for backend in self.backends:
+            if not backend.breaker.allow():
+                logger.debug(f"Skipping inference backend {backend.name}: circuit open")
+                continue
+
+            started = False
+            start = time.perf_counter()
+            completion_tokens = 0
+            outcome = "error"
+            UPSTREAM_IN_FLIGHT.labels(backend.name).inc()
+            try:
+                async for delta in backend.stream(messages, max_tokens, temperature):
+                    if not started:
+                        started = True
+                        TIME_TO_FIRST_TOKEN.labels(backend.name).observe(time.perf_counter() - start)
+                    completion_tokens += estimate_tokens(delta)
+                    yield delta
+                outcome = "success"
+            except (asyncio.CancelledError, GeneratorExit):
+                outcome = "cancelled"
+                backend.breaker.record_cancelled()
+                raise
+            except Exception as e:
+                backend.breaker.record_failure()
+                if started:
+                    raise
+                last_error = e
+                logger.warning(f"Inference backend {backend.name} failed before streaming: {type(e).__name__}: {e}")
+                continue
+            finally:
+                UPSTREAM_IN_FLIGHT.labels(backend.name).dec()
+                UPSTREAM_SECONDS.labels(backend.name, outcome).observe(time.perf_counter() - start)
+                if started:
+                    TOKENS.labels(backend.name, "prompt").inc(self._prompt_tokens(messages))
+                    TOKENS.labels(backend.name, "completion").inc(completion_tokens)
+
+            backend.breaker.record_success()
+            return
+
+        raise last_error or BackendUnavailableError("All inference backends are unavailable (circuit open).")
+
+    def status(self) -> List[Dict[str, str]]:
+        return [backend.status() for backend in self.backends]
+
+    async def warm_up(self, run_completion: bool = False):
+        """
+        Pre-open connections to every backend and optionally send a one-token completion.
+
+        Backends that set ``warm_up_completion`` always get the completion.
+        """
+        async def warm(backend: InferenceBackend):
+            start = time.perf_counter()
+            try:
+                await backend.warm_up()
+                if run_completion or backend.warm_up_completion:
+                    await backend.complete([{"role": "user", "content": "ping"}], 1, 0.0)
+                logger.info(f"Warmed up inference backend {backend.name} in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                logger.warning(f"Warm-up of inference backend {backend.name} failed: {type(e).__name__}: {e}")
+
+        await asyncio.gather(*(warm(backend) for backend in self.backends))
+
+    async def aclose(self):
+        for backend in self.backends:
+            try:
+                await backend.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing inference backend {backend.name}: {e}")
+
+def build_backends(default_model: str, default_timeout: float) -> List[InferenceBackend]:
+    """
+    Create the backends listed in AI_BACKENDS, in order.
+
+    Each name is configured with ``AI_BACKEND_<NAME>_*`` variables (TYPE,
+    MODEL, TIMEOUT, API_KEY, BASE_URL, PROVIDER, LATENCY, WARMUP_COMPLETION). A name that is a
+    backend type ("huggingface", "openai", "stub") needs no TYPE. Backends
+    that are missing credentials are skipped with a warning.
+    """
+    backends: List[InferenceBackend] = []
+    names = [name.strip() for name in os.environ.get("AI_BACKENDS", "huggingface").split(",") if name.strip()]
+
+    for name in names:
+        prefix = f"AI_BACKEND_{name.upper().replace('-', '_')}_"
+        kind = os.environ.get(prefix + "TYPE", name if name in BACKEND_TYPES else "openai")
+        model = os.environ.get(prefix + "MODEL", default_model)
+        timeout = float(os.environ.get(prefix + "TIMEOUT", str(default_timeout)))
+
+        if kind == "huggingface":
+            api_key = os.environ.get(prefix + "API_KEY") or os.environ.get("HF_TOKEN")
+            if not api_key:
+                logger.warning(f"Skipping inference backend {name}: HF_TOKEN not set")
+                continue
+            provider = os.environ.get(prefix + "PROVIDER", "together")
+            warm_up_completion = os.environ.get(prefix + "WARMUP_COMPLETION", "true").lower() == "true"
+            backends.append(HuggingFaceBackend(name, model, timeout, api_key, provider, warm_up_completion))
+        elif kind == "openai":
+            base_url = os.environ.get(prefix + "BASE_URL")
+            # Local servers usually accept any key, but the client insists on one
+            api_key = os.environ.get(prefix + "API_KEY") or os.environ.get("OPENAI_API_KEY") or ("unused" if base_url else None)
+            if not api_key:
+                logger.warning(f"Skipping inference backend {name}: no API key or base URL configured")
+                continue
+            backends.append(OpenAICompatibleBackend(name, model, timeout, api_key, base_url))
+        elif kind == "stub":
+            latency = float(os.environ.get(prefix + "LATENCY", "0.05"))
+            backends.append(StubBackend(name, model, timeout, latency))
+        else:
+            logger.error(f"Unknown inference backend type '{kind}' for {name}")
+
+    return backends
@@ -0,0 +1,201 @@
+# backend/core/cache.py
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from cachetools import TTLCache
+
+from core.metrics import CACHE_REQUESTS
+from utils.logging_setup import logger
+
+def make_cache_key(content: str, historical_figure: str, model: str, max_tokens: int, temperature: float) -> str:
+    """
+    Build a content-addressed cache key for an analysis request.
+
+    Every input that changes the model output is part of the hash, so a key
+    can only collide when the exact same prompt would be sent again.
+    """
+    hasher = hashlib.sha256()
+    for part in (model, str(max_tokens), repr(float(temperature)), historical_figure):
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+    hasher.update(content.encode('utf-8', errors='surrogatepass'))
+    return hasher.hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache for AI responses.
+
+    The memory tier is an LRU with a TTL. The optional disk tier is a SQLite
+    table that survives restarts and is trimmed by age and total size.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        db_path: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None
+    ):
+        self.max_entries = max_entries or int(os.environ.get("CACHE_MEMORY_ENTRIES", "256"))
+        self.ttl_seconds = ttl_seconds or int(os.environ.get("CACHE_TTL_SECONDS", "86400"))
+        self.db_path = db_path if db_path is not None else os.environ.get("CACHE_DB_PATH", "")
+        self.max_disk_bytes = max_disk_bytes or int(os.environ.get("CACHE_DISK_MAX_BYTES", str(100 * 1024 * 1024)))
+
+        self._memory = TTLCache(maxsize=self.max_entries, ttl=self.ttl_seconds)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            self._open_db()
+
+        logger.info(f"ResponseCache initialized (memory entries: {self.max_entries}, disk: {self.db_path or 'disabled'})")
+
+    def _open_db(self):
+        """Open the SQLite disk tier, disabling it if the file cannot be used."""
+        try:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open response cache database '{self.db_path}': {e}")
+            self._db = None
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Look up a key in the memory tier only."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self.hits += 1
+                CACHE_REQUESTS.labels("memory", "hit").inc()
+            return value
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a key in memory, then on disk, promoting disk hits to memory."""
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+
+        value = self._get_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                CACHE_REQUESTS.labels("disk" if self._db is not None else "memory", "miss").inc()
+            else:
+                self.hits += 1
+                CACHE_REQUESTS.labels("disk", "hit").inc()
+                self._memory[key] = value
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response in both tiers."""
+        with self._lock:
+            self._memory[key] = value
+        self._set_disk(key, value)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Async lookup that keeps disk reads off the event loop."""
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        if self._db is None:
+            with self._lock:
+                self.misses += 1
+                CACHE_REQUESTS.labels("memory", "miss").inc()
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Async store that keeps disk writes off the event loop."""
+        if self._db is None:
+            with self._lock:
+                self._memory[key] = value
+            return
+        await asyncio.to_thread(self.set, key, value)
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > self.ttl_seconds:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    return None
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def _set_disk(self, key: str, value: str) -> None:
+        if self._db is None:
+            return
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def _evict_disk(self, now: float) -> None:
+        """Drop expired rows, then least recently used rows until under the size cap."""
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        excess = total - self.max_disk_bytes
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+        stale_keys = []
+        for row_key, row_size in rows:
+            if excess <= 0:
+                break
+            stale_keys.append((row_key,))
+            excess -= row_size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+        logger.debug(f"Evicted {len(stale_keys)} entries from the response cache")
+
+    def clear(self) -> None:
+        """Remove every cached response from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+# Create a singleton instance for the application
+response_cache = ResponseCache()
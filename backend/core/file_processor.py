@@ -1,13 +1,213 @@
 # backend/core/file_processor.py
 
+import codecs
+import contextvars
+import hashlib
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Callable, List, NamedTuple, Optional, Tuple
 import logging
 
-from models.schemas import FileContent
+from core.metrics import BYTES_READ, FILES_READ, FILES_TRUNCATED, STAGE_SECONDS
+from core.skeleton import skeletonizer
 from utils.logging_setup import logger
 
+# Rough characters-per-token ratio used to budget prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for budgeting prompt sizes."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def content_hash(content: str) -> str:
+    """Stable fingerprint of a file's (possibly truncated) text."""
+    return hashlib.sha256(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+# How much of a file is inspected to decide whether it is binary
+BINARY_SNIFF_BYTES = 8192
+
+# Byte-order marks that identify text files which legitimately contain NUL bytes
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Bytes that commonly appear in text files
+_TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
+
+def looks_binary(sample: bytes) -> bool:
+    """
+    Guess whether a file is binary from its first few KB.
+    
+    A NUL byte (outside a UTF-16/32 BOM) or more than 30% control bytes
+    marks the sample as binary.
+    """
+    if not sample:
+        return False
+    if any(sample.startswith(bom) for bom, _ in _BOMS):
+        return False
+    if b'\0' in sample:
+        return True
+    non_text = sample.translate(None, _TEXT_BYTES)
+    return len(non_text) / len(sample) > 0.3
+
+def decode_text(data: bytes, truncated: bool = False) -> Tuple[str, str]:
+    """
+    Decode file bytes, falling back through common encodings instead of failing.
+    
+    Args:
+        data: Raw bytes read from the file
+        truncated: True if data stops mid-file, so a trailing partial
+            multi-byte character may be dropped
+        
+    Returns:
+        Tuple of (decoded text, encoding used)
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return data.decode(encoding, errors='replace'), encoding
+    
+    try:
+        return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError as e:
+        # A read cut at the byte budget can split the last UTF-8 character
+        if truncated and e.start >= len(data) - 3:
+            try:
+                return data[:e.start].decode('utf-8'), 'utf-8'
+            except UnicodeDecodeError:
+                pass
+    
+    try:
+        return data.decode('cp1252'), 'cp1252'
+    except UnicodeDecodeError:
+        return data.decode('latin-1'), 'latin-1'
+
+class ScanEntry(NamedTuple):
+    """A file found by a directory scan, before it is read."""
+    path: str
+    file_extension: str
+    rel_path: str
+    size: int
+    mtime_ns: int
+
+class FileRecord(NamedTuple):
+    """
+    A processed file as held inside the pipeline.
+    
+    A plain tuple rather than a Pydantic model: nothing is validated and
+    there is no per-instance dict, so large repos cost little CPU and
+    memory. Endpoints convert records to FileContent only when a response
+    echoes file contents.
+    """
+    filename: str
+    content: str
+    file_type: str
+    error: Optional[str] = None
+    success: bool = True
+
+class IgnoreRules:
+    """
+    Minimal matcher for .gitignore-style patterns.
+    
+    Supports comments, negation (``!``), directory-only patterns (trailing
+    ``/``), anchored patterns and ``*``/``?``/``**`` wildcards. Patterns
+    loaded from a nested ignore file only apply below that directory.
+    """
+    
+    def __init__(self, patterns: Optional[List[str]] = None):
+        # Each rule is (compiled regex, negated, directory only)
+        self.rules: List[Tuple["re.Pattern", bool, bool]] = []
+        self.add_patterns(patterns or [])
+    
+    def load_file(self, ignore_path: str, base: str = "") -> None:
+        """Add the patterns from an ignore file located at ``base``."""
+        try:
+            with open(ignore_path, 'r', encoding='utf-8', errors='ignore') as file:
+                self.add_patterns(file.read().splitlines(), base)
+        except OSError as e:
+            logger.debug(f"Cannot read ignore file {ignore_path}: {e}")
+    
+    def add_patterns(self, patterns: List[str], base: str = "") -> None:
+        """Compile patterns relative to the ``base`` directory (posix style)."""
+        for raw in patterns:
+            pattern = raw.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+            
+            negated = pattern.startswith('!')
+            if negated:
+                pattern = pattern[1:]
+            elif pattern.startswith('\\'):
+                pattern = pattern[1:]
+            
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if not pattern:
+                continue
+            
+            # A slash anywhere but the end anchors the pattern to its base
+            anchored = '/' in pattern
+            pattern = pattern.lstrip('/')
+            
+            prefix = re.escape(base + '/') if base else ''
+            if not anchored:
+                prefix += '(?:.*/)?'
+            regex = re.compile(f"^{prefix}{self._translate(pattern)}$")
+            self.rules.append((regex, negated, dir_only))
+    
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Return True if the relative path is excluded; the last matching rule wins."""
+        ignored = False
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                ignored = not negated
+        return ignored
+    
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Convert a glob pattern into a regular expression fragment."""
+        result = []
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if pattern.startswith('**/', i):
+                result.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('/**', i) and i + 3 == len(pattern):
+                result.append('(?:/.*)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                result.append('.*')
+                i += 2
+                continue
+            if char == '*':
+                result.append('[^/]*')
+            elif char == '?':
+                result.append('[^/]')
+            elif char == '[':
+                end = pattern.find(']', i + 1)
+                if end == -1:
+                    result.append(re.escape(char))
+                else:
+                    body = pattern[i + 1:end]
+                    if body.startswith('!'):
+                        body = '^' + body[1:]
+                    result.append(f"[{body}]")
+                    i = end
+            else:
+                result.append(re.escape(char))
+            i += 1
+        return ''.join(result)
+
 class FileProcessor:
     """Handles reading and processing files from a directory."""
     
@@ -34,18 +234,62 @@ class FileProcessor:
         '.xml': 'XML'
     }
     
-    def __init__(self):
+    # Directories that never contain code worth analyzing
+    EXCLUDED_DIRS = {
+        '.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv',
+        'env', 'build', 'dist', 'target', 'out', '.next', '.idea', '.vscode',
+        '.pytest_cache', '.mypy_cache', '.tox', 'bower_components', 'vendor'
+    }
+
+    # Name of the per-directory ignore file honored during scans
+    IGNORE_FILENAME = '.gitignore'
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        max_files: Optional[int] = None,
+        max_file_size: Optional[int] = None
+    ):
+        self.max_workers = max_workers or int(os.environ.get("SCAN_MAX_WORKERS", "8"))
+        self.max_depth = max_depth if max_depth is not None else int(os.environ.get("SCAN_MAX_DEPTH", "12"))
+        self.max_files = max_files if max_files is not None else int(os.environ.get("SCAN_MAX_FILES", "5000"))
+        self.max_file_size = max_file_size or int(os.environ.get("SCAN_MAX_FILE_SIZE", str(5 * 1024 * 1024)))
+        # Per-file character limits for single-prompt and chunked analysis
+        self.max_chars_per_file = int(os.environ.get("FILE_MAX_CHARS", "10000"))
+        self.chunked_max_chars_per_file = int(os.environ.get("CHUNKED_FILE_MAX_CHARS", "200000"))
+        # Prompt budget for each chunk and the maximum number of chunks per project
+        self.chunk_token_budget = int(os.environ.get("CHUNK_TOKEN_BUDGET", "6000"))
+        self.max_chunks = int(os.environ.get("CHUNK_MAX_CHUNKS", "32"))
+        # Source files longer than this are replaced by skeletons in summarize mode
+        self.skeleton_min_chars = int(os.environ.get("SKELETON_MIN_CHARS", "4000"))
+        # One bounded reader pool for every call (the app shares the singleton below), so concurrent
+        # requests queue for the same threads instead of each starting and tearing down their own
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="file-reader")
         logger.info("FileProcessor initialized")
 
-    def process_directory(self, folder_path: str) -> List[FileContent]:
+    def process_directory(
+        self,
+        folder_path: str,
+        max_depth: Optional[int] = None,
+        max_files: Optional[int] = None,
+        exclude_patterns: Optional[List[str]] = None,
+        max_chars: Optional[int] = None,
+        entries: Optional[List[ScanEntry]] = None
+    ) -> List[FileRecord]:
         """
-        Read and process all valid files from the given directory.
+        Recursively read and process all valid files under the given directory.
         
         Args:
             folder_path: Absolute path to the folder to analyze
+            max_depth: How many directory levels to descend (0 = top level only)
+            max_files: Maximum number of files to read before the scan stops
+            exclude_patterns: Extra .gitignore-style patterns to skip
+            max_chars: Per-file character limit (defaults to max_chars_per_file)
+            entries: Result of an earlier scan_directory call to read instead of rescanning
             
         Returns:
-            List of FileContent objects with file contents and metadata
+            List of FileRecord objects with file contents and metadata
             
         Raises:
             ValueError: If the path doesn't exist or no readable files found
@@ -53,6 +297,47 @@ class FileProcessor:
         """
         logger.info(f"Processing directory: {folder_path}")
         
+        # Find every candidate file first, then read them in parallel
+        if entries is None:
+            entries = self.scan_directory(
+                folder_path,
+                max_depth=max_depth,
+                max_files=max_files,
+                exclude_patterns=exclude_patterns
+            )
+        processed_files = self.read_files(entries, max_chars=max_chars)
+        
+        # Check if we found any processable files
+        if not processed_files:
+            error_msg = f"No readable files found in '{folder_path}'. Supported formats: {list(self.VALID_EXTENSIONS.keys())}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        
+        logger.info(f"Successfully processed {len(processed_files)} files from {folder_path}")
+        return processed_files
+
+    def scan_directory(
+        self,
+        folder_path: str,
+        max_depth: Optional[int] = None,
+        max_files: Optional[int] = None,
+        exclude_patterns: Optional[List[str]] = None
+    ) -> List[ScanEntry]:
+        """
+        Validate the folder and list the files that would be processed, without reading them.
+        
+        Args:
+            folder_path: Absolute path to the folder to analyze
+            max_depth: How many directory levels to descend (0 = top level only)
+            max_files: Maximum number of files to collect before the scan stops
+            exclude_patterns: Extra .gitignore-style patterns to skip
+            
+        Returns:
+            List of ScanEntry records with path, type, size and mtime
+            
+        Raises:
+            ValueError: If the path doesn't exist or is not a directory
+        """
         # Validate the path exists
         if not os.path.exists(folder_path):
             error_msg = f"Folder path '{folder_path}' does not exist."
@@ -64,115 +349,253 @@ class FileProcessor:
             logger.error(error_msg)
             raise ValueError(error_msg)
         
-        # Get all files in the directory
-        try:
-            all_items = os.listdir(folder_path)
-        except PermissionError as e:
-            error_msg = f"Permission denied accessing folder '{folder_path}': {e}"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
+        with STAGE_SECONDS.labels("scan").time():
+            return self._scan_directory(
+                folder_path,
+                max_depth=self.max_depth if max_depth is None else max_depth,
+                max_files=self.max_files if max_files is None else max_files,
+                exclude_patterns=exclude_patterns
+            )
+
+    def read_files(self, entries: List[ScanEntry], max_chars: Optional[int] = None) -> List[FileRecord]:
+        """
+        Read scanned files on the shared reader pool, preserving their order.
+        
+        Args:
+            entries: ScanEntry records from scan_directory
+            max_chars: Per-file character limit (defaults to max_chars_per_file)
+            
+        Returns:
+            List of FileRecord objects, one per entry
+        """
+        if not entries:
+            return []
         
         processed_files = []
+        with STAGE_SECONDS.labels("read").time():
+            # Each read gets its own copy of the caller's context so log records keep the request id
+            results = self.executor.map(
+                lambda entry, context: context.run(self._read_single_file, entry.path, entry.file_extension, entry.rel_path, max_chars=max_chars),
+                entries,
+                [contextvars.copy_context() for _ in entries]
+            )
+            for file_content in results:
+                processed_files.append(file_content)
+                if file_content.success:
+                    logger.debug(f"Successfully processed: {file_content.filename}")
+        
+        return processed_files
+
+    def _scan_directory(
+        self,
+        folder_path: str,
+        max_depth: int,
+        max_files: int,
+        exclude_patterns: Optional[List[str]] = None
+    ) -> List[ScanEntry]:
+        """
+        Walk the directory tree with os.scandir and collect readable files.
         
-        for item in all_items:
-            item_path = os.path.join(folder_path, item)
+        Directories are visited depth-first in sorted order so results are
+        deterministic. Excluded directories, ignored paths, unsupported
+        extensions and oversized files are dropped before any file is opened.
+        
+        Args:
+            folder_path: Root directory of the scan
+            max_depth: How many directory levels to descend below the root
+            max_files: Stop collecting once this many files have been found
+            exclude_patterns: Extra .gitignore-style patterns to skip
             
-            # Skip directories, only process files
-            if not os.path.isfile(item_path):
-                logger.debug(f"Skipping directory: {item}")
-                continue
+        Returns:
+            List of ScanEntry records in traversal order
             
-            # Check if file has a valid extension
-            file_extension = os.path.splitext(item)[1].lower()
-            if file_extension not in self.VALID_EXTENSIONS:
-                logger.debug(f"Skipping unsupported file type: {item}")
-                continue
+        Raises:
+            ValueError: If the root folder cannot be listed
+        """
+        ignore_rules = IgnoreRules(exclude_patterns or [])
+        candidates = []
+        # Stack of (absolute dir path, relative dir path, depth)
+        stack = [(folder_path, "", 0)]
+        
+        while stack:
+            dir_path, rel_dir, depth = stack.pop()
             
-            # Process the file
             try:
-                file_content = self._read_single_file(item_path, file_extension)
-                processed_files.append(file_content)
-                logger.info(f"Successfully processed: {item}")
+                with os.scandir(dir_path) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except PermissionError as e:
+                if not rel_dir:
+                    error_msg = f"Permission denied accessing folder '{folder_path}': {e}"
+                    logger.error(error_msg)
+                    raise ValueError(error_msg)
+                logger.warning(f"Permission denied, skipping directory: {rel_dir}")
+                continue
+            except OSError as e:
+                if not rel_dir:
+                    raise ValueError(f"Cannot read folder '{folder_path}': {e}")
+                logger.warning(f"Cannot read directory {rel_dir}: {e}")
+                continue
+            
+            # Pick up nested ignore files before looking at siblings
+            if any(entry.name == self.IGNORE_FILENAME for entry in entries):
+                ignore_rules.load_file(os.path.join(dir_path, self.IGNORE_FILENAME), rel_dir)
+            
+            subdirs = []
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
                 
-            except Exception as e:
-                logger.warning(f"Failed to process {item}: {e}")
-                # Create an error entry but don't stop processing other files
-                error_file = FileContent(
-                    filename=item,
-                    content="",
-                    file_type=file_extension,
-                    error=str(e),
-                    success=False
-                )
-                processed_files.append(error_file)
-        
-        # Check if we found any processable files
-        if not processed_files:
-            error_msg = f"No readable files found in '{folder_path}'. Supported formats: {list(self.VALID_EXTENSIONS.keys())}"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+                
+                if is_dir:
+                    if entry.name in self.EXCLUDED_DIRS or ignore_rules.is_ignored(rel_path, is_dir=True):
+                        logger.debug(f"Skipping excluded directory: {rel_path}")
+                    elif depth >= max_depth:
+                        logger.debug(f"Skipping directory beyond max depth: {rel_path}")
+                    else:
+                        subdirs.append((entry.path, rel_path, depth + 1))
+                    continue
+                
+                if not is_file:
+                    continue
+                
+                # Check if file has a valid extension
+                file_extension = os.path.splitext(entry.name)[1].lower()
+                if file_extension not in self.VALID_EXTENSIONS:
+                    logger.debug(f"Skipping unsupported file type: {rel_path}")
+                    continue
+                
+                if ignore_rules.is_ignored(rel_path, is_dir=False):
+                    logger.debug(f"Skipping ignored file: {rel_path}")
+                    continue
+                
+                try:
+                    stat_result = entry.stat()
+                except OSError as e:
+                    logger.debug(f"Cannot stat {rel_path}: {e}")
+                    continue
+                
+                if stat_result.st_size > self.max_file_size:
+                    logger.debug(f"Skipping oversized file ({stat_result.st_size} bytes): {rel_path}")
+                    continue
+                
+                if len(candidates) >= max_files:
+                    logger.warning(f"Reached file limit of {max_files}; remaining files in '{folder_path}' were not scanned")
+                    return candidates
+                candidates.append(ScanEntry(entry.path, file_extension, rel_path, stat_result.st_size, stat_result.st_mtime_ns))
+            
+            # Reverse so the stack pops subdirectories in sorted order
+            stack.extend(reversed(subdirs))
         
-        logger.info(f"Successfully processed {len(processed_files)} files from {folder_path}")
-        return processed_files
+        return candidates
 
-    def _read_single_file(self, file_path: str, file_extension: str) -> FileContent:
+    def _read_single_file(
+        self,
+        file_path: str,
+        file_extension: str,
+        display_name: Optional[str] = None,
+        max_chars: Optional[int] = None
+    ) -> FileRecord:
         """
         Read a single file and return its content with metadata.
         
         Args:
             file_path: Full path to the file
             file_extension: File extension for type identification
+            display_name: Name reported for the file (defaults to its basename)
+            max_chars: Truncate content beyond this many characters
+            
+        Returns:
+            FileRecord object with file contents and metadata
+        """
+        return self.read_stream(lambda: open(file_path, 'rb'), display_name or os.path.basename(file_path), file_extension, max_chars=max_chars)
+
+    def read_stream(
+        self,
+        open_file: Callable[[], BinaryIO],
+        filename: str,
+        file_extension: str,
+        max_chars: Optional[int] = None
+    ) -> FileRecord:
+        """
+        Read one file from a binary stream with the same byte budget, binary check and decoding as a disk read.
+        
+        Only the bytes needed for max_chars characters are read, so callers
+        such as archive members never materialize the rest of the file.
+        
+        Args:
+            open_file: Callable returning a binary file object (used as a context manager)
+            filename: Name reported for the file
+            file_extension: File extension for type identification
+            max_chars: Truncate content beyond this many characters
             
         Returns:
-            FileContent object with file contents and metadata
+            FileRecord object with file contents and metadata
         """
+        max_length = max_chars or self.max_chars_per_file  # ~10k characters per file to avoid overwhelming the AI
         try:
-            # Read file content with proper encoding handling
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            # Read at most enough bytes for max_length characters (UTF-8 uses up to 4 bytes per character)
+            byte_budget = max_length * 4
+            with open_file() as file:
+                data = file.read(min(BINARY_SNIFF_BYTES, byte_budget))
+                is_binary = looks_binary(data)
+                if not is_binary and len(data) < byte_budget:
+                    data += file.read(byte_budget - len(data))
+                truncated = bool(file.read(1))
+            BYTES_READ.inc(len(data))
+            
+            if is_binary:
+                # Handle binary files before spending time decoding them
+                FILES_READ.labels("binary").inc()
+                error_msg = f"Cannot read file (likely binary or wrong encoding): {filename}"
+                logger.warning(error_msg)
+                return FileRecord(
+                    filename=filename,
+                    content="",
+                    file_type=file_extension,
+                    error=error_msg,
+                    success=False
+                )
+            
+            content, encoding = decode_text(data, truncated)
+            if encoding != 'utf-8':
+                logger.debug(f"Decoded {filename} as {encoding}")
             
             # For very large files, we might want to truncate
-            max_length = 10000  # ~10k characters per file to avoid overwhelming the AI
-            if len(content) > max_length:
+            if truncated or len(content) > max_length:
                 content = content[:max_length] + f"\n\n--- CONTENT TRUNCATED AT {max_length} CHARACTERS ---"
-                logger.warning(f"Truncated large file: {os.path.basename(file_path)}")
+                logger.warning(f"Truncated large file: {filename}")
+                FILES_TRUNCATED.inc()
             
-            return FileContent(
-                filename=os.path.basename(file_path),
+            FILES_READ.labels("success").inc()
+            return FileRecord(
+                filename=filename,
                 content=content,
                 file_type=file_extension,
                 success=True
             )
             
-        except UnicodeDecodeError:
-            # Handle binary files or wrong encodings
-            error_msg = f"Cannot read file (likely binary or wrong encoding): {os.path.basename(file_path)}"
-            logger.warning(error_msg)
-            return FileContent(
-                filename=os.path.basename(file_path),
-                content="",
-                file_type=file_extension,
-                error=error_msg,
-                success=False
-            )
-            
         except Exception as e:
-            error_msg = f"Error reading file {os.path.basename(file_path)}: {str(e)}"
+            error_msg = f"Error reading file {filename}: {str(e)}"
             logger.warning(error_msg)
-            return FileContent(
-                filename=os.path.basename(file_path),
+            FILES_READ.labels("error").inc()
+            return FileRecord(
+                filename=filename,
                 content="",
                 file_type=file_extension,
                 error=error_msg,
                 success=False
             )
 
-    def get_combined_content(self, processed_files: List[FileContent]) -> str:
+    def get_combined_content(self, processed_files: List[FileRecord]) -> str:
         """
         Combine contents of successfully processed files into a single string.
         
         Args:
-            processed_files: List of FileContent objects
+            processed_files: List of FileRecord objects
             
         Returns:
             Combined content string with file headers
@@ -186,5 +609,119 @@ class FileProcessor:
         
         return combined_text.strip()
 
+    def summarize_files(self, processed_files: List[FileRecord], max_chars: Optional[int] = None) -> List[FileRecord]:
+        """
+        Replace large source files with structural skeletons for prompting.
+        
+        Args:
+            processed_files: List of FileRecord objects
+            max_chars: Truncate each resulting file beyond this many characters
+            
+        Returns:
+            New list where long .py/.js/.java/... files hold their skeleton
+            (imports, signatures, docstrings, short bodies) instead of full text
+        """
+        summarized = []
+        
+        for file_content in processed_files:
+            content = file_content.content
+            if file_content.success and len(content) > self.skeleton_min_chars:
+                skeleton = skeletonizer.skeletonize(content, file_content.file_type)
+                if skeleton and len(skeleton) < len(content):
+                    content = skeleton + f"\n\n--- SKELETON: LONG BODIES ELIDED FROM {len(file_content.content)} CHARACTERS ---"
+            
+            if max_chars and len(content) > max_chars:
+                content = content[:max_chars] + f"\n\n--- CONTENT TRUNCATED AT {max_chars} CHARACTERS ---"
+            
+            if content is file_content.content:
+                summarized.append(file_content)
+            else:
+                summarized.append(file_content._replace(content=content))
+        
+        return summarized
+
+    def get_content_chunks(
+        self,
+        processed_files: List[FileRecord],
+        token_budget: Optional[int] = None,
+        max_chunks: Optional[int] = None
+    ) -> List[str]:
+        """
+        Split the contents of processed files into token-budgeted chunks.
+        
+        Files are packed whole into chunks where possible; a file larger than
+        the budget is split on line boundaries into numbered parts.
+        
+        Args:
+            processed_files: List of FileRecord objects
+            token_budget: Approximate tokens per chunk (defaults to chunk_token_budget)
+            max_chunks: Stop after this many chunks (defaults to max_chunks)
+            
+        Returns:
+            List of chunk strings with file headers
+        """
+        char_budget = (token_budget or self.chunk_token_budget) * CHARS_PER_TOKEN
+        max_chunks = max_chunks or self.max_chunks
+        
+        # Break every file into sections that each fit in one chunk
+        sections = []
+        for file_content in processed_files:
+            if not (file_content.success and file_content.content.strip()):
+                continue
+            
+            header = f"--- {file_content.filename} ({self.VALID_EXTENSIONS.get(file_content.file_type, 'File')}) ---"
+            pieces = self._split_text(file_content.content, char_budget - len(header) - 32)
+            for index, piece in enumerate(pieces, start=1):
+                part = f" [part {index} of {len(pieces)}]" if len(pieces) > 1 else ""
+                sections.append(f"{header}{part}\n\n{piece}")
+        
+        # Pack sections greedily into chunks
+        chunks = []
+        current = []
+        current_size = 0
+        for section in sections:
+            if current and current_size + len(section) > char_budget:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_size = 0
+            current.append(section)
+            current_size += len(section) + 2
+        if current:
+            chunks.append("\n\n".join(current))
+        
+        if len(chunks) > max_chunks:
+            logger.warning(f"Content split into {len(chunks)} chunks; only the first {max_chunks} will be analyzed")
+            chunks = chunks[:max_chunks]
+        
+        return chunks
+
+    @staticmethod
+    def _split_text(text: str, char_budget: int) -> List[str]:
+        """Split text on line boundaries into pieces of at most char_budget characters."""
+        if len(text) <= char_budget:
+            return [text]
+        
+        pieces = []
+        current = []
+        current_size = 0
+        for line in text.splitlines(keepends=True):
+            # Hard-wrap single lines that exceed the budget (e.g. minified code)
+            while len(line) > char_budget:
+                if current:
+                    pieces.append("".join(current))
+                    current = []
+                    current_size = 0
+                pieces.append(line[:char_budget])
+                line = line[char_budget:]
+            if current_size + len(line) > char_budget:
+                pieces.append("".join(current))
+                current = []
+                current_size = 0
+            current.append(line)
+            current_size += len(line)
+        if current:
+            pieces.append("".join(current))
+        return pieces
+
 # Create a singleton instance for use throughout the application
 file_processor = FileProcessor()
\ No newline at end of file
@@ -0,0 +1,176 @@
+# backend/core/jobs.py
+
+import asyncio
+import contextvars
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.logging_setup import logger
+
+class Job:
+    """A unit of background work and its outcome."""
+
+    def __init__(self, run: Callable[[], Awaitable[Any]]):
+        self.job_id = uuid.uuid4().hex
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._run = run
+        self._task: Optional[asyncio.Task] = None
+        self._done = asyncio.Event()
+        # Run in the submitter's context so logs keep its request id
+        self._context = contextvars.copy_context()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def _finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for the job to finish; return True if it did."""
+        if self.finished or timeout <= 0:
+            return self.finished
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.finished
+
+class JobManager:
+    """
+    Runs submitted jobs on a fixed pool of asyncio workers.
+
+    Jobs wait in a bounded queue, so throughput is limited by the number of
+    workers rather than by open HTTP connections. Finished jobs are kept for
+    result_ttl seconds and then discarded.
+    """
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        result_ttl: Optional[int] = None
+    ):
+        self.num_workers = num_workers or int(os.environ.get("JOB_WORKERS", "4"))
+        self.max_queue_size = max_queue_size or int(os.environ.get("JOB_QUEUE_SIZE", "100"))
+        self.result_ttl = result_ttl or int(os.environ.get("JOB_RESULT_TTL", "3600"))
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the worker pool on the running event loop (idempotent)."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"job-worker-{index}")
+            for index in range(self.num_workers)
+        ]
+        logger.info(f"JobManager started with {self.num_workers} workers")
+
+    async def stop(self):
+        """Cancel running jobs and stop the workers."""
+        for job in self._jobs.values():
+            if not job.finished:
+                self.cancel(job.job_id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        logger.info("JobManager stopped")
+
+    def submit(self, run: Callable[[], Awaitable[Any]]) -> Job:
+        """
+        Queue a coroutine factory for background execution.
+
+        Raises:
+            RuntimeError: If the queue is full
+        """
+        self.start()
+        self._purge_expired()
+
+        job = Job(run)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise RuntimeError("Job queue is full. Try again later.")
+
+        self._jobs[job.job_id] = job
+        logger.info(f"Job {job.job_id} queued ({self._queue.qsize()} waiting)")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if it is unknown or expired."""
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job. Finished jobs are left untouched."""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+
+        if job._task is not None:
+            job._task.cancel()
+        job._finish("cancelled", error="Job was cancelled.")
+        logger.info(f"Job {job_id} cancelled")
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                # Skip jobs cancelled while they were waiting in the queue
+                if job.finished:
+                    continue
+                await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        job._task = job._context.run(asyncio.create_task, job._run())
+        try:
+            # asyncio.wait does not cancel the job if this worker is stopped
+            await asyncio.wait({job._task})
+        except asyncio.CancelledError:
+            job._task.cancel()
+            raise
+
+        task, job._task = job._task, None
+        if job.finished:
+            return
+        if task.cancelled():
+            job._finish("cancelled", error="Job was cancelled.")
+        elif task.exception() is not None:
+            logger.error(f"Job {job.job_id} failed: {task.exception()}")
+            job._finish("failed", error=str(task.exception()))
+        else:
+            job._finish("completed", result=task.result())
+            logger.info(f"Job {job.job_id} completed in {job.finished_at - job.started_at:.2f}s")
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+# Create a singleton instance for the application
+job_manager = JobManager()
@@ -0,0 +1,263 @@
+# backend/core/manifest.py
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, NamedTuple, Optional
+
+from core.ai_client import ai_client
+from core.file_processor import CHARS_PER_TOKEN, FileRecord, ScanEntry, content_hash, file_processor
+from core.preprocessor import prompt_preprocessor
+from utils.logging_setup import logger
+
+MANIFEST_VERSION = 1
+
+class ManifestStore:
+    """
+    Persists one JSON manifest per analyzed folder.
+
+    A manifest records the size, mtime and content hash of every file, plus
+    the notes produced for each group of files, so a later run can skip
+    everything that has not changed.
+    """
+
+    def __init__(self, manifest_dir: Optional[str] = None):
+        self.manifest_dir = manifest_dir or os.environ.get("MANIFEST_DIR", os.path.join("data", "manifests"))
+
+    def _path(self, folder_path: str) -> str:
+        key = hashlib.sha256(os.path.abspath(folder_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.manifest_dir, f"{key}.json")
+
+    def load(self, folder_path: str) -> dict:
+        """Load the manifest for a folder, or an empty one if none is usable."""
+        empty = {"version": MANIFEST_VERSION, "folder": os.path.abspath(folder_path), "files": {}, "groups": {}}
+        try:
+            with open(self._path(folder_path), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return empty
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest for '{folder_path}': {e}")
+            return empty
+
+        if manifest.get("version") != MANIFEST_VERSION:
+            return empty
+        return manifest
+
+    def save(self, folder_path: str, manifest: dict) -> None:
+        """
+        Write the manifest atomically so a crash never leaves a partial file.
+
+        Each save writes its own uniquely named temp file, so concurrent saves
+        of the same folder never clobber each other; the last rename wins.
+        """
+        path = self._path(folder_path)
+        temp_path = None
+        try:
+            os.makedirs(self.manifest_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.manifest_dir, prefix=os.path.basename(path), suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(manifest, file)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to save manifest for '{folder_path}': {e}")
+            if temp_path is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+
+class IncrementalResult(NamedTuple):
+    """Outcome of preparing notes for an incremental analysis."""
+    processed_files: List[FileRecord]
+    notes: List[str]
+    files_read: int
+    groups_analyzed: int
+
+class IncrementalAnalyzer:
+    """
+    Map step of chunked analysis that only redoes work for changed files.
+
+    Files are grouped per directory (packed up to the chunk budget) so an
+    edit only invalidates the group that contains it. Unchanged files are
+    detected by size and mtime and are not re-read unless a sibling in their
+    group changed.
+    """
+
+    def __init__(self, store: Optional[ManifestStore] = None):
+        self.store = store or manifest_store
+
+    async def prepare_notes(self, folder_path: str, use_cache: bool = True) -> IncrementalResult:
+        """
+        Bring the folder's manifest up to date and return notes for every group.
+
+        Args:
+            folder_path: Absolute path to the folder to analyze
+            use_cache: When False, every group is re-analyzed
+
+        Returns:
+            IncrementalResult; unchanged files that were not re-read are
+            listed in processed_files with empty content
+
+        Raises:
+            ValueError: If the path is invalid or no readable files are found
+        """
+        plan = await asyncio.to_thread(self._plan, folder_path, use_cache, ai_client.backends is not None)
+        records, contents, errors, groups, dirty, manifest, chunk_owners, chunk_texts, empty_groups = plan
+
+        # Condense every dirty group concurrently; one group may span several chunks
+        chunk_notes = await ai_client.analyze_chunks(chunk_texts, use_cache=use_cache) if chunk_texts else []
+
+        fresh: Dict[str, List[Optional[str]]] = {}
+        for key, note in zip(chunk_owners, chunk_notes):
+            fresh.setdefault(key, []).append(note)
+
+        notes = []
+        saved_groups = {}
+        for key, rel_paths in groups.items():
+            if key in fresh:
+                group_notes = fresh[key]
+                text = "\n\n".join(note for note in group_notes if note)
+                # Only persist complete groups so failed chunks are retried next time
+                if all(group_notes):
+                    saved_groups[key] = {"files": rel_paths, "notes": text}
+            elif key in empty_groups:
+                text = ""
+                saved_groups[key] = {"files": rel_paths, "notes": text}
+            elif key not in dirty:
+                text = manifest["groups"][key]["notes"]
+                saved_groups[key] = manifest["groups"][key]
+            else:
+                text = ""
+            if text:
+                notes.append(text)
+
+        manifest["files"] = records
+        manifest["groups"] = saved_groups
+        await asyncio.to_thread(self.store.save, folder_path, manifest)
+
+        processed_files = [
+            contents.get(rel_path) or FileRecord(rel_path, "", record["file_type"])
+            for rel_path, record in records.items()
+        ]
+        processed_files.extend(errors)
+
+        logger.info(
+            f"Incremental analysis of {folder_path}: re-read {len(contents)}/{len(records)} files, "
+            f"re-analyzed {len(fresh)}/{len(groups)} groups"
+        )
+        return IncrementalResult(processed_files, notes, len(contents), len(fresh))
+
+    def _plan(self, folder_path: str, use_cache: bool, condense: bool):
+        """
+        Stat-diff the folder against its manifest, read what is needed and
+        split each dirty group into chunks when ``condense`` is set (runs in a thread).
+        """
+        entries = file_processor.scan_directory(folder_path)
+        manifest = self.store.load(folder_path)
+        old_records = manifest["files"]
+        max_chars = file_processor.chunked_max_chars_per_file
+
+        changed = [entry for entry in entries if not self._is_unchanged(entry, old_records.get(entry.rel_path))]
+        contents: Dict[str, FileRecord] = {}
+        errors: List[FileRecord] = []
+        for file_content in file_processor.read_files(changed, max_chars=max_chars):
+            if file_content.success:
+                contents[file_content.filename] = file_content
+            else:
+                errors.append(file_content)
+
+        failed = {error.filename for error in errors}
+        records = {}
+        for entry in entries:
+            if entry.rel_path in contents:
+                file_content = contents[entry.rel_path]
+                records[entry.rel_path] = {
+                    "size": entry.size,
+                    "mtime_ns": entry.mtime_ns,
+                    "hash": content_hash(file_content.content),
+                    "chars": len(file_content.content),
+                    "file_type": entry.file_extension
+                }
+            elif entry.rel_path in old_records and entry.rel_path not in failed:
+                records[entry.rel_path] = old_records[entry.rel_path]
+
+        if not records and not errors:
+            error_msg = f"No readable files found in '{folder_path}'. Supported formats: {list(file_processor.VALID_EXTENSIONS.keys())}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        groups = self._group_files(records)
+        dirty = [key for key in groups if not use_cache or key not in manifest["groups"]]
+
+        # Dirty groups need the text of their unchanged members too
+        entries_by_path = {entry.rel_path: entry for entry in entries}
+        missing = [
+            entries_by_path[rel_path]
+            for key in dirty for rel_path in groups[key]
+            if rel_path not in contents
+        ]
+        for file_content in file_processor.read_files(missing, max_chars=max_chars):
+            if file_content.success:
+                contents[file_content.filename] = file_content
+
+        # Keep rel paths of any member that could not be re-read out of its group
+        for key in dirty:
+            groups[key] = [rel_path for rel_path in groups[key] if rel_path in contents]
+
+        chunk_owners = []
+        chunk_texts = []
+        empty_groups = set()
+        if condense:
+            for key in dirty:
+                group_files, _ = prompt_preprocessor.preprocess([contents[rel_path] for rel_path in groups[key]])
+                group_chunks = file_processor.get_content_chunks(group_files)
+                if not group_chunks:
+                    # Nothing left to analyze after preprocessing (e.g. only generated files)
+                    empty_groups.add(key)
+                for chunk in group_chunks:
+                    chunk_owners.append(key)
+                    chunk_texts.append(chunk)
+
+        return records, contents, errors, groups, dirty, manifest, chunk_owners, chunk_texts, empty_groups
+
+    @staticmethod
+    def _is_unchanged(entry: ScanEntry, record: Optional[dict]) -> bool:
+        return record is not None and record["size"] == entry.size and record["mtime_ns"] == entry.mtime_ns
+
+    @staticmethod
+    def _group_files(records: Dict[str, dict]) -> Dict[str, List[str]]:
+        """
+        Pack files into groups per directory, in path order, up to the chunk budget.
+
+        Each group is keyed by the hash of its members' paths and content
+        hashes, so the key changes exactly when one of its files does.
+        """
+        char_budget = file_processor.chunk_token_budget * CHARS_PER_TOKEN
+        groups: Dict[str, List[str]] = {}
+
+        def close(members: List[str]):
+            if members:
+                fingerprint = "\n".join(f"{rel_path}:{records[rel_path]['hash']}" for rel_path in members)
+                groups[content_hash(fingerprint)] = members
+
+        current: List[str] = []
+        current_dir = None
+        current_size = 0
+        for rel_path in sorted(records):
+            directory = os.path.dirname(rel_path)
+            size = records[rel_path]["chars"]
+            if current and (directory != current_dir or current_size + size > char_budget):
+                close(current)
+                current = []
+                current_size = 0
+            current_dir = directory
+            current.append(rel_path)
+            current_size += size
+        close(current)
+        return groups
+
+# Create singleton instances for the application
+manifest_store = ManifestStore()
+incremental_analyzer = IncrementalAnalyzer(manifest_store)
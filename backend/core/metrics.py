@@ -0,0 +1,124 @@
+# backend/core/metrics.py
+"""
+Prometheus metrics for the analysis pipeline, exposed on /metrics.
+
+Stage timings cover one analysis end to end: scan, read, preprocess,
+prompt_build, upstream and total. Cache hit rates are derived from
+necromancer_cache_requests_total, e.g.
+``sum(rate(...{result="hit"}[5m])) / sum(rate(...[5m]))``.
+"""
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Stage latencies span from sub-millisecond prompt building to multi-minute model calls
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "necromancer_stage_duration_seconds",
+    "Time spent in each stage of an analysis",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+
+FILES_READ = Counter(
+    "necromancer_files_read_total",
+    "Files read from disk, by outcome",
+    ["status"]
+)
+
+BYTES_READ = Counter(
+    "necromancer_bytes_read_total",
+    "Bytes read from disk"
+)
+
+FILES_TRUNCATED = Counter(
+    "necromancer_files_truncated_total",
+    "Files cut off at the per-file character limit"
+)
+
+UPSTREAM_SECONDS = Histogram(
+    "necromancer_upstream_request_duration_seconds",
+    "Duration of calls to inference backends",
+    ["backend", "outcome"],
+    buckets=STAGE_BUCKETS
+)
+
+TIME_TO_FIRST_TOKEN = Histogram(
+    "necromancer_time_to_first_token_seconds",
+    "Delay before a streamed completion produced its first token",
+    ["backend"],
+    buckets=STAGE_BUCKETS
+)
+
+TOKENS = Counter(
+    "necromancer_tokens_total",
+    "Estimated prompt and completion tokens exchanged with inference backends",
+    ["backend", "kind"]
+)
+
+CACHE_REQUESTS = Counter(
+    "necromancer_cache_requests_total",
+    "Response cache lookups, by tier and result",
+    ["tier", "result"]
+)
+
+HTTP_IN_FLIGHT = Gauge(
+    "necromancer_http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+
+ANALYSES_IN_FLIGHT = Gauge(
+    "necromancer_analyses_in_flight",
+    "Analyses currently running, by mode",
+    ["mode"]
+)
+
+UPSTREAM_IN_FLIGHT = Gauge(
+    "necromancer_upstream_requests_in_flight",
+    "Calls to inference backends currently waiting for an answer",
+    ["backend"]
+)
+
+COALESCED_REQUESTS = Counter(
+    "necromancer_coalesced_requests_total",
+    "Requests that joined identical in-flight work instead of starting their own",
+    ["kind"]
+)
+
+ADMISSION_QUEUE = Gauge(
+    "necromancer_admission_queue_length",
+    "Requests waiting for an execution slot, by priority",
+    ["priority"]
+)
+
+ADMISSION_REJECTED = Counter(
+    "necromancer_admission_rejected_total",
+    "Requests refused by admission control, by reason",
+    ["reason"]
+)
+
+ADMISSION_WAIT_SECONDS = Histogram(
+    "necromancer_admission_wait_seconds",
+    "Time requests spent waiting for an execution slot, by priority",
+    ["priority"],
+    buckets=STAGE_BUCKETS
+)
+
+IMPORT_SECONDS = Gauge(
+    "necromancer_import_seconds",
+    "Time taken to import the application modules"
+)
+
+STARTUP_SECONDS = Gauge(
+    "necromancer_startup_seconds",
+    "Time from the start of the lifespan hook until the service was warm"
+)
+
+READY = Gauge(
+    "necromancer_ready",
+    "1 once startup warm-up has finished, 0 before"
+)
+
+def render_metrics() -> bytes:
+    """Serialize every registered metric in the Prometheus text format."""
+    return generate_latest()
@@ -0,0 +1,108 @@
+# backend/core/pipeline.py
+
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional
+
+from utils.logging_setup import logger
+
+class PipelineResult(NamedTuple):
+    """Outcome of one item: its position in the input, either a result or an error, and its latency."""
+    index: int
+    result: Any = None
+    error: Optional[BaseException] = None
+    # From the start of the prepare stage to the end of the execute stage
+    seconds: float = 0.0
+
+class BatchPipeline:
+    """
+    Runs items through two overlapping stages: prepare, then execute.
+
+    ``prepare_workers`` items are prepared at once (scanning and reading
+    folders), and at most ``prefetch`` prepared items wait for the execute
+    stage, which runs up to ``concurrency`` items at once (the model calls).
+    So the next folders are read while earlier ones are waiting on the
+    model, without reading far ahead of it. Results are yielded as each item
+    finishes, not in input order.
+    """
+
+    def __init__(self, prepare_workers: Optional[int] = None, concurrency: Optional[int] = None, prefetch: Optional[int] = None):
+        self.prepare_workers = prepare_workers or int(os.environ.get("BATCH_PREPARE_WORKERS", "2"))
+        self.concurrency = concurrency or int(os.environ.get("BATCH_UPSTREAM_CONCURRENCY", "4"))
+        self.prefetch = prefetch or int(os.environ.get("BATCH_PREFETCH", str(self.concurrency)))
+
+    async def run(
+        self,
+        items: List[Any],
+        prepare: Callable[[Any], Awaitable[Any]],
+        execute: Callable[[Any, Any], Awaitable[Any]],
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[PipelineResult]:
+        """
+        Yield a PipelineResult per item as soon as it finishes.
+
+        Args:
+            items: Inputs to process
+            prepare: Coroutine factory for the first stage, given an item
+            execute: Coroutine factory for the second stage, given the item and its prepared value
+            concurrency: Lower execute-stage concurrency for this run (capped at self.concurrency)
+
+        Stopping iteration early cancels all outstanding work.
+        """
+        concurrency = min(concurrency or self.concurrency, self.concurrency)
+        pending = iter(enumerate(items))
+        ready: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def preparer():
+            # Workers share one iterator, so each item is prepared exactly once
+            for index, item in pending:
+                started = time.perf_counter()
+                try:
+                    prepared = await prepare(item)
+                except Exception as e:
+                    await results.put(PipelineResult(index, error=e, seconds=time.perf_counter() - started))
+                    continue
+                await ready.put((index, item, prepared, started))
+
+        async def executor():
+            while True:
+                entry = await ready.get()
+                if entry is None:
+                    return
+                index, item, prepared, started = entry
+                try:
+                    result = await execute(item, prepared)
+                except Exception as e:
+                    await results.put(PipelineResult(index, error=e, seconds=time.perf_counter() - started))
+                    continue
+                await results.put(PipelineResult(index, result=result, seconds=time.perf_counter() - started))
+
+        async def coordinate():
+            executors = [asyncio.create_task(executor()) for _ in range(concurrency)]
+            try:
+                await asyncio.gather(*(preparer() for _ in range(min(self.prepare_workers, len(items)) or 1)))
+                for _ in executors:
+                    await ready.put(None)
+                await asyncio.gather(*executors)
+            finally:
+                for task in executors:
+                    task.cancel()
+                await results.put(None)
+
+        coordinator = asyncio.create_task(coordinate())
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+            await coordinator
+        finally:
+            if not coordinator.done():
+                logger.info("Batch pipeline stopped early; cancelling outstanding items")
+                coordinator.cancel()
+
+# Create a singleton instance for the application
+batch_pipeline = BatchPipeline()
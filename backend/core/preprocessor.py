@@ -0,0 +1,185 @@
+# backend/core/preprocessor.py
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from core.file_processor import FileRecord, content_hash, estimate_tokens
+from core.metrics import STAGE_SECONDS
+from models.schemas import PromptStats
+from utils.logging_setup import logger
+
+# Comment syntax per extension: (line comment prefixes, block comment delimiters)
+COMMENT_SYNTAX: Dict[str, Tuple[Tuple[str, ...], Optional[Tuple[str, str]]]] = {
+    '.py': (('#',), None),
+    '.rb': (('#',), None),
+    '.yaml': (('#',), None),
+    '.yml': (('#',), None),
+    '.js': (('//',), ('/*', '*/')),
+    '.jsx': (('//',), ('/*', '*/')),
+    '.java': (('//',), ('/*', '*/')),
+    '.c': (('//',), ('/*', '*/')),
+    '.cpp': (('//',), ('/*', '*/')),
+    '.cs': (('//',), ('/*', '*/')),
+    '.php': (('//', '#'), ('/*', '*/')),
+    '.go': (('//',), ('/*', '*/')),
+    '.rs': (('//',), ('/*', '*/')),
+    '.css': ((), ('/*', '*/')),
+    '.html': ((), ('<!--', '-->')),
+    '.xml': ((), ('<!--', '-->')),
+    '.md': ((), ('<!--', '-->')),
+}
+
+# Words that mark a leading comment block as a license/copyright header
+LICENSE_KEYWORDS = ('copyright', 'license', 'licensed', 'spdx-license-identifier', 'all rights reserved')
+
+# Markers tools put at the top of files nobody should edit by hand
+GENERATED_MARKERS = ('@generated', 'do not edit', 'code generated by', 'auto-generated', 'autogenerated', 'automatically generated')
+
+# Filenames that are bundles or lockfiles rather than source
+GENERATED_NAME_PATTERN = re.compile(r'(\.min\.|[.-]bundle\.|\.chunk\.|(^|/)package-lock\.json$|(^|/)composer\.lock$)', re.IGNORECASE)
+
+_BLANK_RUNS = re.compile(r'\n{3,}')
+_TRAILING_SPACE = re.compile(r'[ \t]+$', re.MULTILINE)
+
+class PromptPreprocessor:
+    """
+    Shrinks processed files before they are combined into a prompt.
+
+    Drops exact duplicates and minified/generated files, strips license
+    headers and trailing whitespace, collapses blank-line padding and can
+    optionally drop full-line comments. The processed files themselves are
+    left untouched; only the copies sent to the model change.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, strip_comments: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else os.environ.get("PREPROCESS_ENABLED", "true").lower() == "true"
+        self.strip_comments = strip_comments if strip_comments is not None else os.environ.get("PREPROCESS_STRIP_COMMENTS", "false").lower() == "true"
+
+    @STAGE_SECONDS.labels("preprocess").time()
+    def preprocess(self, processed_files: List[FileRecord]) -> Tuple[List[FileRecord], PromptStats]:
+        """
+        Return the files to prompt with and statistics on what was removed.
+
+        Args:
+            processed_files: List of FileRecord objects from FileProcessor
+
+        Returns:
+            Tuple of (cleaned FileRecord copies, PromptStats)
+        """
+        readable = [file for file in processed_files if file.success and file.content.strip()]
+        tokens_before = sum(estimate_tokens(file.content) for file in readable)
+
+        if not self.enabled:
+            return readable, PromptStats(
+                files_in=len(readable),
+                files_used=len(readable),
+                tokens_before=tokens_before,
+                tokens_after=tokens_before
+            )
+
+        seen_hashes = set()
+        duplicates = 0
+        generated = 0
+        cleaned_files = []
+
+        for file in readable:
+            digest = content_hash(file.content)
+            if digest in seen_hashes:
+                duplicates += 1
+                logger.debug(f"Dropping duplicate file from prompt: {file.filename}")
+                continue
+            seen_hashes.add(digest)
+
+            if self.is_generated(file):
+                generated += 1
+                logger.debug(f"Dropping minified or generated file from prompt: {file.filename}")
+                continue
+
+            content = self.clean_content(file.content, file.file_type)
+            if not content.strip():
+                continue
+            cleaned_files.append(file._replace(content=content))
+
+        tokens_after = sum(estimate_tokens(file.content) for file in cleaned_files)
+        stats = PromptStats(
+            files_in=len(readable),
+            files_used=len(cleaned_files),
+            duplicates_removed=duplicates,
+            generated_skipped=generated,
+            tokens_before=tokens_before,
+            tokens_after=tokens_after,
+            tokens_saved=max(tokens_before - tokens_after, 0)
+        )
+        logger.info(f"Prompt preprocessing saved ~{stats.tokens_saved} tokens ({tokens_before} -> {tokens_after})")
+        return cleaned_files, stats
+
+    @staticmethod
+    def is_generated(file: FileRecord) -> bool:
+        """Detect bundles, lockfiles, generated sources and minified code."""
+        if GENERATED_NAME_PATTERN.search(file.filename):
+            return True
+
+        head = file.content[:1024].lower()
+        if any(marker in head for marker in GENERATED_MARKERS):
+            return True
+
+        # Minified code packs thousands of characters into very few lines
+        content = file.content
+        if len(content) > 2000:
+            lines = content.count('\n') + 1
+            if len(content) / lines > 300:
+                return True
+        return False
+
+    def clean_content(self, content: str, file_type: str) -> str:
+        """Strip the license header, comment-only lines (optional) and whitespace padding."""
+        line_prefixes, block = COMMENT_SYNTAX.get(file_type, ((), None))
+        content = self._strip_license_header(content, line_prefixes, block)
+
+        if self.strip_comments and line_prefixes:
+            content = '\n'.join(
+                line for line in content.split('\n')
+                if not line.lstrip().startswith(line_prefixes) or line.startswith('#!')
+            )
+
+        content = _TRAILING_SPACE.sub('', content)
+        content = _BLANK_RUNS.sub('\n\n', content)
+        return content.strip('\n')
+
+    @staticmethod
+    def _strip_license_header(
+        content: str,
+        line_prefixes: Tuple[str, ...],
+        block: Optional[Tuple[str, str]]
+    ) -> str:
+        """Remove a leading comment block if it looks like a license or copyright notice."""
+        # Keep shebang and encoding lines in place
+        preamble = ''
+        body = content
+        while body.startswith('#!') or body.startswith('# -*-'):
+            line, _, body = body.partition('\n')
+            preamble += line + '\n'
+
+        stripped = body.lstrip()
+        header = None
+        if block and stripped.startswith(block[0]):
+            end = stripped.find(block[1], len(block[0]))
+            if end != -1:
+                header = stripped[:end + len(block[1])]
+        elif line_prefixes:
+            header_lines = []
+            for line in stripped.split('\n'):
+                if line.lstrip().startswith(line_prefixes):
+                    header_lines.append(line)
+                else:
+                    break
+            if header_lines:
+                header = '\n'.join(header_lines)
+
+        if header and any(keyword in header.lower() for keyword in LICENSE_KEYWORDS):
+            return preamble + stripped[len(header):].lstrip('\n')
+        return content
+
+# Create a singleton instance for the application
+prompt_preprocessor = PromptPreprocessor()
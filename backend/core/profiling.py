@@ -0,0 +1,234 @@
+# backend/core/profiling.py
+
+import asyncio
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from utils.logging_setup import logger
+
+PROFILE_MODES = ("sample", "cprofile")
+
+# Leaf frames of threads that are parked rather than running Python code
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+    ("handlers.py", "dequeue"),
+}
+
+class ProfileRecord:
+    """A finished profile and what it covered."""
+
+    __slots__ = ("profile_id", "request_id", "method", "path", "mode", "started_at", "seconds", "status_code", "samples", "text", "raw")
+
+    def __init__(self, request_id: str, method: str, path: str, mode: str):
+        # Generated here, since the request id may come from the client and repeat
+        self.profile_id = uuid.uuid4().hex
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.started_at = time.time()
+        self.seconds = 0.0
+        self.status_code: Optional[int] = None
+        self.samples = 0
+        # Collapsed stacks (sample) or a pstats report (cprofile)
+        self.text = ""
+        # Marshalled pstats data loadable with pstats/snakeviz (cprofile only)
+        self.raw: Optional[bytes] = None
+
+    def summary(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "seconds": round(self.seconds, 4),
+            "status_code": self.status_code,
+            "samples": self.samples,
+        }
+
+class StackSampler:
+    """
+    Samples the Python stacks of every thread at a fixed interval.
+
+    Covers the event loop and the file-reader pools alike, and costs little
+    enough to use in production. Stacks are counted in collapsed form
+    (``thread;outer;...;inner count``), ready for flamegraph tools.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+class RequestProfiler:
+    """
+    Opt-in profiling of individual requests, keyed by a generated profile id.
+
+    Disabled unless PROFILING_ENABLED is true. When PROFILING_TOKEN is set,
+    requests must also send it in X-Profile-Token. Only one request is
+    profiled at a time (cProfile allows one profiler per thread); others run
+    unprofiled. The last ``max_stored`` profiles are kept in memory.
+
+    Neither mode isolates the profiled request. Sampled profiles cover
+    every thread in the process, including the thread pool that reads files
+    and builds prompts. cProfile instruments the event-loop thread, which
+    runs the coroutines of every request in flight, not only the profiled
+    one, and sees nothing run on the thread pool; use sampling to see file
+    I/O, preprocessing and ranking. Profile an otherwise idle server for a
+    clean picture of one request.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        token: Optional[str] = None,
+        max_stored: Optional[int] = None,
+        sample_interval: Optional[float] = None
+    ):
+        self.enabled = enabled if enabled is not None else os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+        self.token = token if token is not None else os.environ.get("PROFILING_TOKEN", "")
+        self.max_stored = max_stored or int(os.environ.get("PROFILING_MAX_STORED", "20"))
+        self.sample_interval = sample_interval or float(os.environ.get("PROFILING_SAMPLE_INTERVAL", "0.005"))
+        self.default_mode = os.environ.get("PROFILING_DEFAULT_MODE", "sample")
+        self._profiles: "OrderedDict[str, ProfileRecord]" = OrderedDict()
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    def authorized(self, headers) -> bool:
+        """Whether profiling is enabled and the caller presented the configured token (if any)."""
+        if not self.enabled:
+            return False
+        return not self.token or hmac.compare_digest(headers.get("X-Profile-Token", ""), self.token)
+
+    def requested_mode(self, headers, query_params) -> Optional[str]:
+        """
+        The profiling mode asked for via the X-Profile header or ``profile`` query
+        parameter ("sample", "cprofile", or a truthy value for the default), if allowed.
+        """
+        value = (headers.get("X-Profile") or query_params.get("profile") or "").lower()
+        if not value or value in ("0", "false", "no", "off"):
+            return None
+        if not self.authorized(headers):
+            logger.warning("Profiling requested but not enabled or not authorized; ignoring")
+            return None
+        return value if value in PROFILE_MODES else self.default_mode
+
+    @asynccontextmanager
+    async def profile(self, request_id: str, method: str, path: str, mode: str) -> AsyncIterator[Optional[ProfileRecord]]:
+        """
+        Profile the body of the block and store the result under a new profile id.
+
+        Yields the record (set its ``status_code`` before the block ends; its
+        ``profile_id`` is the key for ``get``), or None if another profile is
+        already running.
+        """
+        if not self._busy.acquire(blocking=False):
+            logger.info("Another request is being profiled; running this one unprofiled")
+            yield None
+            return
+
+        record = ProfileRecord(request_id, method, path, mode)
+        started = time.perf_counter()
+        sampler = profiler = None
+        try:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                sampler = StackSampler(self.sample_interval)
+                sampler.start()
+            yield record
+        finally:
+            # Failed requests are saved too; they are often the interesting ones
+            if profiler is not None:
+                profiler.disable()
+            record.seconds = time.perf_counter() - started
+            try:
+                # Joining the sampler and formatting the report stay off the event loop
+                await asyncio.to_thread(self._finish, record, profiler, sampler)
+            finally:
+                self._busy.release()
+
+    def _finish(self, record: ProfileRecord, profiler: Optional[cProfile.Profile], sampler: Optional[StackSampler]):
+        """Stop the sampler, build the report and store the record (runs in a thread)."""
+        if sampler is not None:
+            sampler.stop()
+        if profiler is not None:
+            report = io.StringIO()
+            stats = pstats.Stats(profiler, stream=report)
+            stats.sort_stats("cumulative").print_stats(60)
+            record.text = report.getvalue()
+            record.raw = marshal.dumps(stats.stats)
+            record.samples = sum(entry[1] for entry in stats.stats.values())
+        elif sampler is not None:
+            record.text = sampler.collapsed()
+            record.samples = sampler.samples
+        self._store(record)
+        logger.info(f"Saved {record.mode} profile of {record.method} {record.path} ({record.seconds:.3f}s)")
+
+    def _store(self, record: ProfileRecord):
+        with self._lock:
+            self._profiles[record.profile_id] = record
+            while len(self._profiles) > self.max_stored:
+                self._profiles.popitem(last=False)
+
+    def recent(self) -> List[dict]:
+        """Summaries of stored profiles, newest first."""
+        with self._lock:
+            return [record.summary() for record in reversed(self._profiles.values())]
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+# Create a singleton instance for the application
+request_profiler = RequestProfiler()
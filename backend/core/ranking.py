@@ -0,0 +1,308 @@
+# backend/core/ranking.py
+
+import hashlib
+import math
+import os
+import posixpath
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from cachetools import LRUCache
+
+from core.file_processor import FileRecord, content_hash, estimate_tokens
+from utils.logging_setup import logger
+
+# Import / reference statements per language; each pattern captures the referenced module or path
+IMPORT_PATTERNS: Dict[str, List[re.Pattern]] = {
+    '.py': [
+        re.compile(r'^[ \t]*from\s+(?P<module>\.*[\w.]*)\s+import\s+(?:\((?P<grouped>[^)]*)\)|(?P<names>[\w \t,]+))', re.MULTILINE),
+        re.compile(r'^[ \t]*import\s+([\w., \t]+)', re.MULTILINE),
+    ],
+    '.js': [
+        re.compile(r'''\bimport\s+(?:[\w*{}\s,]+\s+from\s+)?['"]([^'"]+)['"]'''),
+        re.compile(r'''\brequire\(\s*['"]([^'"]+)['"]\s*\)'''),
+        re.compile(r'''\bexport\s+[\w*{}\s,]+\s+from\s+['"]([^'"]+)['"]'''),
+    ],
+    '.java': [re.compile(r'^\s*import\s+(?:static\s+)?([\w.]+)\s*;', re.MULTILINE)],
+    '.cs': [re.compile(r'^\s*using\s+(?:static\s+)?([\w.]+)\s*;', re.MULTILINE)],
+    '.go': [re.compile(r'^\s*(?:import\s+)?(?:\w+\s+)?"([\w./-]+)"\s*$', re.MULTILINE)],
+    '.rs': [
+        re.compile(r'^\s*(?:pub\s+)?use\s+(?:crate|super|self)::([\w:]+)', re.MULTILINE),
+        re.compile(r'^\s*(?:pub\s+)?mod\s+(\w+)\s*;', re.MULTILINE),
+    ],
+    '.c': [re.compile(r'^\s*#\s*include\s+"([^"]+)"', re.MULTILINE)],
+    '.rb': [re.compile(r'''^\s*require(?:_relative)?\s*\(?\s*['"]([^'"]+)['"]''', re.MULTILINE)],
+    '.php': [re.compile(r'''\b(?:require|include)(?:_once)?\s*\(?\s*['"]([^'"]+)['"]''')],
+    '.css': [re.compile(r'''@import\s+(?:url\()?\s*['"]?([^'")\s;]+)''')],
+    '.html': [re.compile(r'''<(?:script|link)\b[^>]*?\b(?:src|href)\s*=\s*['"]([^'"]+)['"]''', re.IGNORECASE)],
+}
+IMPORT_PATTERNS['.jsx'] = IMPORT_PATTERNS['.js']
+IMPORT_PATTERNS['.cpp'] = IMPORT_PATTERNS['.c']
+
+# Lines that define a function, class or type in common languages
+_SYMBOL_PATTERN = re.compile(
+    r'^\s*(?:export\s+)?(?:pub(?:\(\w+\))?\s+)?(?:public\s+|private\s+|protected\s+|static\s+|abstract\s+|final\s+)*'
+    r'(?:async\s+)?(?:def|class|function|func|fn|struct|interface|trait|enum|impl|module|type)\s+\w+',
+    re.MULTILINE
+)
+
+# Stems that mark a program's entry point
+ENTRY_POINT_STEMS = {'main', '__main__', 'app', 'server', 'index', 'cli', 'manage', 'wsgi', 'asgi', 'program', 'lib'}
+
+# Path segments of files that rarely explain how a project works
+LOW_VALUE_SEGMENTS = {'test', 'tests', 'spec', 'specs', '__tests__', 'example', 'examples', 'docs', 'doc',
+                      'fixtures', 'migrations', 'samples', 'benchmarks', 'scripts', 'mocks'}
+
+# Stems of package markers that represent their directory in import paths
+_PACKAGE_STEMS = {'__init__', 'index', 'mod'}
+
+# Weights of the signals combined into a file's score
+GRAPH_WEIGHT = 2.0
+SYMBOL_WEIGHT = 1.0
+ENTRY_POINT_BONUS = 0.6
+README_BONUS = 0.8
+LOW_VALUE_PENALTY = 0.6
+CONFIG_PENALTY = 0.3
+TINY_FILE_PENALTY = 0.3
+DEPTH_PENALTY = 0.05
+
+class FileFeatures(NamedTuple):
+    """Per-file signals that depend only on the file's path and content."""
+    references: Tuple[str, ...]
+    symbols: int
+
+class RankedFile(NamedTuple):
+    filename: str
+    score: float
+    tokens: int
+
+class FileRanker:
+    """
+    Orders files by how much they tell the model about a project and keeps
+    the best ones within a token budget.
+
+    A file's score combines its centrality in the import/reference graph
+    (PageRank, so files imported by important files rank high), how many
+    symbols it defines, path heuristics (entry points and READMEs up;
+    tests, docs, examples and config down) and size. Per-file features are
+    cached by path and content hash, so re-ranking a project after an edit
+    only re-parses the changed files; whole rankings are cached by the set
+    of file hashes.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, token_budget: Optional[int] = None, cache_size: Optional[int] = None):
+        self.enabled = enabled if enabled is not None else os.environ.get("RANKING_ENABLED", "true").lower() == "true"
+        # Token budget for a single-prompt analysis; chunked mode passes its own
+        self.token_budget = token_budget or int(os.environ.get("PROMPT_TOKEN_BUDGET", "24000"))
+        cache_size = cache_size or int(os.environ.get("RANKING_CACHE_SIZE", "20000"))
+        self._features = LRUCache(maxsize=cache_size)
+        self._rankings = LRUCache(maxsize=64)
+        self._lock = threading.Lock()
+
+    def select(self, files: List[FileRecord], token_budget: Optional[int] = None) -> Tuple[List[FileRecord], int]:
+        """
+        Return the files to prompt with, most informative first, within the budget.
+
+        Files that do not fit are skipped, but smaller lower-ranked files may
+        still fill the remaining budget.
+
+        Args:
+            files: Files to rank (already preprocessed)
+            token_budget: Estimated-token budget (defaults to token_budget)
+
+        Returns:
+            Tuple of (selected files in rank order, number of files left out)
+        """
+        if not self.enabled or not files:
+            return files, 0
+
+        budget = token_budget or self.token_budget
+        by_name: Dict[str, List[FileRecord]] = {}
+        for file in files:
+            by_name.setdefault(file.filename, []).append(file)
+        selected = []
+        remaining = budget
+        for ranked in self.rank(files):
+            file = by_name[ranked.filename].pop()
+            if ranked.tokens <= remaining:
+                selected.append(file)
+                remaining -= ranked.tokens
+
+        left_out = len(files) - len(selected)
+        if left_out:
+            logger.info(f"Ranking kept {len(selected)} of {len(files)} files within a budget of {budget} tokens")
+        return selected, left_out
+
+    def rank(self, files: List[FileRecord]) -> List[RankedFile]:
+        """Score every file, highest first (ties broken by path)."""
+        hashes = [(file.filename, file.file_type, content_hash(file.content)) for file in files]
+        ranking_key = hashlib.sha256(repr(sorted(hashes)).encode('utf-8', errors='surrogatepass')).hexdigest()
+        with self._lock:
+            cached = self._rankings.get(ranking_key)
+        if cached is not None:
+            return cached
+
+        features = {file.filename: self._file_features(file, digest) for file, (_, _, digest) in zip(files, hashes)}
+        centrality = self._centrality(features)
+        top = max(centrality.values(), default=0) or 1
+
+        ranked = sorted(
+            (
+                RankedFile(
+                    filename=file.filename,
+                    score=round(self._score(file, features[file.filename], centrality[file.filename] / top), 4),
+                    tokens=estimate_tokens(file.content)
+                )
+                for file in files
+            ),
+            key=lambda ranked_file: (-ranked_file.score, ranked_file.filename)
+        )
+        logger.debug("Ranked project files", extra={"top_files": [ranked_file.filename for ranked_file in ranked[:10]]})
+
+        with self._lock:
+            self._rankings[ranking_key] = ranked
+        return ranked
+
+    def _file_features(self, file: FileRecord, digest: str) -> FileFeatures:
+        key = (file.filename, digest)
+        with self._lock:
+            features = self._features.get(key)
+        if features is None:
+            features = FileFeatures(
+                references=tuple(sorted(self._references(file))),
+                symbols=len(_SYMBOL_PATTERN.findall(file.content))
+            )
+            with self._lock:
+                self._features[key] = features
+        return features
+
+    @staticmethod
+    def _references(file: FileRecord) -> Set[str]:
+        """Extract referenced modules as dotted paths, resolving relative references against the file's directory."""
+        references = set()
+        directory = posixpath.dirname(file.filename)
+        for pattern in IMPORT_PATTERNS.get(file.file_type, []):
+            for match in pattern.finditer(file.content):
+                if file.file_type == '.py' and pattern.groupindex:
+                    # from X import a, b: try X.a and X.b, which fall back to X when they are not modules
+                    module = match.group('module')
+                    names = _python_names(match.group('grouped') or match.group('names') or "")
+                    targets = [f"{module}.{name}" if module and not module.endswith('.') else f"{module}{name}" for name in names] or [module]
+                elif file.file_type == '.py':
+                    targets = _python_names(match.group(1))
+                else:
+                    targets = [match.group(1)]
+
+                for target in targets:
+                    reference = _normalize_reference(target, directory, file.file_type)
+                    if reference:
+                        references.add(reference)
+        return references
+
+    @staticmethod
+    def _centrality(features: Dict[str, FileFeatures]) -> Dict[str, float]:
+        """PageRank over the resolved import graph (edges point from importer to imported file)."""
+        # Every dotted suffix of a file's module path resolves to that file
+        index: Dict[str, Set[str]] = {}
+        for filename in features:
+            parts = _module_parts(filename)
+            for start in range(len(parts)):
+                index.setdefault(".".join(parts[start:]), set()).add(filename)
+
+        edges: Dict[str, Set[str]] = {filename: set() for filename in features}
+        for filename, file_features in features.items():
+            for reference in file_features.references:
+                parts = reference.split('.')
+                # Longest resolvable prefix wins: a.b.c may name module a.b's symbol c
+                for end in range(len(parts), 0, -1):
+                    targets = index.get(".".join(parts[:end]))
+                    if targets:
+                        # Ambiguous short names (e.g. "utils") spread their weight thinly
+                        if len(targets) <= 3:
+                            edges[filename].update(target for target in targets if target != filename)
+                        break
+
+        count = len(features)
+        damping = 0.85
+        rank = {filename: 1 / count for filename in features}
+        for _ in range(20):
+            dangling = sum(rank[filename] for filename, targets in edges.items() if not targets)
+            updated = {filename: (1 - damping + damping * dangling) / count for filename in features}
+            for filename, targets in edges.items():
+                if targets:
+                    share = damping * rank[filename] / len(targets)
+                    for target in targets:
+                        updated[target] += share
+            rank = updated
+        return rank
+
+    @staticmethod
+    def _score(file: FileRecord, features: FileFeatures, centrality: float) -> float:
+        parts = file.filename.lower().split('/')
+        stem = os.path.splitext(parts[-1])[0]
+
+        score = GRAPH_WEIGHT * centrality
+        score += SYMBOL_WEIGHT * min(math.log1p(features.symbols) / math.log1p(50), 1.0)
+        if stem in ENTRY_POINT_STEMS and len(parts) <= 3:
+            score += ENTRY_POINT_BONUS
+        if stem == 'readme':
+            score += README_BONUS / len(parts)
+        if any(part in LOW_VALUE_SEGMENTS for part in parts[:-1]) or stem.startswith('test_') or stem.endswith(('_test', '.test', '.spec')):
+            score -= LOW_VALUE_PENALTY
+        if file.file_type in ('.json', '.yaml', '.yml', '.xml') and len(parts) > 1:
+            score -= CONFIG_PENALTY
+        if len(file.content) < 200:
+            score -= TINY_FILE_PENALTY
+        score -= DEPTH_PENALTY * min(len(parts) - 1, 6)
+        return score
+
+def _module_parts(filename: str) -> List[str]:
+    """Dotted module path of a file: directories plus stem, with package markers standing for their directory."""
+    parts = os.path.splitext(filename)[0].replace('\\', '/').split('/')
+    if len(parts) > 1 and parts[-1] in _PACKAGE_STEMS:
+        parts = parts[:-1]
+    return [part for part in parts if part]
+
+def _python_names(text: str) -> List[str]:
+    """Names from a Python import list, without aliases or comments."""
+    names = []
+    for line in text.splitlines():
+        for item in line.split('#', 1)[0].split(','):
+            words = item.split()
+            if words and words[0].replace('.', '_').isidentifier():
+                names.append(words[0])
+    return names
+
+def _normalize_reference(target: str, directory: str, file_type: str) -> Optional[str]:
+    """Turn an import target into a dotted module path comparable with _module_parts."""
+    target = target.strip()
+    if not target:
+        return None
+
+    if file_type == '.py' and target.startswith('.'):
+        # Leading dots climb packages from the importing file's directory
+        dots = len(target) - len(target.lstrip('.'))
+        base = directory.split('/') if directory else []
+        base = base[:len(base) - (dots - 1)] if dots > 1 else base
+        rest = target[dots:]
+        return ".".join(base + ([rest] if rest else [])) or None
+
+    if file_type == '.rs':
+        return target.replace('::', '.')
+
+    if '/' in target or target.startswith('.'):
+        if target.startswith(('http:', 'https:', '//', 'data:')):
+            return None
+        if target.startswith('.'):
+            target = posixpath.normpath(posixpath.join(directory, target))
+        target = os.path.splitext(target.split('?')[0])[0]
+        return ".".join(part for part in target.split('/') if part not in ('', '.', '..')) or None
+
+    if file_type in ('.c', '.cpp', '.rb', '.php', '.css', '.html'):
+        return os.path.splitext(target)[0]
+
+    return target
+
+# Create a singleton instance for the application
+file_ranker = FileRanker()
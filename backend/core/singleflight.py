@@ -0,0 +1,132 @@
+# backend/core/singleflight.py
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from core.metrics import COALESCED_REQUESTS
+from utils.logging_setup import logger
+
+# The event loop keeps only weak references to tasks; these hold the shared work until it ends
+_background_tasks = set()
+
+def _spawn(coro: Awaitable[Any]) -> asyncio.Task:
+    """Start a task that no caller awaits and keep it referenced until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one in-flight execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    running wait for the same result (or exception). The work runs in its own
+    task, so it finishes even if the caller that started it disconnects.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(
+        self,
+        key: str,
+        run: Callable[[], Awaitable[Any]],
+        linger: Optional[Callable[[Any], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        Return the result of ``run()``, sharing it with concurrent callers of ``key``.
+
+        Args:
+            key: Identity of the work; equal keys must produce equal results
+            run: Coroutine factory that does the work (only called by the first caller)
+            linger: Optional coroutine factory given the result; the key stays
+                joinable until it completes (e.g. while a shared stream is live)
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.get_running_loop().create_future()
+            # Mark exceptions as retrieved even if every waiter has gone away
+            flight.add_done_callback(lambda future: future.cancelled() or future.exception())
+            self._flights[key] = flight
+            _spawn(self._lead(key, flight, run, linger))
+        else:
+            COALESCED_REQUESTS.labels(self.name).inc()
+            logger.info(f"Coalesced duplicate {self.name} request onto in-flight work ({key[:12]})")
+
+        # A waiter being cancelled must not cancel the shared work
+        return await asyncio.shield(flight)
+
+    async def _lead(self, key: str, flight: asyncio.Future, run, linger):
+        try:
+            try:
+                result = await run()
+            except Exception as e:
+                flight.set_exception(e)
+                return
+            flight.set_result(result)
+            if linger is not None:
+                try:
+                    await linger(result)
+                except Exception:
+                    pass
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+class Broadcast:
+    """
+    Fans one async iterator out to any number of subscribers.
+
+    The source is consumed once by a background task. Each subscriber first
+    replays the items it missed and then follows the live stream; an error in
+    the source is re-raised in every subscriber.
+    """
+
+    def __init__(self, source: AsyncIterator[Any]):
+        self._items: List[Any] = []
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._changed = asyncio.Event()
+        self._task = _spawn(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Any]):
+        try:
+            async for item in source:
+                self._items.append(item)
+                self._notify()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._closed = True
+            self._notify()
+
+    def _notify(self):
+        # Wake current subscribers and give later ones a fresh event to wait on
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            if index < len(self._items):
+                yield self._items[index]
+                index += 1
+                continue
+            if self._closed:
+                if self._error is not None:
+                    raise self._error
+                return
+            await self._changed.wait()
+
+    async def wait_closed(self):
+        await asyncio.shield(self._task)
+
+# Singletons for whole analyses and for individual upstream completions
+analysis_flights = SingleFlight("analysis")
+stream_flights = SingleFlight("stream")
+completion_flights = SingleFlight("completion")
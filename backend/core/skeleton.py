@@ -0,0 +1,200 @@
+# backend/core/skeleton.py
+
+import ast
+import hashlib
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from utils.logging_setup import logger
+
+# Brace-delimited languages handled by the heuristic skeletonizer, with their line comment marker
+BRACE_LANGUAGES = {
+    '.js': '//',
+    '.jsx': '//',
+    '.java': '//',
+    '.c': '//',
+    '.cpp': '//',
+    '.cs': '//',
+    '.go': '//',
+    '.rs': '//',
+    '.php': '//',
+}
+
+# Block openers whose members should be kept rather than elided
+_CONTAINER_PATTERN = re.compile(r'\b(class|interface|namespace|enum|struct|trait|impl|module|object)\b')
+
+# String literals, line comments and block comments (closed, or left open at the end of the line)
+# are removed before counting braces
+_STRIP_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|//.*$|/\*.*?(?:\*/|$)')
+
+class Skeletonizer:
+    """
+    Reduces source files to their structure: imports, signatures, docstrings
+    and short bodies, with long bodies elided.
+
+    Python files are parsed with ``ast``; brace-delimited languages use a
+    brace-matching heuristic. Skeletons are cached by content hash.
+    """
+
+    def __init__(self, max_body_lines: Optional[int] = None, cache_size: Optional[int] = None):
+        self.max_body_lines = max_body_lines or int(os.environ.get("SKELETON_MAX_BODY_LINES", "6"))
+        self._cache = LRUCache(maxsize=cache_size or int(os.environ.get("SKELETON_CACHE_SIZE", "2048")))
+        self._lock = threading.Lock()
+
+    def supports(self, file_type: str) -> bool:
+        return file_type == '.py' or file_type in BRACE_LANGUAGES
+
+    def skeletonize(self, content: str, file_type: str) -> Optional[str]:
+        """
+        Return a skeleton of the source, or None if the file type is unsupported
+        or the source cannot be parsed.
+        """
+        if not self.supports(file_type):
+            return None
+
+        key = (hashlib.sha256(content.encode('utf-8', errors='surrogatepass')).hexdigest(), file_type)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
+        if file_type == '.py':
+            skeleton = self._skeletonize_python(content)
+        else:
+            skeleton = self._skeletonize_braces(content, BRACE_LANGUAGES[file_type])
+
+        with self._lock:
+            self._cache[key] = skeleton
+        return skeleton
+
+    def _skeletonize_python(self, content: str) -> Optional[str]:
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError) as e:
+            logger.debug(f"Cannot parse Python source for skeleton: {e}")
+            return None
+
+        lines = content.splitlines()
+        output: List[str] = []
+        self._emit_python_body(tree.body, lines, output)
+        return '\n'.join(output)
+
+    def _emit_python_body(self, body: List[ast.stmt], lines: List[str], output: List[str]):
+        for node in body:
+            start = self._node_start(node)
+            end = node.end_lineno
+
+            if isinstance(node, ast.ClassDef):
+                # Keep the class header and docstring, then walk its members
+                header_end = node.body[0].lineno - 1
+                output.extend(lines[start - 1:header_end])
+                self._emit_python_body(node.body, lines, output)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                body_start = node.body[0].lineno
+                body_lines = end - body_start + 1
+                if body_lines <= self.max_body_lines or body_start == node.lineno:
+                    output.extend(lines[start - 1:end])
+                    continue
+
+                output.extend(lines[start - 1:body_start - 1])
+                indent = re.match(r'\s*', lines[body_start - 1]).group(0)
+                remaining = node.body
+                docstring = ast.get_docstring(node, clean=False)
+                if docstring is not None:
+                    first = node.body[0]
+                    output.extend(lines[first.lineno - 1:first.end_lineno])
+                    remaining = node.body[1:]
+                if remaining:
+                    elided = end - remaining[0].lineno + 1
+                    output.append(f"{indent}...  # {elided} lines elided")
+            elif end - start + 1 <= self.max_body_lines or self._always_kept(node):
+                output.extend(lines[start - 1:end])
+            else:
+                output.extend(lines[start - 1:start])
+                indent = re.match(r'\s*', lines[start - 1]).group(0)
+                output.append(f"{indent}    ...  # {end - start} lines elided")
+
+    @staticmethod
+    def _always_kept(node: ast.stmt) -> bool:
+        """Imports and docstrings are kept whatever their length."""
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return True
+        return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+
+    @staticmethod
+    def _node_start(node: ast.stmt) -> int:
+        decorators = getattr(node, 'decorator_list', None)
+        if decorators:
+            return min(decorator.lineno for decorator in decorators)
+        return node.lineno
+
+    def _skeletonize_braces(self, content: str, comment: str) -> str:
+        lines = content.splitlines()
+        depths = self._line_depths(lines)
+        output: List[str] = []
+        index = 0
+
+        while index < len(lines):
+            line = lines[index]
+            output.append(line)
+            opens_block = depths[index + 1] > depths[index]
+
+            if opens_block and not _CONTAINER_PATTERN.search(line):
+                close = self._matching_close(depths, index)
+                inner = close - index - 1
+                if inner > self.max_body_lines:
+                    indent = re.match(r'\s*', lines[index + 1] if index + 1 < len(lines) else line).group(0)
+                    output.append(f"{indent}{comment} ... {inner} lines elided")
+                    index = close
+                    continue
+            index += 1
+
+        return '\n'.join(output)
+
+    @staticmethod
+    def _line_depths(lines: List[str]) -> List[int]:
+        """Brace depth before each line, plus the depth after the last line."""
+        depths = [0]
+        depth = 0
+        in_comment = False
+        for line in lines:
+            if in_comment:
+                # Inside a /* ... */ comment that started on an earlier line
+                end = line.find('*/')
+                if end < 0:
+                    depths.append(depth)
+                    continue
+                line = line[end + 2:]
+            code, in_comment = Skeletonizer._strip_code(line)
+            depth = max(depth + code.count('{') - code.count('}'), 0)
+            depths.append(depth)
+        return depths
+
+    @staticmethod
+    def _strip_code(line: str) -> Tuple[str, bool]:
+        """Remove strings and comments from a line, and report whether a block comment is left open."""
+        left_open = False
+
+        def strip(match: re.Match) -> str:
+            nonlocal left_open
+            text = match.group(0)
+            # "/*/" also ends in "*/" but does not close the comment
+            left_open = text.startswith('/*') and not (len(text) >= 4 and text.endswith('*/'))
+            return ''
+
+        return _STRIP_PATTERN.sub(strip, line), left_open
+
+    @staticmethod
+    def _matching_close(depths: List[int], open_index: int) -> int:
+        """Index of the line where the block opened on open_index closes."""
+        base = depths[open_index]
+        for index in range(open_index + 1, len(depths) - 1):
+            if depths[index + 1] <= base:
+                return index
+        return len(depths) - 2
+
+# Create a singleton instance for the application
+skeletonizer = Skeletonizer()
@@ -0,0 +1,388 @@
+# backend/loadtest.py
+"""
+End-to-end load test of the API against a local stand-in inference server.
+
+Starts an OpenAI-compatible stub with configurable latency, token rate and
+error rate, starts the app (main.py) with AI_BACKENDS pointed at the stub,
+generates synthetic repositories and drives POST /api/v1/analyze at a fixed
+concurrency. Reports p50/p95/p99 latency, throughput and error rates, so no
+real inference quota is spent.
+
+Usage:
+    python loadtest.py --concurrency 16 --requests 400
+    python loadtest.py --duration 60 --latency 1.5 --token-rate 40 --error-rate 0.02
+    python loadtest.py --save-baseline load_baseline.json
+    python loadtest.py --baseline load_baseline.json --tolerance 0.15
+    python loadtest.py --target http://localhost:8000 --stub-url http://localhost:9100
+
+With --baseline the script exits with status 1 if throughput dropped or
+p95 latency rose by more than the tolerance. Per-client rate limiting is
+off unless ADMISSION_RATE is set in the environment; every other setting
+is read from the environment as usual.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from bench_ingestion import RepoSpec, generate_repo
+
+FIGURES = ["Alan Turing", "Leonardo da Vinci", "Marie Curie", "Albert Einstein", "Nikola Tesla", "Isaac Newton", "Aristotle", "Sun Tzu"]
+
+class StubConfig(NamedTuple):
+    """Behaviour of the stand-in inference server."""
+    latency: float
+    token_rate: float
+    completion_tokens: int
+    error_rate: float
+    seed: int
+
+class RequestResult(NamedTuple):
+    status: int
+    seconds: float
+    # Transport failure (timeout, refused connection) instead of an HTTP status
+    error: Optional[str] = None
+    # False when the app answered 200 but without an AI analysis (upstream failed)
+    analyzed: bool = False
+
+def build_stub_app(config: StubConfig):
+    """
+    OpenAI-compatible chat completions server with synthetic timing.
+
+    Each completion waits ``latency`` seconds before its first token and then
+    produces ``completion_tokens`` tokens at ``token_rate`` tokens/s (in one
+    response, or as SSE chunks when streaming). A fraction ``error_rate`` of
+    calls fail with a 500 instead.
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Inference stub")
+    rng = random.Random(config.seed)
+    stats = Counter()
+
+    def completion_tokens(body: dict) -> int:
+        return max(1, min(config.completion_tokens, int(body.get("max_tokens") or config.completion_tokens)))
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "loadtest"}]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        stats["prompt_chars"] += sum(len(message.get("content") or "") for message in body.get("messages", []))
+        if rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "injected stub failure", "type": "server_error"}})
+
+        tokens = completion_tokens(body)
+        stats["completion_tokens"] += tokens
+        created = int(time.time())
+        model = body.get("model", "stub")
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.latency + (tokens / config.token_rate if config.token_rate > 0 else 0))
+            return {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": " ".join(["token"] * tokens)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens}
+            }
+
+        async def events():
+            await asyncio.sleep(config.latency)
+            for index in range(tokens):
+                if config.token_rate > 0:
+                    await asyncio.sleep(1 / config.token_rate)
+                chunk = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "finish_reason": None, "delta": {"content": "token" if index == 0 else " token"}}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _spawn(args: List[str], env: Dict[str, str], quiet: bool) -> subprocess.Popen:
+    output = subprocess.DEVNULL if quiet else None
+    return subprocess.Popen([sys.executable, *args], cwd=str(current_dir), env=env, stdout=output, stderr=output)
+
+async def _wait_until_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Process serving {url} exited with status {process.returncode}")
+            try:
+                if (await client.get(url, timeout=2)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0 for an empty one)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+async def run_load(
+    target: str,
+    repos: List[str],
+    concurrency: int,
+    requests: Optional[int],
+    duration: Optional[float],
+    mode: str,
+    bypass_cache: bool,
+    timeout: float
+) -> List[RequestResult]:
+    """Send analyses from ``concurrency`` workers until the request count or duration is reached."""
+    results: List[RequestResult] = []
+    sent = 0
+    deadline = time.monotonic() + duration if duration else None
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+        async def worker(worker_id: int):
+            nonlocal sent
+            rng = random.Random(worker_id)
+            while True:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                if requests is not None and sent >= requests:
+                    return
+                sent += 1
+                body = {
+                    "folder_path": rng.choice(repos),
+                    "historical_figure": rng.choice(FIGURES),
+                    "mode": mode,
+                    "response_view": "manifest",
+                    "bypass_cache": bypass_cache
+                }
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/api/v1/analyze", json=body, headers={"X-Client-ID": f"loadtest-{worker_id}"})
+                    seconds = time.perf_counter() - started
+                    analyzed = response.status_code == 200 and response.json().get("status") == "success"
+                    results.append(RequestResult(response.status_code, seconds, analyzed=analyzed))
+                except httpx.HTTPError as e:
+                    results.append(RequestResult(0, time.perf_counter() - started, type(e).__name__))
+
+        await asyncio.gather(*(worker(worker_id) for worker_id in range(concurrency)))
+    return results
+
+def summarize(results: List[RequestResult], elapsed: float) -> dict:
+    """
+    Latency percentiles (over 200 responses), throughput and error rates.
+    
+    ``error_rate`` counts non-200 responses and transport failures;
+    ``degraded_rate`` counts 200 responses that came back without an AI
+    analysis because every upstream attempt failed.
+    """
+    succeeded = [result.seconds for result in results if result.status == 200]
+    degraded = sum(1 for result in results if result.status == 200 and not result.analyzed)
+    outcomes = Counter(result.error or str(result.status) for result in results)
+    return {
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "error_rate": round(1 - len(succeeded) / len(results), 4) if results else 0.0,
+        "degraded_rate": round(degraded / len(results), 4) if results else 0.0,
+        "outcomes": dict(outcomes),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(succeeded) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50": round(percentile(succeeded, 0.50), 4),
+        "latency_p95": round(percentile(succeeded, 0.95), 4),
+        "latency_p99": round(percentile(succeeded, 0.99), 4),
+        "latency_max": round(max(succeeded, default=0.0), 4),
+    }
+
+def print_summary(summary: dict, stub_stats: dict, baseline: dict):
+    def versus(key: str) -> str:
+        base = baseline.get(key)
+        return f" ({(summary[key] / base - 1) * 100:+.1f}% vs base)" if base else ""
+
+    print(f"requests      {summary['requests']} in {summary['elapsed_seconds']:.1f}s, {summary['succeeded']} succeeded")
+    print(f"throughput    {summary['throughput_rps']:.2f} req/s{versus('throughput_rps')}")
+    print(f"latency p50   {summary['latency_p50'] * 1000:.0f} ms{versus('latency_p50')}")
+    print(f"latency p95   {summary['latency_p95'] * 1000:.0f} ms{versus('latency_p95')}")
+    print(f"latency p99   {summary['latency_p99'] * 1000:.0f} ms{versus('latency_p99')}")
+    print(f"latency max   {summary['latency_max'] * 1000:.0f} ms")
+    print(f"error rate    {summary['error_rate']:.2%}  {summary['outcomes']}")
+    print(f"degraded      {summary['degraded_rate']:.2%} answered without an AI analysis")
+    if stub_stats:
+        print(f"stub          {stub_stats.get('requests', 0)} upstream calls, {stub_stats.get('errors', 0)} injected errors")
+
+def find_regressions(summary: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Describe a throughput drop or p95 latency rise beyond ``tolerance``."""
+    regressions = []
+    if baseline.get("throughput_rps") and summary["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput {summary['throughput_rps']:.2f} req/s is below {baseline['throughput_rps']:.2f} req/s baseline (tolerance {tolerance:.0%})")
+    if baseline.get("latency_p95") and summary["latency_p95"] > baseline["latency_p95"] * (1 + tolerance):
+        regressions.append(f"p95 latency {summary['latency_p95'] * 1000:.0f} ms is above {baseline['latency_p95'] * 1000:.0f} ms baseline (tolerance {tolerance:.0%})")
+    return regressions
+
+async def run(args: argparse.Namespace) -> int:
+    stub_config = StubConfig(args.latency, args.token_rate, args.completion_tokens, args.error_rate, args.seed)
+    processes: List[subprocess.Popen] = []
+    stub_url = args.stub_url
+    target = args.target
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="loadtest_repos_") as root:
+            repos = []
+            for index in range(args.repos):
+                folder = os.path.join(root, f"repo{index}")
+                generate_repo(folder, RepoSpec(
+                    files=args.files, depth=2, fanout=3, min_size=200, max_size=6000,
+                    binary_ratio=0.02, large_ratio=0.01, large_size=64 * 1024, seed=args.seed + index
+                ))
+                repos.append(folder)
+
+            # An app given with --target is expected to be configured already
+            if stub_url is None and target is None:
+                port = _free_port()
+                stub_url = f"http://127.0.0.1:{port}"
+                processes.append(_spawn(
+                    [__file__, "--serve-stub", "--port", str(port), "--latency", str(args.latency), "--token-rate", str(args.token_rate),
+                     "--completion-tokens", str(args.completion_tokens), "--error-rate", str(args.error_rate), "--seed", str(args.seed)],
+                    dict(os.environ), quiet=not args.verbose
+                ))
+                await _wait_until_ready(f"{stub_url}/v1/models", processes[-1])
+
+            if target is None:
+                port = _free_port()
+                target = f"http://127.0.0.1:{port}"
+                env = dict(os.environ)
+                env.update({
+                    "AI_BACKENDS": "loadtest",
+                    "AI_BACKEND_LOADTEST_TYPE": "openai",
+                    "AI_BACKEND_LOADTEST_BASE_URL": f"{stub_url}/v1",
+                    "AI_BACKEND_LOADTEST_API_KEY": "loadtest",
+                })
+                env.setdefault("ADMISSION_RATE", "0")
+                env.setdefault("LOG_LEVEL", "WARNING")
+                processes.append(_spawn(
+                    ["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+                    env, quiet=not args.verbose
+                ))
+            await _wait_until_ready(f"{target}/ready", processes[-1] if args.target is None else None)
+
+            print(
+                f"Load: {args.concurrency} concurrent clients, {args.repos} repos x {args.files} files, "
+                f"stub latency {args.latency}s + {args.completion_tokens} tokens at {args.token_rate}/s, error rate {args.error_rate:.0%}"
+            )
+            started = time.perf_counter()
+            results = await run_load(
+                target, repos, args.concurrency, args.requests if not args.duration else None, args.duration,
+                args.mode, not args.use_cache, args.timeout
+            )
+            summary = summarize(results, time.perf_counter() - started)
+
+        stub_stats = {}
+        try:
+            if stub_url is None:
+                raise ValueError("no stub")
+            async with httpx.AsyncClient() as client:
+                stub_stats = (await client.get(f"{stub_url}/stats", timeout=5)).json()
+        except (httpx.HTTPError, ValueError):
+            pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            saved = json.load(file)
+        baseline = saved['summary']
+        if saved.get('config') != _config(args):
+            print("Warning: baseline was recorded with a different load configuration; comparison may be meaningless")
+
+    print_summary(summary, stub_stats, baseline)
+
+    if args.save_baseline:
+        payload = {'config': _config(args), 'python': platform.python_version(), 'created_at': time.time(), 'summary': summary}
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump(payload, file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    regressions = find_regressions(summary, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+def _config(args: argparse.Namespace) -> dict:
+    """The settings that make two runs comparable."""
+    keys = ("concurrency", "requests", "duration", "repos", "files", "mode", "use_cache", "latency", "token_rate", "completion_tokens", "error_rate", "seed")
+    return {key: getattr(args, key) for key in keys}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test /api/v1/analyze against a local stand-in inference server.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients")
+    parser.add_argument('--requests', type=int, default=200, help="Total requests to send")
+    parser.add_argument('--duration', type=float, default=None, help="Run for this many seconds instead of a fixed request count")
+    parser.add_argument('--repos', type=int, default=4, help="Number of synthetic repositories")
+    parser.add_argument('--files', type=int, default=200, help="Files per synthetic repository")
+    parser.add_argument('--mode', choices=["single", "chunked"], default="single", help="Analysis mode to request")
+    parser.add_argument('--use-cache', action='store_true', help="Let repeated analyses hit the response cache")
+    parser.add_argument('--timeout', type=float, default=120, help="Client timeout per request in seconds")
+    parser.add_argument('--latency', type=float, default=0.5, help="Stub delay before the first token, in seconds")
+    parser.add_argument('--token-rate', type=float, default=200, help="Stub completion tokens per second (0 = instant)")
+    parser.add_argument('--completion-tokens', type=int, default=100, help="Tokens per stub completion")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of stub calls that fail with a 500")
+    parser.add_argument('--seed', type=int, default=1234, help="Random seed for repos and injected errors")
+    parser.add_argument('--target', help="Load an already running app at this URL instead of starting one")
+    parser.add_argument('--stub-url', help="Use an already running stub at this URL instead of starting one")
+    parser.add_argument('--serve-stub', action='store_true', help="Only run the stub server (on --port) until interrupted")
+    parser.add_argument('--port', type=int, default=9100, help="Port for --serve-stub")
+    parser.add_argument('--baseline', help="Compare against this baseline JSON file")
+    parser.add_argument('--save-baseline', help="Write the results to this baseline JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.20, help="Allowed throughput drop / p95 rise before failing")
+    parser.add_argument('--verbose', action='store_true', help="Show the app's and stub's log output")
+    args = parser.parse_args()
+
+    if args.serve_stub:
+        import uvicorn
+        config = StubConfig(args.latency, args.token_rate, args.completion_tokens, args.error_rate, args.seed)
+        uvicorn.run(build_stub_app(config), host="127.0.0.1", port=args.port, log_level="warning")
+        return 0
+
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
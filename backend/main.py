@@ -1,24 +1,62 @@
 # backend/main.py
 
+import asyncio
 import os
 import sys
+import time
+import uuid
 from pathlib import Path
 
-# Add the current directory to Python path so relative imports work
-current_dir = Path(__file__).parent
-sys.path.append(str(current_dir))
+_import_started = time.perf_counter()
 
-from fastapi import FastAPI
+# Make the backend packages importable when started from another directory
+current_dir = str(Path(__file__).parent)
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
 # Import our modules using absolute paths
 from api.endpoints import router as analysis_router
-from utils.logging_setup import logger, setup_logging
+from core.admission import admission_controller
+from core.ai_client import ai_client
+from core.jobs import job_manager
+from core.metrics import CONTENT_TYPE_LATEST, HTTP_IN_FLIGHT, IMPORT_SECONDS, READY, STARTUP_SECONDS, render_metrics
+from core.profiling import request_profiler
+from utils.logging_setup import logger, request_id_var, setup_logging, shutdown_logging
 
 # Setup logging first thing
 setup_logging()
 
+import_seconds = time.perf_counter() - _import_started
+IMPORT_SECONDS.set(import_seconds)
+logger.info(f"Application modules imported in {import_seconds:.3f}s")
+
+async def warm_up(app: FastAPI, started: float):
+    """Build the AI clients, pre-open upstream connections and mark the service ready."""
+    run_completion = os.environ.get("AI_WARMUP_COMPLETION", "false").lower() == "true"
+    timeout = float(os.environ.get("AI_WARMUP_TIMEOUT", "30"))
+    try:
+        await asyncio.wait_for(ai_client.warm_up(run_completion=run_completion), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Warm-up did not finish within {timeout}s; serving cold")
+    
+    # Check that at least one inference backend could be configured
+    if not ai_client.backends:
+        logger.error("CRITICAL: No inference backend is configured (set HF_TOKEN or AI_BACKENDS). The AI functionality will fail.")
+    else:
+        logger.info(f"Inference backends: {', '.join(backend['name'] for backend in ai_client.backend_status())}")
+    
+    app.state.startup_seconds = time.perf_counter() - started
+    app.state.ready = True
+    READY.set(1)
+    STARTUP_SECONDS.set(app.state.startup_seconds)
+    logger.info(f"Service ready {app.state.startup_seconds:.2f}s after startup began")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -26,25 +64,33 @@ async def lifespan(app: FastAPI):
     This is the professional way to handle app lifecycle in FastAPI.
     """
     # Startup
+    started = time.perf_counter()
     logger.info("Digital Necromancer API is starting up...")
     
-    # Check if our crucial environment variable is set
-    if not os.environ.get("HF_TOKEN"):
-        logger.error("CRITICAL: HF_TOKEN environment variable is not set. The AI functionality will fail.")
-    else:
-        logger.info("HF_TOKEN environment variable found.")
+    job_manager.start()
+    
+    # Warm up in the background so liveness checks answer while /ready still reports 503
+    app.state.ready = False
+    READY.set(0)
+    warm_up_task = asyncio.create_task(warm_up(app, started))
     
     yield  # The application runs here
     
     # Shutdown
+    warm_up_task.cancel()
+    await asyncio.gather(warm_up_task, return_exceptions=True)
+    await job_manager.stop()
+    await ai_client.aclose()
     logger.info("Digital Necromancer API is shutting down.")
+    shutdown_logging()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
     title="Digital Necromancer API",
     description="An API to conjure the wisdom of historical figures for code and project analysis.",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # Faster JSON encoding for large responses
 )
 
 # Configure CORS - Essential for frontend-backend communication
@@ -56,6 +102,47 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Compress larger responses for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """
+    Tag logs with the request id (from X-Request-ID or generated) and count in-flight requests.
+    
+    Requests sent with `X-Profile: sample|cprofile` (or `?profile=`) are
+    profiled when profiling is enabled; the profile is stored under a
+    generated id returned in the X-Profile-ID response header. For
+    streaming responses the profile ends once the headers are sent.
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    profile_id = None
+    try:
+        with HTTP_IN_FLIGHT.track_inprogress():
+            profile_mode = request_profiler.requested_mode(request.headers, request.query_params)
+            if profile_mode:
+                async with request_profiler.profile(request_id, request.method, request.url.path, profile_mode) as record:
+                    response = await call_next(request)
+                    if record is not None:
+                        record.status_code = response.status_code
+                        profile_id = record.profile_id
+            else:
+                response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    if profile_id:
+        response.headers["X-Profile-ID"] = profile_id
+    return response
+
+def _require_profiling(request: Request):
+    """Hide the profile endpoints unless profiling is enabled, and check the token when one is set."""
+    if not request_profiler.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not request_profiler.authorized(request.headers):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token header is required.")
+
 # Include our API router
 app.include_router(analysis_router, prefix="/api/v1", tags=["analysis"])
 
@@ -74,4 +161,61 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring API status."""
-    return {"status": "healthy", "service": "digital-necromancer-api"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "service": "digital-necromancer-api",
+        "backends": ai_client.backend_status(),
+        "admission": admission_controller.status()
+    }
+
+# Readiness endpoint for load balancers and autoscalers
+@app.get("/ready")
+async def readiness_check():
+    """Report ready only once startup warm-up has finished."""
+    if not getattr(app.state, "ready", False):
+        return ORJSONResponse(status_code=503, content={"status": "warming_up"})
+    return {
+        "status": "ready",
+        "import_seconds": round(import_seconds, 3),
+        "startup_seconds": round(app.state.startup_seconds, 3)
+    }
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose stage latencies, file and token counters, cache and in-flight metrics."""
+    return Response(content=render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+# Stored per-request profiles (see request_context for how to request one)
+@app.get("/profiles", include_in_schema=False)
+async def list_profiles(request: Request):
+    """List stored profiles, newest first."""
+    _require_profiling(request)
+    return {"profiles": request_profiler.recent()}
+
+@app.get("/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(
+    request: Request,
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|pstats)$")
+):
+    """
+    Fetch one profile.
+    
+    Sampled profiles are collapsed stacks (`thread;outer;...;inner count`)
+    that flamegraph.pl or speedscope render directly. cProfile profiles are
+    a text report, or with `format=pstats` the raw stats for pstats/snakeviz.
+    """
+    _require_profiling(request)
+    record = request_profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No profile stored with id '{profile_id}'.")
+    if format == "pstats":
+        if record.raw is None:
+            raise HTTPException(status_code=400, detail="Raw pstats data is only kept for cprofile profiles.")
+        return Response(
+            content=record.raw,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+        )
+    return Response(content=record.text, media_type="text/plain")
@@ -15,7 +15,37 @@ class HistoricalFigure(str, Enum):
     ARISTOTLE = "Aristotle"
     SUN_TZU = "Sun Tzu"
 
-class AnalysisRequest(BaseModel):
+class AnalysisMode(str, Enum):
+    """How the project content is presented to the model."""
+    SINGLE = "single"
+    CHUNKED = "chunked"
+    INCREMENTAL = "incremental"
+
+class ResponseView(str, Enum):
+    """How much file data an analysis response echoes back."""
+    FULL = "full"
+    MANIFEST = "manifest"
+
+class AnalysisOptions(BaseModel):
+    """Options shared by every analysis request: how the content is sent and what comes back."""
+    bypass_cache: bool = Field(
+        False,
+        description="Skip the response cache and always request a fresh analysis."
+    )
+    mode: AnalysisMode = Field(
+        AnalysisMode.SINGLE,
+        description="'single' sends one truncated prompt; 'chunked' analyzes large projects in parallel chunks and synthesizes the result; 'incremental' is chunked but only re-analyzes files changed since the last run."
+    )
+    response_view: ResponseView = Field(
+        ResponseView.FULL,
+        description="'full' echoes every file's content; 'manifest' returns only filename, type, size, hash and status per file."
+    )
+    summarize_code: bool = Field(
+        False,
+        description="Send large source files as structural skeletons (signatures, docstrings, short bodies) so whole modules fit the prompt. Applies to 'single' and 'chunked' modes."
+    )
+
+class AnalysisRequest(AnalysisOptions):
     """Request model for the analysis endpoint."""
     folder_path: str = Field(
         ...,
@@ -27,6 +57,46 @@ class AnalysisRequest(BaseModel):
         description="The name of the historical figure to embody."
     )
 
+class MultiFigureAnalysisRequest(AnalysisOptions):
+    """Request model for analyzing one folder from several figures' perspectives."""
+    folder_path: str = Field(
+        ...,
+        description="The absolute path to the folder containing files to analyze.",
+        example="C:/Users/Developer/my_project"
+    )
+    historical_figures: List[HistoricalFigure] = Field(
+        ...,
+        description="The historical figures whose perspectives to use. Each is analyzed concurrently."
+    )
+
+class BatchItem(BaseModel):
+    """One folder and figure to analyze within a batch."""
+    folder_path: str = Field(
+        ...,
+        description="The absolute path to the folder containing files to analyze.",
+        example="C:/Users/Developer/my_project"
+    )
+    historical_figure: HistoricalFigure = Field(
+        ...,
+        description="The name of the historical figure to embody."
+    )
+
+class BatchAnalysisRequest(AnalysisOptions):
+    """Request model for analyzing many folders in one pipelined call; the options apply to every item."""
+    items: List[BatchItem] = Field(
+        ...,
+        description="Folder/figure pairs to analyze. Results stream back as each one finishes."
+    )
+    response_view: ResponseView = Field(
+        ResponseView.MANIFEST,
+        description="'manifest' (default) keeps each result line small; 'full' echoes every file's content."
+    )
+    max_concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Model calls in flight at once for this batch (capped by the server's BATCH_UPSTREAM_CONCURRENCY)."
+    )
+
 class FileContent(BaseModel):
     """Represents the content of a processed file with metadata."""
     filename: str
@@ -35,12 +105,95 @@ class FileContent(BaseModel):
     error: Optional[str] = None
     success: bool = True
 
+class FileManifestEntry(BaseModel):
+    """Lightweight description of a processed file, without its content."""
+    filename: str
+    file_type: str
+    size: int = 0
+    hash: Optional[str] = None
+    success: bool = True
+    error: Optional[str] = None
+
+class PromptStats(BaseModel):
+    """What prompt preprocessing removed before the content was sent to the model."""
+    files_in: int = 0
+    files_used: int = 0
+    duplicates_removed: int = 0
+    generated_skipped: int = 0
+    over_budget_skipped: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+    tokens_saved: int = 0
+
 class AnalysisResponse(BaseModel):
     """Response model for a successful analysis."""
     analysis: str
     status: str = "success"
     model_used: str = "gpt-oss-20b"
     processed_files: List[FileContent] = []
+    file_manifest: Optional[List[FileManifestEntry]] = None
+    prompt_stats: Optional[PromptStats] = None
+
+class FigureAnalysis(BaseModel):
+    """One figure's analysis within a multi-figure response."""
+    historical_figure: HistoricalFigure
+    analysis: Optional[str] = None
+    status: str = "success"
+
+class MultiFigureAnalysisResponse(BaseModel):
+    """Response model for a multi-figure analysis."""
+    analyses: List[FigureAnalysis] = []
+    status: str = "success"
+    model_used: str = "gpt-oss-20b"
+    processed_files: List[FileContent] = []
+    file_manifest: Optional[List[FileManifestEntry]] = None
+    prompt_stats: Optional[PromptStats] = None
+
+class BatchItemResult(BaseModel):
+    """One NDJSON line of a batch response: the outcome of a single item."""
+    type: str = "result"
+    index: int
+    folder_path: str
+    historical_figure: HistoricalFigure
+    status: str
+    seconds: float
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+class BatchSummary(BaseModel):
+    """Final NDJSON line of a batch response with aggregate throughput."""
+    type: str = "summary"
+    items: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    items_per_second: float
+    files_processed: int
+    prompt_tokens: int
+    prompt_tokens_per_second: float
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a background analysis job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobSubmitResponse(BaseModel):
+    """Response model returned when a background job is accepted."""
+    job_id: str
+    status: JobStatus = JobStatus.QUEUED
+
+class JobStatusResponse(BaseModel):
+    """Response model describing a background job and, once finished, its result."""
+    job_id: str
+    status: JobStatus
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
 
 class ErrorResponse(BaseModel):
     """Standardized error response model."""
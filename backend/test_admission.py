@@ -0,0 +1,132 @@
+# backend/test_admission.py
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.admission import AdmissionController, AdmissionRejected
+from api.endpoints import _admission_error
+
+def _controller(**overrides):
+    settings = dict(max_concurrent=1, max_queue=8, queue_timeout=1.0, interactive_reserved=0, rate=0, burst=1)
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+def test_interactive_waiters_are_served_before_batch():
+    async def scenario():
+        controller = _controller()
+        holder = await controller.acquire("interactive")
+        order = []
+
+        async def worker(name, priority):
+            ticket = await controller.acquire(priority)
+            order.append(name)
+            ticket.release()
+
+        tasks = []
+        for name, priority in [("b1", "batch"), ("i1", "interactive"), ("b2", "batch")]:
+            tasks.append(asyncio.create_task(worker(name, priority)))
+            await asyncio.sleep(0)
+        assert controller.status()["queued"] == 3
+
+        holder.release()
+        await asyncio.gather(*tasks)
+        return order, controller.status()
+
+    order, status = asyncio.run(scenario())
+    assert order == ["i1", "b1", "b2"]
+    assert status["active"] == 0 and status["queued"] == 0
+
+def test_batch_cannot_take_reserved_interactive_slots():
+    async def scenario():
+        controller = _controller(max_concurrent=2, interactive_reserved=1, queue_timeout=0.05)
+        batch = await controller.acquire("batch")
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("batch")
+        interactive = await controller.acquire("interactive")
+        batch.release()
+        interactive.release()
+
+    asyncio.run(scenario())
+
+def test_queue_timeout_returns_503_with_retry_after():
+    async def scenario():
+        controller = _controller(queue_timeout=0.05)
+        holder = await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        holder.release()
+        return rejected.value, controller.status()
+
+    error, status = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.retry_after == 1
+    assert _admission_error(error).headers["Retry-After"] == "1"
+    assert status["active"] == 0 and status["queued"] == 0
+
+def test_full_queue_is_refused_immediately():
+    async def scenario():
+        controller = _controller(max_queue=0)
+        holder = await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        # Unbounded waiters (background jobs) are not limited by max_queue
+        waiter = asyncio.create_task(controller.acquire(bounded=False))
+        await asyncio.sleep(0)
+        holder.release()
+        (await waiter).release()
+        return rejected.value
+
+    assert asyncio.run(scenario()).status_code == 503
+
+def test_token_bucket_returns_429_per_client():
+    controller = _controller(rate=1, burst=2)
+    controller.check_rate("alice")
+    controller.check_rate("alice")
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_rate("alice")
+    controller.check_rate("bob")
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    assert _admission_error(rejected.value).status_code == 429
+
+def test_releasing_a_ticket_twice_frees_one_slot():
+    async def scenario():
+        controller = _controller(max_concurrent=2)
+        first = await controller.acquire()
+        second = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        first.release()
+        first.release()
+        third = await waiter
+        status = controller.status()
+        second.release()
+        third.release()
+        return status, controller.status()
+
+    during, after = asyncio.run(scenario())
+    assert during["active"] == 2
+    assert after["active"] == 0
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        controller = _controller()
+        holder = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        holder.release()
+        (await controller.acquire()).release()
+        return controller.status()
+
+    status = asyncio.run(scenario())
+    assert status["active"] == 0 and status["queued"] == 0
@@ -0,0 +1,120 @@
+# backend/test_archive.py
+import asyncio
+import io
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.archive import ArchiveProcessor, ArchiveTooLargeError, AsyncStreamReader
+from core.file_processor import FileProcessor
+
+def _tar_bytes(members, mode="w:gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+def _zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+BUILDERS = [pytest.param(_tar_bytes, id="tar"), pytest.param(_zip_bytes, id="zip")]
+
+def _processor(**settings):
+    return ArchiveProcessor(FileProcessor(max_workers=2, **settings), max_bytes=1024 * 1024)
+
+def _read(processor, data, **kwargs):
+    return {file.filename: file for file in processor.read_archive(io.BytesIO(data), **kwargs)}
+
+@pytest.mark.parametrize("build", BUILDERS)
+def test_traversal_paths_are_skipped(build):
+    data = build({
+        "../evil.py": b"x = 1\n",
+        "src/../../escape.py": b"x = 2\n",
+        "/abs/rooted.py": b"x = 3\n",
+        "src/app.py": b"print('ok')\n",
+    })
+
+    files = _read(_processor(), data)
+
+    assert sorted(files) == ["abs/rooted.py", "src/app.py"]
+    assert files["src/app.py"].content == "print('ok')\n"
+
+@pytest.mark.parametrize("build", BUILDERS)
+def test_directory_filters_apply_to_members(build):
+    data = build({
+        "node_modules/lib.js": b"x\n",
+        "a/b/c/deep.py": b"x\n",
+        "notes.bin": b"\x00\x01",
+        "app.py": b"x = 1\n",
+        "app.log.py": b"x = 1\n",
+    })
+
+    files = _read(_processor(max_depth=2), data, exclude_patterns=["*.log.py"])
+
+    assert sorted(files) == ["app.py"]
+
+@pytest.mark.parametrize("build", BUILDERS)
+def test_size_caps_per_file_and_per_archive(build):
+    data = build({"big.py": b"x" * 5000, "small.py": b"y = 1\n", "long.py": b"z" * 300})
+
+    files = _read(_processor(max_file_size=1000), data, max_chars=100)
+
+    assert sorted(files) == ["long.py", "small.py"]
+    assert files["long.py"].content.startswith("z" * 100)
+    assert "TRUNCATED" in files["long.py"].content
+
+@pytest.mark.parametrize("build", BUILDERS)
+def test_file_limit_stops_reading(build):
+    data = build({f"m{index}.py": b"x = 1\n" for index in range(5)})
+
+    assert len(_read(_processor(max_files=2), data)) == 2
+
+def test_non_archive_is_rejected():
+    with pytest.raises(ValueError):
+        _processor().read_archive(io.BytesIO(b"just some text, not an archive"))
+
+@pytest.mark.parametrize("build", BUILDERS)
+def test_streamed_upload_over_the_limit_is_refused(build):
+    data = build({f"m{index}.py": bytes(range(256)) * 40 for index in range(10)})
+    processor = ArchiveProcessor(FileProcessor(max_workers=2), max_bytes=len(data) // 2)
+
+    async def chunks():
+        for start in range(0, len(data), 4096):
+            yield data[start:start + 4096]
+
+    async def upload():
+        loop = asyncio.get_running_loop()
+        stream = AsyncStreamReader(chunks(), loop, processor.max_bytes)
+        return await loop.run_in_executor(None, processor.read_archive, stream)
+
+    with pytest.raises(ArchiveTooLargeError):
+        asyncio.run(upload())
+
+def test_streamed_upload_within_the_limit_is_read():
+    data = _tar_bytes({"src/app.py": b"print('ok')\n"})
+    processor = _processor()
+
+    async def chunks():
+        for start in range(0, len(data), 64):
+            yield data[start:start + 64]
+
+    async def upload():
+        loop = asyncio.get_running_loop()
+        stream = AsyncStreamReader(chunks(), loop, processor.max_bytes)
+        return await loop.run_in_executor(None, processor.read_archive, stream)
+
+    assert [file.filename for file in asyncio.run(upload())] == ["src/app.py"]
@@ -0,0 +1,159 @@
+# backend/test_backends.py
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.backends import BackendRouter, BackendUnavailableError, CircuitBreaker, InferenceBackend
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+class FakeBackend(InferenceBackend):
+    """Answers (or fails) after a fixed delay and records every call."""
+
+    kind = "fake"
+
+    def __init__(self, name, delay=0.0, error=None, calls=None):
+        super().__init__(name, "fake-model", 5.0)
+        self.delay = delay
+        self.error = error
+        self.calls = calls if calls is not None else []
+        self.cancelled = 0
+
+    async def complete(self, messages, max_tokens, temperature):
+        self.calls.append(self.name)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"answer from {self.name}"
+
+    async def stream(self, messages, max_tokens, temperature):
+        self.calls.append(self.name)
+        if self.error:
+            raise self.error
+        for word in ("answer", "from", self.name):
+            await asyncio.sleep(self.delay)
+            yield word
+
+def test_inference_backend_is_abstract():
+    with pytest.raises(TypeError):
+        InferenceBackend("base", "model", 1.0)
+
+def test_breaker_opens_then_half_opens_for_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one trial call at a time
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+def test_breaker_reopens_when_half_open_trial_fails():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+def test_breaker_cancelled_trial_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_cancelled()
+    assert breaker.state == "half_open" and breaker.allow()
+
+def test_router_falls_back_in_order():
+    calls = []
+    first = FakeBackend("first", error=RuntimeError("boom"), calls=calls)
+    second = FakeBackend("second", error=RuntimeError("boom"), calls=calls)
+    third = FakeBackend("third", calls=calls)
+    router = BackendRouter([first, second, third], hedge_delay=0)
+
+    assert asyncio.run(router.complete(MESSAGES, 10, 0.0)) == "answer from third"
+    assert calls == ["first", "second", "third"]
+    assert first.breaker.failures == 1 and third.breaker.failures == 0
+
+def test_router_skips_open_circuits_and_raises_when_all_are_open():
+    calls = []
+    broken = FakeBackend("broken", calls=calls)
+    healthy = FakeBackend("healthy", calls=calls)
+    broken.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    broken.breaker.record_failure()
+
+    assert asyncio.run(BackendRouter([broken, healthy], hedge_delay=0).complete(MESSAGES, 10, 0.0)) == "answer from healthy"
+    assert calls == ["healthy"]
+
+    with pytest.raises(BackendUnavailableError):
+        asyncio.run(BackendRouter([broken], hedge_delay=0).complete(MESSAGES, 10, 0.0))
+
+def test_router_reraises_the_last_error():
+    router = BackendRouter([FakeBackend("a", error=ValueError("first")), FakeBackend("b", error=KeyError("last"))], hedge_delay=0)
+    with pytest.raises(KeyError):
+        asyncio.run(router.complete(MESSAGES, 10, 0.0))
+
+def test_hedge_goes_to_the_next_backend_and_cancels_the_loser():
+    calls = []
+    slow = FakeBackend("slow", delay=1.0, calls=calls)
+    fast = FakeBackend("fast", delay=0.01, calls=calls)
+    router = BackendRouter([slow, fast], hedge_delay=0.05)
+
+    started = time.perf_counter()
+    result = asyncio.run(router.complete(MESSAGES, 10, 0.0))
+
+    assert result == "answer from fast"
+    assert time.perf_counter() - started < 0.5
+    assert calls == ["slow", "fast"]
+    assert slow.cancelled == 1
+    # A losing hedge says nothing about the backend's health
+    assert slow.breaker.failures == 0
+
+def test_no_hedge_onto_the_same_backend():
+    only = FakeBackend("only", delay=0.2)
+    router = BackendRouter([only], hedge_delay=0.02)
+
+    assert asyncio.run(router.complete(MESSAGES, 10, 0.0)) == "answer from only"
+    assert only.calls == ["only"]
+
+def test_stream_falls_back_before_the_first_token():
+    calls = []
+    broken = FakeBackend("broken", error=RuntimeError("down"), calls=calls)
+    healthy = FakeBackend("healthy", calls=calls)
+    router = BackendRouter([broken, healthy], hedge_delay=0)
+
+    async def collect():
+        return [delta async for delta in router.stream(MESSAGES, 10, 0.0)]
+
+    assert asyncio.run(collect()) == ["answer", "from", "healthy"]
+    assert calls == ["broken", "healthy"]
+    assert broken.breaker.failures == 1
+
+def test_warm_up_sends_a_completion_only_where_asked():
+    calls = []
+    plain = FakeBackend("plain", calls=calls)
+    completing = FakeBackend("completing", calls=calls)
+    completing.warm_up_completion = True
+
+    asyncio.run(BackendRouter([plain, completing], hedge_delay=0).warm_up())
+    assert calls == ["completing"]
+
+    asyncio.run(BackendRouter([plain, completing], hedge_delay=0).warm_up(run_completion=True))
+    assert sorted(calls) == ["completing", "completing", "plain"]
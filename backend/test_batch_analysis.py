@@ -0,0 +1,68 @@
+# backend/test_batch_analysis.py
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from api.endpoints import router
+from core.ai_client import ai_client
+from core.backends import BackendRouter, StubBackend
+from core.manifest import manifest_store
+
+class CountingBackend(StubBackend):
+    """Stub backend that records the most completions it had in flight at once."""
+
+    def __init__(self):
+        super().__init__("counting", "stub-model", 5.0, 0.02)
+        self.active = 0
+        self.peak = 0
+
+    async def complete(self, messages, max_tokens, temperature):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await super().complete(messages, max_tokens, temperature)
+        finally:
+            self.active -= 1
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    backend = CountingBackend()
+    monkeypatch.setattr(ai_client, "_backends", BackendRouter([backend], hedge_delay=0))
+    monkeypatch.setattr(ai_client, "_initialized", True)
+    monkeypatch.setattr(manifest_store, "manifest_dir", str(tmp_path / "manifests"))
+    return backend
+
+def _client():
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    return TestClient(app)
+
+def test_incremental_batch_keeps_map_calls_under_max_concurrency(backend, tmp_path):
+    items = []
+    for index in range(4):
+        folder = tmp_path / f"project{index}"
+        folder.mkdir()
+        for name in ("a", "b"):
+            (folder / f"{name}.py").write_text(f"def {name}():\n    return {index}\n")
+        items.append({"folder_path": str(folder), "historical_figure": "Alan Turing"})
+
+    response = _client().post("/api/v1/analyze/batch", json={
+        "items": items,
+        "mode": "incremental",
+        "bypass_cache": True,
+        "max_concurrency": 1,
+    })
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["status"] for line in lines[:-1]] == ["success"] * 4
+    assert lines[-1]["succeeded"] == 4
+    assert backend.peak == 1
@@ -0,0 +1,89 @@
+# backend/test_cache.py
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.ai_client import ai_client
+from core.backends import BackendRouter, StubBackend
+from core.cache import ResponseCache, make_cache_key
+
+def _cache(tmp_path, **settings):
+    return ResponseCache(max_entries=16, db_path=str(tmp_path / "cache.db"), **settings)
+
+def test_cache_key_covers_every_input():
+    base = ("code", "Alan Turing", "model", 100, 0.7)
+    keys = {
+        make_cache_key(*base),
+        make_cache_key("code!", *base[1:]),
+        make_cache_key(base[0], "Marie Curie", *base[2:]),
+        make_cache_key(*base[:2], "other-model", *base[3:]),
+        make_cache_key(*base[:3], 200, base[4]),
+        make_cache_key(*base[:4], 0.8),
+    }
+    assert len(keys) == 6
+    assert make_cache_key(*base) == make_cache_key(*base)
+
+def test_entries_expire_after_the_ttl_in_both_tiers(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=1)
+    cache.set("key", "answer")
+    assert cache.get("key") == "answer"
+
+    time.sleep(1.1)
+
+    assert cache.get_memory("key") is None
+    assert cache.get("key") is None
+    # The expired row is gone from disk too, not just hidden
+    assert _cache(tmp_path, ttl_seconds=3600).get("key") is None
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    _cache(tmp_path).set("key", "answer")
+    # A fresh instance (e.g. after a restart) starts with an empty memory tier
+    cache = _cache(tmp_path)
+    assert cache.get_memory("key") is None
+
+    assert cache.get("key") == "answer"
+    assert cache.get_memory("key") == "answer"
+    assert (cache.hits, cache.misses) == (2, 0)
+
+def test_disk_tier_evicts_least_recently_used_entries_over_the_byte_cap(tmp_path):
+    cache = _cache(tmp_path, max_disk_bytes=250)
+    cache.set("a", "x" * 100)
+    cache.set("b", "y" * 100)
+    # Reading "a" from disk makes "b" the least recently used entry
+    time.sleep(0.01)
+    assert _cache(tmp_path, max_disk_bytes=250).get("a") == "x" * 100
+    time.sleep(0.01)
+    cache.set("c", "z" * 100)
+
+    reader = _cache(tmp_path, max_disk_bytes=250)
+    assert reader.get("b") is None
+    assert reader.get("a") == "x" * 100
+    assert reader.get("c") == "z" * 100
+
+def test_use_cache_false_bypasses_the_lookup_but_refreshes_the_entry(tmp_path, monkeypatch):
+    calls = []
+
+    class CountingBackend(StubBackend):
+        async def complete(self, messages, max_tokens, temperature):
+            calls.append(1)
+            return f"answer {len(calls)}"
+
+    cache = _cache(tmp_path)
+    monkeypatch.setattr("core.ai_client.response_cache", cache)
+    monkeypatch.setattr(ai_client, "_backends", BackendRouter([CountingBackend("stub", "stub-model", 5.0, 0.0)], hedge_delay=0))
+    monkeypatch.setattr(ai_client, "_initialized", True)
+
+    async def scenario():
+        first = await ai_client.get_analysis_async("def f(): pass", "Alan Turing")
+        cached = await ai_client.get_analysis_async("def f(): pass", "Alan Turing")
+        bypassed = await ai_client.get_analysis_async("def f(): pass", "Alan Turing", use_cache=False)
+        after = await ai_client.get_analysis_async("def f(): pass", "Alan Turing")
+        return first, cached, bypassed, after
+
+    assert asyncio.run(scenario()) == ("answer 1", "answer 1", "answer 2", "answer 2")
+    assert len(calls) == 2
@@ -7,7 +7,7 @@ from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.append(str(current_dir))
 
-from core.file_processor import file_processor
+from core.file_processor import FileProcessor, IgnoreRules, decode_text, file_processor, looks_binary
 
 def test_file_processor():
     print("🔍 Testing File Processor...")
@@ -48,5 +48,101 @@ def test_file_processor():
         import traceback
         traceback.print_exc()
 
+def test_ignore_rules_negation_reincludes_files():
+    rules = IgnoreRules(["*.log", "!keep.log", "build/*.py", "!build/main.py"])
+
+    assert rules.is_ignored("debug.log")
+    assert rules.is_ignored("nested/dir/debug.log")
+    assert not rules.is_ignored("keep.log")
+    assert not rules.is_ignored("nested/keep.log")
+    assert rules.is_ignored("build/util.py")
+    assert not rules.is_ignored("build/main.py")
+
+def test_ignore_rules_directory_patterns():
+    rules = IgnoreRules(["logs/", "/generated", "docs/**/draft*"])
+
+    # Trailing slash: directories only, at any depth
+    assert rules.is_ignored("logs", is_dir=True)
+    assert rules.is_ignored("src/logs", is_dir=True)
+    assert not rules.is_ignored("logs", is_dir=False)
+    # Leading slash: anchored to the root
+    assert rules.is_ignored("generated", is_dir=True)
+    assert not rules.is_ignored("src/generated", is_dir=True)
+    # ** spans any number of directories
+    assert rules.is_ignored("docs/draft1.md")
+    assert rules.is_ignored("docs/a/b/draft2.md")
+    assert not rules.is_ignored("docs/a/final.md")
+
+def test_nested_ignore_files_apply_below_their_directory(tmp_path):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "app" / ".gitignore").write_text("secret.py\n")
+    for rel_path in ["app/main.py", "app/secret.py", "lib/secret.py", "node_modules/pkg.js"]:
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text("x = 1\n")
+
+    entries = FileProcessor(max_workers=2).scan_directory(str(tmp_path))
+
+    assert [entry.rel_path for entry in entries] == ["app/main.py", "lib/secret.py"]
+
+def test_scan_honours_depth_and_file_limits(tmp_path):
+    for rel_path in ["a.py", "b.py", "one/c.py", "one/two/d.py"]:
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text("x = 1\n")
+    processor = FileProcessor(max_workers=2)
+
+    assert [entry.rel_path for entry in processor.scan_directory(str(tmp_path), max_depth=1)] == ["a.py", "b.py", "one/c.py"]
+    assert len(processor.scan_directory(str(tmp_path), max_files=2)) == 2
+    assert processor.scan_directory(str(tmp_path), max_files=0) == []
+    assert [file.filename for file in processor.process_directory(str(tmp_path))] == ["a.py", "b.py", "one/c.py", "one/two/d.py"]
+
+def test_decode_text_drops_a_character_split_by_truncation():
+    data = "naïve €".encode("utf-8")[:-1]
+
+    assert decode_text(data, truncated=True) == ("naïve ", "utf-8")
+    # Without truncation the bytes are not valid UTF-8 and fall back to a single-byte codec
+    assert decode_text(data)[1] == "cp1252"
+
+def test_decode_text_honours_byte_order_marks():
+    assert decode_text("héllo".encode("utf-16")) == ("héllo", "utf-16")
+    assert decode_text(b"\xef\xbb\xbfhello") == ("hello", "utf-8-sig")
+    assert decode_text("héllo".encode("utf-32")) == ("héllo", "utf-32")
+
+def test_decode_text_falls_back_to_single_byte_encodings():
+    assert decode_text(b"caf\xe9") == ("café", "cp1252")
+    # 0x81 is undefined in cp1252
+    assert decode_text(b"\x81x") == ("\x81x", "latin-1")
+
+def test_looks_binary_detects_nul_and_control_bytes():
+    assert not looks_binary(b"")
+    assert not looks_binary(b"print('hi')\n\tindent\r\n\x1b[0m\x0c")
+    assert looks_binary(b"text with one \0 byte")
+    # A UTF-16 BOM explains the NUL bytes
+    assert not looks_binary("text".encode("utf-16"))
+    assert looks_binary(bytes(range(1, 7)) * 3 + b"abcdefghij")
+    assert not looks_binary(b"\x01\x02" + b"mostly text" * 3)
+
+def test_read_stops_at_the_byte_budget_and_marks_truncation(tmp_path):
+    path = tmp_path / "big.py"
+    path.write_text("€" * 100, encoding="utf-8")
+    processor = FileProcessor(max_workers=1)
+
+    # Five characters allow 20 bytes, which ends partway through the seventh euro sign
+    record = processor.read_stream(lambda: open(path, "rb"), "big.py", ".py", max_chars=5)
+
+    assert record.success
+    assert record.content == "€" * 5 + "\n\n--- CONTENT TRUNCATED AT 5 CHARACTERS ---"
+
+def test_read_rejects_binary_and_accepts_utf16(tmp_path):
+    (tmp_path / "blob.py").write_bytes(b"\x00\x01\x02" * 100)
+    (tmp_path / "wide.py").write_bytes("x = 'ünï'\n".encode("utf-16"))
+    processor = FileProcessor(max_workers=1)
+
+    blob = processor.read_stream(lambda: open(tmp_path / "blob.py", "rb"), "blob.py", ".py")
+    wide = processor.read_stream(lambda: open(tmp_path / "wide.py", "rb"), "wide.py", ".py")
+
+    assert not blob.success and "binary" in blob.error
+    assert wide.success and wide.content == "x = 'ünï'\n"
+
 if __name__ == "__main__":
     test_file_processor()
\ No newline at end of file
@@ -0,0 +1,76 @@
+# backend/test_multi_analysis.py
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from api.endpoints import router
+from core.ai_client import ai_client
+from core.backends import BackendRouter, StubBackend
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(ai_client, "_backends", BackendRouter([StubBackend("stub", "stub-model", 5.0, 0.0)], hedge_delay=0))
+    monkeypatch.setattr(ai_client, "_initialized", True)
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    return TestClient(app)
+
+def _request(folder, mode):
+    return {
+        "folder_path": str(folder),
+        "historical_figures": ["Alan Turing", "Marie Curie"],
+        "mode": mode,
+        "response_view": "manifest",
+        "bypass_cache": True,
+    }
+
+def test_chunked_multi_analysis_of_empty_project_fails_per_figure(client, tmp_path):
+    (tmp_path / "empty.py").write_text("")
+    (tmp_path / "blank.js").write_text("   \n\n")
+
+    response = client.post("/api/v1/analyze/multi", json=_request(tmp_path, "chunked"))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "partial_success"
+    assert [(analysis["historical_figure"], analysis["status"]) for analysis in body["analyses"]] == [
+        ("Alan Turing", "failed"),
+        ("Marie Curie", "failed"),
+    ]
+
+def test_chunked_multi_stream_of_empty_project_completes(client, tmp_path):
+    (tmp_path / "empty.py").write_text("")
+
+    response = client.post("/api/v1/analyze/multi/stream", json=_request(tmp_path, "chunked"))
+
+    assert response.status_code == 200
+    assert response.text.count("event: analysis") == 2
+    assert '"status": "failed"' in response.text
+    assert "event: done" in response.text
+
+@pytest.mark.parametrize("mode", ["single", "chunked"])
+def test_multi_analysis_runs_every_figure(client, tmp_path, mode):
+    (tmp_path / "app.py").write_text("def main():\n    return 42\n")
+
+    response = client.post("/api/v1/analyze/multi", json=_request(tmp_path, mode))
+
+    assert response.status_code == 200
+    assert [analysis["status"] for analysis in response.json()["analyses"]] == ["success", "success"]
+
+def test_unexpected_multi_analysis_error_returns_500(client, tmp_path, monkeypatch):
+    (tmp_path / "app.py").write_text("x = 1\n")
+
+    def broken_build(*args, **kwargs):
+        raise RuntimeError("prompt build failed")
+
+    monkeypatch.setattr("api.endpoints._build_prompt", broken_build)
+
+    assert client.post("/api/v1/analyze/multi", json=_request(tmp_path, "single")).status_code == 500
+    assert client.post("/api/v1/analyze/multi/stream", json=_request(tmp_path, "single")).status_code == 500
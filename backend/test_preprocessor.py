@@ -0,0 +1,76 @@
+# backend/test_preprocessor.py
+import sys
+from pathlib import Path
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.file_processor import FileRecord
+from core.preprocessor import PromptPreprocessor
+
+ORDINARY = '''# Helpers for parsing configuration values
+
+def parse_flag(value):
+    """Interpret common truthy strings."""
+    return value.lower() in ("1", "true", "yes")
+
+class Settings:
+    def __init__(self, values):
+        self.values = values'''
+
+def _preprocess(*files, **settings):
+    return PromptPreprocessor(enabled=True, strip_comments=False, **settings).preprocess(list(files))
+
+def test_ordinary_file_passes_through_unchanged():
+    files, stats = _preprocess(FileRecord("config.py", ORDINARY, ".py"))
+
+    assert files == [FileRecord("config.py", ORDINARY, ".py")]
+    assert stats.files_used == 1 and stats.tokens_saved == 0
+    assert stats.duplicates_removed == stats.generated_skipped == 0
+
+def test_license_headers_are_stripped():
+    python = "#!/usr/bin/env python\n# Copyright 2024 Example Corp.\n# Licensed under the MIT License.\n\n" + ORDINARY
+    javascript = "/*\n * SPDX-License-Identifier: Apache-2.0\n */\nexport const answer = 42;"
+
+    files, stats = _preprocess(FileRecord("tool.py", python, ".py"), FileRecord("answer.js", javascript, ".js"))
+
+    assert files[0].content == "#!/usr/bin/env python\n" + ORDINARY
+    assert files[1].content == "export const answer = 42;"
+    assert stats.tokens_saved > 0
+
+def test_generated_files_are_skipped():
+    generated = "# @generated by protoc. DO NOT EDIT.\nclass Message:\n    pass"
+
+    files, stats = _preprocess(FileRecord("message_pb2.py", generated, ".py"), FileRecord("config.py", ORDINARY, ".py"))
+
+    assert [file.filename for file in files] == ["config.py"]
+    assert stats.generated_skipped == 1
+
+def test_minified_files_are_skipped():
+    minified = "var a=1;" + ";".join(f"function f{index}(x){{return x*{index}}}" for index in range(200))
+
+    files, stats = _preprocess(FileRecord("vendor.js", minified, ".js"), FileRecord("app.min.js", "var b=2;", ".js"))
+
+    assert files == []
+    assert stats.generated_skipped == 2
+
+def test_duplicates_and_padding_are_removed():
+    padded = "x = 1   \n\n\n\n\ny = 2\n"
+
+    files, stats = _preprocess(FileRecord("a.py", padded, ".py"), FileRecord("copy/a.py", padded, ".py"))
+
+    assert [(file.filename, file.content) for file in files] == [("a.py", "x = 1\n\ny = 2")]
+    assert stats.duplicates_removed == 1
+
+def test_disabled_preprocessor_only_drops_unreadable_files():
+    files = [
+        FileRecord("a.py", "x = 1   \n\n\n\n", ".py"),
+        FileRecord("empty.py", "  \n", ".py"),
+        FileRecord("broken.py", "", ".py", error="unreadable", success=False),
+    ]
+
+    kept, stats = PromptPreprocessor(enabled=False).preprocess(files)
+
+    assert kept == files[:1]
+    assert stats.tokens_saved == 0
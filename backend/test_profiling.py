@@ -0,0 +1,58 @@
+# backend/test_profiling.py
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.profiling import RequestProfiler
+
+def _profile(profiler, request_id, mode):
+    async def scenario():
+        async with profiler.profile(request_id, "GET", "/work", mode) as record:
+            await asyncio.sleep(0.02)
+            sum(range(10000))
+            record.status_code = 200
+        return record
+
+    return asyncio.run(scenario())
+
+@pytest.mark.parametrize("mode", ["sample", "cprofile"])
+def test_profiles_are_stored_under_generated_ids(mode):
+    profiler = RequestProfiler(enabled=True, max_stored=5, sample_interval=0.001)
+
+    first = _profile(profiler, "client-chosen", mode)
+    second = _profile(profiler, "client-chosen", mode)
+
+    assert first.profile_id != second.profile_id
+    assert profiler.get(first.profile_id) is first
+    assert profiler.get(second.profile_id) is second
+    assert profiler.get("client-chosen") is None
+    assert second.samples > 0
+
+def test_only_the_newest_profiles_are_kept():
+    profiler = RequestProfiler(enabled=True, max_stored=2, sample_interval=0.001)
+
+    records = [_profile(profiler, str(index), "sample") for index in range(3)]
+
+    assert profiler.get(records[0].profile_id) is None
+    assert [summary["profile_id"] for summary in profiler.recent()] == [records[2].profile_id, records[1].profile_id]
+
+def test_concurrent_profile_runs_unprofiled_and_the_slot_is_freed():
+    profiler = RequestProfiler(enabled=True, sample_interval=0.001)
+
+    async def scenario():
+        async with profiler.profile("outer", "GET", "/a", "sample") as outer:
+            async with profiler.profile("inner", "GET", "/b", "sample") as inner:
+                assert inner is None
+        async with profiler.profile("after", "GET", "/c", "sample") as after:
+            assert after is not None
+        return outer, after
+
+    outer, after = asyncio.run(scenario())
+    assert len(profiler.recent()) == 2
+    assert profiler.get(outer.profile_id) is outer and profiler.get(after.profile_id) is after
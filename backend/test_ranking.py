@@ -0,0 +1,74 @@
+# backend/test_ranking.py
+import sys
+from pathlib import Path
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.file_processor import FileRecord, content_hash, estimate_tokens
+from core.ranking import FileRanker
+
+def _module(name, imports=(), body_lines=20):
+    lines = [f"from {module} import helper" for module in imports]
+    lines += [f"def {name}_{index}():\n    return {index}" for index in range(body_lines)]
+    return "\n".join(lines) + "\n"
+
+def _project():
+    files = [FileRecord("pkg/models.py", _module("model"), ".py"), FileRecord("pkg/leaf.py", _module("leaf"), ".py")]
+    for name in ("views", "forms", "admin", "api"):
+        files.append(FileRecord(f"pkg/{name}.py", _module(name, imports=["pkg.models"]), ".py"))
+    return files
+
+def test_imported_file_ranks_above_an_unused_leaf():
+    ranker = FileRanker(enabled=True)
+    files = _project()
+
+    order = [ranked.filename for ranked in ranker.rank(files)]
+    centrality = ranker._centrality({file.filename: ranker._file_features(file, content_hash(file.content)) for file in files})
+
+    assert order[0] == "pkg/models.py"
+    assert order.index("pkg/models.py") < order.index("pkg/leaf.py")
+    assert centrality["pkg/models.py"] > 2 * centrality["pkg/leaf.py"]
+
+def test_selection_stays_within_the_token_budget():
+    ranker = FileRanker(enabled=True)
+    files = _project() + [FileRecord("pkg/huge.py", _module("huge", body_lines=400), ".py")]
+    budget = sum(estimate_tokens(file.content) for file in files[:4])
+
+    selected, left_out = ranker.select(files, token_budget=budget)
+
+    assert sum(estimate_tokens(file.content) for file in selected) <= budget
+    assert left_out == len(files) - len(selected) > 0
+    assert "pkg/huge.py" not in [file.filename for file in selected]
+    # Smaller, lower-ranked files still fill what the large one could not use
+    assert len(selected) == 4
+
+def test_everything_is_kept_when_ranking_is_disabled():
+    files = _project()
+    assert FileRanker(enabled=False).select(files, token_budget=1) == (files, 0)
+
+def test_features_are_reused_for_unchanged_files(monkeypatch):
+    parsed = []
+    original = FileRanker._references
+
+    def counting_references(file):
+        parsed.append(file.filename)
+        return original(file)
+
+    monkeypatch.setattr(FileRanker, "_references", staticmethod(counting_references))
+    ranker = FileRanker(enabled=True)
+    files = _project()
+
+    ranker.rank(files)
+    assert sorted(parsed) == sorted(file.filename for file in files)
+
+    parsed.clear()
+    edited = [file._replace(content=file.content + "# edited\n") if file.filename == "pkg/views.py" else file for file in files]
+    ranker.rank(edited)
+    assert parsed == ["pkg/views.py"]
+
+    # An identical file set is answered from the ranking cache without parsing anything
+    parsed.clear()
+    ranker.rank(edited)
+    assert parsed == []
@@ -0,0 +1,155 @@
+# backend/test_singleflight.py
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core import singleflight
+from core.singleflight import Broadcast, SingleFlight
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flights = SingleFlight("test")
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.02)
+            return "result"
+
+        results = await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+        await asyncio.sleep(0)
+        return results, len(runs), flights.in_flight()
+
+    results, runs, in_flight = asyncio.run(scenario())
+    assert results == ["result"] * 5
+    assert runs == 1
+    assert in_flight == 0
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flights = SingleFlight("test")
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        return await asyncio.gather(flights.do("a", lambda: work("a")), flights.do("b", lambda: work("b")))
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        flights = SingleFlight("test")
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad folder")
+
+        results = await asyncio.gather(*(flights.do("key", failing) for _ in range(3)), return_exceptions=True)
+        await asyncio.sleep(0)
+
+        async def succeeding():
+            return "ok"
+
+        return results, await flights.do("key", succeeding)
+
+    results, retry = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert retry == "ok"
+
+def test_cancelling_the_leader_does_not_cancel_followers():
+    async def scenario():
+        flights = SingleFlight("test")
+        finished = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "shared"
+
+        leader = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, finished.is_set()
+
+    result, finished = asyncio.run(scenario())
+    assert result == "shared"
+    assert finished
+
+def test_broadcast_late_joiner_replays_missed_items():
+    async def scenario():
+        async def source():
+            for item in range(5):
+                await asyncio.sleep(0.01)
+                yield item
+
+        broadcast = Broadcast(source())
+        early = asyncio.create_task(_collect(broadcast.subscribe()))
+        await asyncio.sleep(0.035)
+        late = await _collect(broadcast.subscribe())
+        await broadcast.wait_closed()
+        after_close = await _collect(broadcast.subscribe())
+        return await early, late, after_close
+
+    early, late, after_close = asyncio.run(scenario())
+    assert early == late == after_close == [0, 1, 2, 3, 4]
+
+def test_broadcast_reraises_source_errors_in_every_subscriber():
+    async def scenario():
+        async def source():
+            yield "first"
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+
+        broadcast = Broadcast(source())
+        outcomes = []
+        for _ in range(2):
+            items = []
+            try:
+                async for item in broadcast.subscribe():
+                    items.append(item)
+            except RuntimeError as e:
+                outcomes.append((items, str(e)))
+        return outcomes
+
+    assert asyncio.run(scenario()) == [(["first"], "upstream failed")] * 2
+
+def test_background_tasks_are_held_until_they_finish():
+    async def scenario():
+        flights = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "done"
+
+        async def source():
+            await release.wait()
+            yield "item"
+
+        waiter = asyncio.create_task(flights.do("key", work))
+        broadcast = Broadcast(source())
+        await asyncio.sleep(0)
+        # The leader and the pump are not awaited by anyone, so the module keeps them alive
+        held = len(singleflight._background_tasks)
+        release.set()
+        result = await waiter
+        await broadcast.wait_closed()
+        await asyncio.sleep(0)
+        return held, result, len(singleflight._background_tasks)
+
+    assert asyncio.run(scenario()) == (2, "done", 0)
@@ -0,0 +1,34 @@
+# backend/test_skeleton.py
+import sys
+from pathlib import Path
+
+# Add current directory to path
+current_dir = Path(__file__).parent
+sys.path.append(str(current_dir))
+
+from core.skeleton import Skeletonizer
+
+def _long_function(name, comment_lines):
+    return [f"function {name}(x) {{", *comment_lines, *[f"  x += {i};" for i in range(10)], "  return x;", "}"]
+
+def test_block_comment_braces_do_not_change_depth():
+    source = "\n".join(_long_function("a", ["  /* } */"]) + ["", "function after() { return 1; }"])
+    skeleton = Skeletonizer(max_body_lines=6, cache_size=8).skeletonize(source, ".js")
+
+    assert "x += 5;" not in skeleton
+    assert "lines elided" in skeleton
+    assert "function after() { return 1; }" in skeleton
+
+def test_multiline_block_comment_is_skipped():
+    comment = ["  /* start {", "     { still inside", "  } end */"]
+    source = "\n".join(_long_function("a", comment) + _long_function("b", []))
+    skeleton = Skeletonizer(max_body_lines=6, cache_size=8).skeletonize(source, ".js")
+
+    assert "function a(x) {" in skeleton
+    assert "function b(x) {" in skeleton
+    assert "x += 5;" not in skeleton
+    assert skeleton.count("lines elided") == 2
+
+def test_comment_markers_inside_strings_are_ignored():
+    depths = Skeletonizer._line_depths(['const s = "/*";', "function f() {", "}", "const t = '*/';"])
+    assert depths == [0, 0, 1, 0, 0]
@@ -1,47 +1,204 @@
 # backend/utils/logging_setup.py
 
+import atexit
+import contextvars
+import copy
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+# Id of the HTTP request (or job) being handled, attached to every log record
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via ``extra=`` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "suppressed"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site for DEBUG records.
+
+    Per-file events in a large scan come from a handful of debug call sites,
+    so each site may emit ``rate`` records per second (with an equal burst).
+    Dropped records are counted and reported as ``suppressed`` on the next
+    record that gets through from the same site. INFO and above always pass,
+    so operational warnings such as admission rejections and backend
+    failures are never lost.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > logging.DEBUG:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last refill, suppressed count]
+            bucket = self._buckets.setdefault(key, [self.rate, now, 0])
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with timestamp, level, logger, message, request id and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if getattr(record, "suppressed", None):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+class TextFormatter(logging.Formatter):
+    """Human-readable console format that still shows the request id."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            text = f"[{request_id}] {text}"
+        if getattr(record, "suppressed", None):
+            text += f" ({record.suppressed} similar messages suppressed)"
+        return text
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the listener thread without formatting them on the caller's thread.
+
+    The stock QueueHandler formats the message into ``msg`` and folds the
+    traceback into it; here only the arguments are merged and the traceback
+    is kept as ``exc_text`` so the JSON formatter can emit it as a field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _level(name: str, default: str) -> int:
+    return logging.getLevelName(os.environ.get(name, default).upper())
 
 def setup_logging():
     """
     Configures application-wide logging.
-    Logs will go to both the console and a file.
+
+    Records are put on an in-memory queue by the calling thread and written
+    to the console and a rotating JSON log file by a background listener, so
+    logging never blocks a request on disk I/O. Safe to call more than once.
     """
-    # Create a logs directory if it doesn't exist
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # Create a formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
-    # Console handler (shows output in terminal)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    console_handler.setLevel(logging.INFO)
-    
-    # File handler (saves logs to file)
-    file_handler = logging.FileHandler(
-        log_dir / "digital_necromancer.log",
-        encoding='utf-8'
-    )
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.DEBUG)
-    
-    # Get the root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
-    
-    # Create a logger for this specific module
-    logger = logging.getLogger(__name__)
+    global _listener
+
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+
+        # Create a logs directory if it doesn't exist
+        log_dir = Path(os.environ.get("LOG_DIR", "logs"))
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+        console_level = _level("LOG_LEVEL", "INFO")
+        file_level = _level("LOG_FILE_LEVEL", "DEBUG")
+
+        # Console handler (shows output in terminal)
+        console_handler = logging.StreamHandler(sys.stdout)
+        if os.environ.get("LOG_FORMAT", "text").lower() == "json":
+            console_handler.setFormatter(JsonFormatter())
+        else:
+            console_handler.setFormatter(TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        console_handler.setLevel(console_level)
+
+        # Rotating JSON file handler (saves logs to file)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_dir / "digital_necromancer.log",
+            maxBytes=int(os.environ.get("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=int(os.environ.get("LOG_FILE_BACKUPS", "5")),
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonFormatter())
+        file_handler.setLevel(file_level)
+
+        # The only handler on the root logger is the queue; the listener thread does the I/O
+        queue_handler = NonBlockingQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(RequestIdFilter())
+        queue_handler.addFilter(RateLimitFilter(float(os.environ.get("LOG_RATE_LIMIT", "20"))))
+
+        # Get the root logger, replacing any handlers from an earlier configuration
+        root_logger = logging.getLogger()
+        for handler in list(root_logger.handlers):
+            root_logger.removeHandler(handler)
+        # Records below both handler levels are dropped before any formatting work
+        root_logger.setLevel(min(console_level, file_level))
+        root_logger.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(
+            queue_handler.queue, console_handler, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
     logger.info("Logging setup complete.")
-    
+
     return logger
 
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
 # Create a module-level logger
-logger = logging.getLogger(__name__)
\ No newline at end of file
+logger = logging.getLogger(__name__)